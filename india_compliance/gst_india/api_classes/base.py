@@ -1,23 +1,45 @@
-from urllib.parse import urljoin
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urljoin, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import frappe
 from frappe import _
-from frappe.utils import sbool
+from frappe.utils import cint, flt, sbool
 
 from india_compliance.exceptions import GatewayTimeoutError, GSPServerError
 from india_compliance.gst_india.utils import is_api_enabled
 from india_compliance.gst_india.utils.api import enqueue_integration_request
+from india_compliance.gst_india.utils.circuit_breaker import CircuitBreaker
 
 BASE_URL = "https://asp.resilient.tech"
 
+# Pooled sessions by base URL, reused by all requests made by this process
+SESSIONS = {}
+
 
 class BaseAPI:
     API_NAME = "GST"
     BASE_PATH = ""
     SENSITIVE_INFO = ("x-api-key",)
 
+    # Requests made in parallel by `get_concurrently`
+    MAX_WORKERS = 4
+
+    # (connect, read) timeout in seconds
+    TIMEOUT = (10, 60)
+
+    # Share of successful requests logged, defaults to `ic_api_log_sample_rate`
+    LOG_SAMPLE_RATE = None
+
+    # Fail fast for endpoints that are down, see `CircuitBreaker`
+    USE_CIRCUIT_BREAKER = False
+
     def __init__(self, *args, **kwargs):
         self.settings = frappe.get_cached_doc("GST Settings")
         if not is_api_enabled(self.settings):
@@ -35,6 +57,7 @@ class BaseAPI:
             )
         }
         self.default_log_values = {}
+        self.session = get_session(BASE_URL)
 
         self.setup(*args, **kwargs)
 
@@ -87,6 +110,62 @@ class BaseAPI:
         params=None,
         headers=None,
         json=None,
+    ):
+        request_args, log = self.get_request_args(
+            method, endpoint, params, headers, json
+        )
+
+        def get_response():
+            self.before_request(request_args)
+            return send_request(self.session, method.upper(), request_args)
+
+        return self.handle_request(request_args, log, get_response)
+
+    def get_concurrently(self, request_list):
+        """
+        Makes GET requests in parallel threads and yields (index, result) as each
+        response arrives. Responses are processed in the calling thread, as by `get`.
+
+        :param request_list: list of kwargs for `get`
+        """
+        prepared_requests = []
+        for kwargs in request_list:
+            request_args, log = self.get_request_args("GET", **kwargs)
+            self.before_request(request_args)
+            prepared_requests.append((request_args, log))
+
+        executor = ThreadPoolExecutor(max_workers=self.get_max_workers())
+        futures = {
+            executor.submit(send_request, self.session, "GET", request_args): index
+            for index, (request_args, log) in enumerate(prepared_requests)
+        }
+
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                request_args, log = prepared_requests[index]
+                yield index, self.handle_request(request_args, log, future.result)
+
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_max_workers(self):
+        """Number of requests made in parallel by this instance"""
+        return cint(frappe.conf.ic_api_workers) or self.MAX_WORKERS
+
+    def get_timeout(self):
+        if timeout := frappe.conf.ic_api_timeout:
+            return (self.TIMEOUT[0], timeout)
+
+        return self.TIMEOUT
+
+    def get_request_args(
+        self,
+        method,
+        endpoint="",
+        params=None,
+        headers=None,
+        json=None,
     ):
         method = method.upper()
         if method not in ("GET", "POST"):
@@ -95,6 +174,7 @@ class BaseAPI:
         request_args = frappe._dict(
             url=self.get_url(endpoint),
             params=params,
+            timeout=self.get_timeout(),
             headers={
                 # auto-generated hash, required by some endpoints
                 **self.default_headers,
@@ -123,12 +203,18 @@ class BaseAPI:
                     "body": json_data,
                 }
 
+        return request_args, log
+
+    def handle_request(self, request_args, log, get_response):
         response_json = None
+        circuit_breaker = self.get_circuit_breaker(request_args.url)
 
-        try:
-            self.before_request(request_args)
+        if circuit_breaker and not circuit_breaker.allow_request():
+            raise GSPServerError
 
-            response = requests.request(method, **request_args)
+        try:
+            response = get_response()
+            log.timings = response.timings
             if api_request_id := response.headers.get("x-amzn-RequestId"):
                 log.request_id = api_request_id
 
@@ -154,17 +240,30 @@ class BaseAPI:
                     )
 
             response_json = self.process_response(response_json)
+
+            if circuit_breaker:
+                circuit_breaker.record_success()
+
             return response_json.get("result", response_json)
 
         except Exception as e:
             log.error = str(e)
+
+            if circuit_breaker:
+                if is_server_error(e):
+                    circuit_breaker.record_failure()
+                else:
+                    # server is reachable
+                    circuit_breaker.record_success()
+
             raise e
 
         finally:
-            log.output = response_json.copy()
-            self.mask_sensitive_info(log)
+            if log.error or self.should_log_success():
+                log.output = response_json
+                self.mask_sensitive_info(log)
 
-            enqueue_integration_request(**log)
+                enqueue_integration_request(**log)
 
             if self.sandbox_mode and not frappe.flags.ic_sandbox_message_shown:
                 frappe.msgprint(
@@ -176,6 +275,12 @@ class BaseAPI:
     def before_request(self, request_args):
         return
 
+    def get_circuit_breaker(self, url):
+        if not self.USE_CIRCUIT_BREAKER:
+            return
+
+        return CircuitBreaker(get_endpoint(url))
+
     def process_response(self, response):
         self.handle_error_response(response)
         self.response = response
@@ -251,13 +356,25 @@ class BaseAPI:
     def generate_request_id(self, length=12):
         return frappe.generate_hash(length=length)
 
+    def should_log_success(self):
+        """Successful requests are sampled if a sample rate is set"""
+        sample_rate = self.LOG_SAMPLE_RATE
+        if sample_rate is None:
+            sample_rate = frappe.conf.ic_api_log_sample_rate
+
+        if sample_rate is None or flt(sample_rate) >= 1:
+            return True
+
+        return random.random() < flt(sample_rate)
+
     def mask_sensitive_info(self, log):
         for key in self.SENSITIVE_INFO:
             if key in log.request_headers:
                 log.request_headers[key] = "*****"
 
-            if key in log.output:
-                log.output[key] = "*****"
+            # response is not copied unless it has sensitive info
+            if isinstance(log.output, dict) and key in log.output:
+                log.output = {**log.output, key: "*****"}
 
             if not log.data:
                 return
@@ -269,5 +386,94 @@ class BaseAPI:
                 log.data["body"][key] = "*****"
 
 
+def get_session(base_url):
+    """
+    Returns session with a connection pool for base URL, created once per process.
+
+    - Idempotent GET requests are retried with backoff on connection errors
+      and 502 / 503 responses.
+    - Other requests are only retried if the connection could not be made.
+    - Cookies are not stored, as the same process serves multiple sites.
+    """
+    if session := SESSIONS.get(base_url):
+        return session
+
+    session = requests.Session()
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    session.mount(
+        base_url,
+        HTTPAdapter(
+            pool_maxsize=cint(frappe.conf.ic_api_pool_size) or 10,
+            max_retries=Retry(
+                total=3,
+                read=False,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503),
+                allowed_methods=("GET",),
+                raise_on_status=False,
+            ),
+        ),
+    )
+
+    SESSIONS[base_url] = session
+    return session
+
+
+def get_endpoint(url):
+    """Returns path of URL, same in sandbox mode, e.g. ei/api/invoice"""
+    path = urlparse(url).path.strip("/")
+    return path.removeprefix("test/")
+
+
+def is_server_error(error):
+    return isinstance(
+        error,
+        (
+            GSPServerError,
+            GatewayTimeoutError,
+            requests.ConnectionError,
+            requests.Timeout,
+        ),
+    )
+
+
+def wait_for_rate_limit(key, limit):
+    """
+    Waits till a request can be made without exceeding `limit` requests per second
+    for the key. Requests are counted in Redis, so that the limit is shared by all
+    workers.
+    """
+    while True:
+        now = time.time()
+        cache_key = frappe.cache.make_key(f"ic_rate_limit:{key}:{int(now)}")
+        count = frappe.cache.incr(cache_key)
+
+        if count == 1:
+            frappe.cache.expire(cache_key, 2)
+
+        if count <= limit:
+            return
+
+        time.sleep(1 - now % 1)
+
+
+def send_request(session, method, request_args):
+    """
+    Sends request and sets `timings` on the response.
+    Safe to call from threads, as `frappe.local` is not used.
+    """
+    start_time = time.monotonic()
+    response = session.request(method, **request_args)
+
+    response.timings = {
+        # from sending request till response headers are parsed, with retries
+        "server": round(response.elapsed.total_seconds(), 3),
+        # including reading response body
+        "total": round(time.monotonic() - start_time, 3),
+    }
+
+    return response
+
+
 def get_public_ip():
     return requests.get("https://api.ipify.org").text
@@ -2,8 +2,9 @@ import re
 
 import frappe
 from frappe import _
+from frappe.utils import cint
 
-from india_compliance.gst_india.api_classes.base import BaseAPI
+from india_compliance.gst_india.api_classes.base import BaseAPI, wait_for_rate_limit
 from india_compliance.gst_india.constants import DISTANCE_REGEX
 
 
@@ -11,6 +12,7 @@ class EInvoiceAPI(BaseAPI):
     API_NAME = "e-Invoice"
     BASE_PATH = "ei/api"
     SENSITIVE_INFO = BaseAPI.SENSITIVE_INFO + ("password",)
+    USE_CIRCUIT_BREAKER = True
     IGNORED_ERROR_CODES = {
         # Generate IRN errors
         "2150": "Duplicate IRN",
@@ -57,6 +59,11 @@ class EInvoiceAPI(BaseAPI):
             }
         )
 
+    def before_request(self, request_args):
+        # limit is per company GSTIN, shared by workers generating e-Invoices in bulk
+        if limit := cint(frappe.conf.ic_e_invoice_rate_limit):
+            wait_for_rate_limit(f"e-Invoice:{request_args.headers.get('gstin')}", limit)
+
     def is_ignored_error(self, response_json):
         message = response_json.get("message", "").strip()
 
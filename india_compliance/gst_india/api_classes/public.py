@@ -2,6 +2,9 @@ import frappe
 from frappe import _
 
 from india_compliance.gst_india.api_classes.base import BaseAPI
+from india_compliance.gst_india.doctype.gstin_info_archive.gstin_info_archive import (
+    archive_gstin_info,
+)
 
 
 class PublicAPI(BaseAPI):
@@ -27,4 +30,5 @@ class PublicAPI(BaseAPI):
                 }
             )
 
+        archive_gstin_info(gstin, response)
         return response
@@ -35,19 +35,30 @@ class FilesAPI(BaseAPI):
     def get_all(self, url_details):
         response = frappe._dict()
         self.encryption_key = b64decode(url_details.ek)
+        self.files = {self.get_url(row.get("ul")): row for row in url_details.urls}
 
-        for row in url_details.urls:
-            self.hash = row.get("hash")
-            self.ul = row.get("ul")
-            data = self.get(endpoint=self.ul)
+        # files are parsed as they arrive, and merged in order
+        parts = dict(
+            self.get_concurrently(
+                [{"endpoint": row.get("ul")} for row in url_details.urls]
+            )
+        )
 
+        for index in sorted(parts):
             if not response:
-                response = data
+                response = parts[index]
             else:
-                merge_dicts(response, data)
+                merge_dicts(response, parts[index])
 
         return response
 
+    def handle_request(self, request_args, log, get_response):
+        row = self.files[request_args.url]
+        self.hash = row.get("hash")
+        self.ul = row.get("ul")
+
+        return super().handle_request(request_args, log, get_response)
+
     def process_response(self, response):
         computed_hash = hash_sha256(response)
         if computed_hash != self.hash:
@@ -59,7 +70,8 @@ class FilesAPI(BaseAPI):
 
         encrypted_data = tar_gz_bytes_to_data(response)
         data = self.decrypt_data(encrypted_data)
-        data = json.loads(data, object_hook=frappe._dict)
+        # nested values are wrapped as required while importing
+        data = frappe._dict(json.loads(data))
 
         return data
 
@@ -269,6 +281,55 @@ class ReturnsAPI(ReturnsAuthenticate):
         params = {"gstin": self.company_gstin, **(params or {})}
         return self._request("get", action, return_period, params, endpoint, None, otp)
 
+    def get_many(self, request_list, otp=None, on_response=None):
+        """
+        Same as calling `get` for each request, but requests are made in parallel
+        once authenticated. Returns responses in the order of requests.
+
+        :param request_list: list of kwargs for `get`, except `otp`
+        :param on_response: called with index of request and count of responses
+            received so far, as each response arrives
+        """
+        if not self.get_auth_token():
+            response = self.autheticate_with_otp(otp=otp)
+            if response.error_type in ["otp_requested", "invalid_otp"]:
+                return [response] * len(request_list)
+
+        responses = [None] * len(request_list)
+        for responses_received, (index, response) in enumerate(
+            self.get_concurrently(
+                [self.get_request_kwargs(**kwargs) for kwargs in request_list]
+            ),
+            start=1,
+        ):
+            responses[index] = response
+            if on_response:
+                on_response(index, responses_received)
+
+        if any(response.error_type == "authorization_failed" for response in responses):
+            auth_response = self.autheticate_with_otp()
+            responses = [
+                (
+                    auth_response
+                    if response.error_type == "authorization_failed"
+                    else response
+                )
+                for response in responses
+            ]
+
+        return responses
+
+    def get_request_kwargs(self, action, return_period, params=None, endpoint=None):
+        return {
+            "params": {
+                "action": action,
+                "gstin": self.company_gstin,
+                **(params or {}),
+            },
+            "headers": {"auth-token": self.auth_token, "ret_period": return_period},
+            "endpoint": endpoint,
+        }
+
     def post(self, action, params=None, endpoint=None, json=None, otp=None):
         return self._request("post", action, None, params, endpoint, json, otp)
 
@@ -361,23 +422,31 @@ class GSTR2bAPI(ReturnsAPI):
     API_NAME = "GSTR-2B"
 
     def get_data(self, return_period, otp=None, file_num=None):
+        return self.get(**self.get_data_kwargs(return_period, file_num), otp=otp)
+
+    def get_data_kwargs(self, return_period, file_num=None):
         params = {"rtnprd": return_period}
         if file_num:
             params.update({"file_num": file_num})
 
-        return self.get(
-            "GET2B", return_period, params=params, endpoint="returns/gstr2b", otp=otp
-        )
+        return {
+            "action": "GET2B",
+            "return_period": return_period,
+            "params": params,
+            "endpoint": "returns/gstr2b",
+        }
 
 
 class GSTR2aAPI(ReturnsAPI):
     API_NAME = "GSTR-2A"
 
     def get_data(self, action, return_period, otp=None):
-        return self.get(
-            action,
-            return_period,
-            params={"ret_period": return_period},
-            endpoint="returns/gstr2a",
-            otp=otp,
-        )
+        return self.get(**self.get_data_kwargs(action, return_period), otp=otp)
+
+    def get_data_kwargs(self, action, return_period):
+        return {
+            "action": action,
+            "return_period": return_period,
+            "params": {"ret_period": return_period},
+            "endpoint": "returns/gstr2a",
+        }
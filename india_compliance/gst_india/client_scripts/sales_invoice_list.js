@@ -55,6 +55,15 @@ function add_bulk_action_for_invoices(list_view, label, callback, allowed_status
 }
 
 async function generate_e_waybill_json(docnames) {
+    // e-Waybill portal accepts upto 50 bills in a JSON file
+    if (docnames.length > 50) {
+        window.open_url_post(
+            "/api/method/india_compliance.gst_india.utils.e_waybill.download_e_waybill_json",
+            { doctype: DOCTYPE, docnames: JSON.stringify(docnames) }
+        );
+        return;
+    }
+
     const ewb_data = await frappe.xcall(
         "india_compliance.gst_india.utils.e_waybill.generate_e_waybill_json",
         { doctype: DOCTYPE, docnames }
@@ -121,18 +130,20 @@ async function bulk_e_waybill_print(docnames) {
 async function enqueue_bulk_e_waybill_generation(docnames) {
     enqueue_bulk_generation(
         "india_compliance.gst_india.utils.e_waybill.enqueue_bulk_e_waybill_generation",
-        { doctype: DOCTYPE, docnames }
+        { doctype: DOCTYPE, docnames },
+        "GST Bulk Generation Log"
     );
 }
 
 async function enqueue_bulk_e_invoice_generation(docnames) {
     enqueue_bulk_generation(
         "india_compliance.gst_india.utils.e_invoice.enqueue_bulk_e_invoice_generation",
-        { docnames }
+        { docnames },
+        "GST Bulk Generation Log"
     );
 }
 
-async function enqueue_bulk_generation(method, args) {
+async function enqueue_bulk_generation(method, args, job_doctype = "RQ Job") {
     const job_id = await frappe.xcall(method, args);
 
     const now = frappe.datetime.system_datetime();
@@ -160,7 +171,7 @@ async function enqueue_bulk_generation(method, args) {
             <a href='{1}'>API Request(s)</a>,
             and <a href='{2}'>Error Log(s)</a>.`,
             [
-                frappe.utils.get_form_link("RQ Job", job_id),
+                frappe.utils.get_form_link(job_doctype, job_id),
                 api_requests_link,
                 error_logs_link,
             ]
@@ -596,6 +596,28 @@ CUSTOM_FIELDS = {
             "read_only": 1,
             "print_hide": 1,
         },
+        {
+            "fieldname": "cleaner_bill_no",
+            "label": "Cleaner Supplier Invoice No",
+            "fieldtype": "Data",
+            "insert_after": "itc_cess_amount",
+            "hidden": 1,
+            "read_only": 1,
+            "no_copy": 1,
+            "print_hide": 1,
+            "translatable": 0,
+        },
+        {
+            "fieldname": "bill_fiscal_year",
+            "label": "Supplier Invoice Fiscal Year",
+            "fieldtype": "Data",
+            "insert_after": "cleaner_bill_no",
+            "hidden": 1,
+            "read_only": 1,
+            "no_copy": 1,
+            "print_hide": 1,
+            "translatable": 0,
+        },
     ],
     "Supplier": [
         {
@@ -886,6 +908,26 @@ E_INVOICE_FIELDS = {
             "read_only": 1,
             "translatable": 1,
         },
+        {
+            "fieldname": "einvoice_retry_count",
+            "label": "e-Invoice Retry Count",
+            "fieldtype": "Int",
+            "insert_after": "einvoice_status",
+            "hidden": 1,
+            "no_copy": 1,
+            "print_hide": 1,
+            "read_only": 1,
+        },
+        {
+            "fieldname": "einvoice_next_retry_on",
+            "label": "e-Invoice Next Retry On",
+            "fieldtype": "Datetime",
+            "insert_after": "einvoice_retry_count",
+            "hidden": 1,
+            "no_copy": 1,
+            "print_hide": 1,
+            "read_only": 1,
+        },
     ]
 }
 
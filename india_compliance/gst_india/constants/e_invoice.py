@@ -6,3 +6,13 @@ CANCEL_REASON_CODES = {
 }
 
 ITEM_LIMIT = 1000
+
+# Sales Invoices are split across these many workers for bulk generation
+E_INVOICE_WORKERS = 4
+
+# Backoff for retrying e-Invoice generation, in seconds
+RETRY_INTERVAL = 300
+MAX_RETRY_INTERVAL = 7200
+
+# e-Invoices retried in each run of the scheduled job
+RETRY_BATCH_SIZE = 50
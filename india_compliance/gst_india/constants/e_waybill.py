@@ -88,3 +88,9 @@ TRANSIT_TYPES = {"Road": "R", "Warehouse": "W", "Others": "O"}
 CONSIGNMENT_STATUS = {"In Movement": "M", "In Transit": "T"}
 
 ITEM_LIMIT = 250
+
+# e-Waybill portal accepts upto 50 bills in a JSON file
+E_WAYBILL_JSON_CHUNK_SIZE = 50
+
+# Documents are split across these many workers for bulk generation
+E_WAYBILL_WORKERS = 4
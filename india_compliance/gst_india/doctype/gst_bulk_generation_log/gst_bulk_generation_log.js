@@ -0,0 +1,25 @@
+// Copyright (c) 2024, Resilient Tech and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("GST Bulk Generation Log", {
+    setup(frm) {
+        frappe.realtime.on("gst_bulk_generation_progress", message => {
+            if (message.name === frm.doc.name) frm.reload_doc();
+        });
+    },
+
+    refresh(frm) {
+        if (frm.doc.generation_type !== "Reconciliation Email" || !frm.doc.failed)
+            return;
+
+        frm.add_custom_button(__("Retry Failed"), async () => {
+            const { message: bulk_generation_log } = await frappe.call({
+                method: "india_compliance.gst_india.doctype.purchase_reconciliation_tool.purchase_reconciliation_tool.retry_reconciliation_emails",
+                args: { bulk_generation_log: frm.doc.name },
+                freeze: true,
+            });
+
+            frappe.set_route("Form", "GST Bulk Generation Log", bulk_generation_log);
+        });
+    },
+});
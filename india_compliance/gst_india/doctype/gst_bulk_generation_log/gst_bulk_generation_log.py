@@ -0,0 +1,125 @@
+# Copyright (c) 2024, Resilient Tech and contributors
+# For license information, please see license.txt
+
+import math
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import create_batch, flt, now_datetime, time_diff_in_seconds
+
+DOCTYPE = "GST Bulk Generation Log"
+
+
+class GSTBulkGenerationLog(Document):
+    pass
+
+
+def create_bulk_generation_log(generation_type, reference_doctype, total_documents):
+    return (
+        frappe.get_doc(
+            {
+                "doctype": DOCTYPE,
+                "generation_type": generation_type,
+                "reference_doctype": reference_doctype,
+                "total_documents": total_documents,
+            }
+        )
+        .insert(ignore_permissions=True)
+        .name
+    )
+
+
+def get_bulk_generation_batches(docnames, workers):
+    """
+    Splits docnames into a batch for each worker, so that the number of
+    requests made in parallel is limited by `workers`.
+    """
+    return create_batch(docnames, math.ceil(len(docnames) / workers))
+
+
+def start_bulk_generation(name):
+    log = frappe.qb.DocType(DOCTYPE)
+
+    (
+        frappe.qb.update(log)
+        .set(log.status, "In Progress")
+        .set(log.started_on, now_datetime())
+        .where(log.name == name)
+        .where(log.status == "Queued")
+        .run()
+    )
+
+
+def fail_bulk_generation(name):
+    """Marks the log as failed where generation is aborted for all documents"""
+    frappe.db.set_value(
+        DOCTYPE, name, {"status": "Failed", "completed_on": now_datetime()}
+    )
+
+
+def update_bulk_generation_log(name, docname, error=None, error_log=None):
+    """
+    Records result of generation for a document.
+
+    Counters are incremented in the database, as documents of a log are
+    generated by multiple workers.
+    """
+    log = frappe.qb.DocType(DOCTYPE)
+    counter = log.failed if error else log.generated
+
+    frappe.qb.update(log).set(counter, counter + 1).where(log.name == name).run()
+
+    # row is locked by the update till commit, so counts are consistent
+    values = frappe.db.get_value(
+        DOCTYPE,
+        name,
+        (
+            "reference_doctype",
+            "total_documents",
+            "generated",
+            "failed",
+            "started_on",
+        ),
+        as_dict=True,
+    )
+
+    if error:
+        frappe.get_doc(
+            {
+                "doctype": "GST Bulk Generation Failure",
+                "parent": name,
+                "parenttype": DOCTYPE,
+                "parentfield": "failures",
+                "idx": values.failed,
+                "reference_doctype": values.reference_doctype,
+                "document_name": docname,
+                "error": error,
+                "error_log": error_log,
+            }
+        ).db_insert()
+
+    now = now_datetime()
+    processed = values.generated + values.failed
+    updates = {}
+
+    if seconds := time_diff_in_seconds(now, values.started_on or now):
+        updates["documents_per_minute"] = flt(processed * 60 / seconds, 2)
+
+    if processed >= values.total_documents:
+        updates.update(status="Completed", completed_on=now)
+
+    if updates:
+        frappe.db.set_value(DOCTYPE, name, updates)
+
+    frappe.publish_realtime(
+        "gst_bulk_generation_progress",
+        {
+            "name": name,
+            "total_documents": values.total_documents,
+            "generated": values.generated,
+            "failed": values.failed,
+        },
+        doctype=DOCTYPE,
+        docname=name,
+        after_commit=True,
+    )
@@ -0,0 +1,39 @@
+# Copyright (c) 2024, Resilient Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from india_compliance.gst_india.doctype.gst_bulk_generation_log.gst_bulk_generation_log import (
+    create_bulk_generation_log,
+    fail_bulk_generation,
+    start_bulk_generation,
+    update_bulk_generation_log,
+)
+
+
+class TestGSTBulkGenerationLog(FrappeTestCase):
+    def test_progress(self):
+        name = create_bulk_generation_log("e-Invoice", "Sales Invoice", 2)
+        start_bulk_generation(name)
+
+        update_bulk_generation_log(name, "SINV-00001")
+        log = frappe.get_doc("GST Bulk Generation Log", name)
+        self.assertEqual(log.status, "In Progress")
+        self.assertEqual(log.generated, 1)
+
+        update_bulk_generation_log(name, "SINV-00002", error="Invalid HSN Code")
+        log.reload()
+        self.assertEqual(log.status, "Completed")
+        self.assertEqual(log.failed, 1)
+        self.assertEqual(log.failures[0].document_name, "SINV-00002")
+        self.assertEqual(log.failures[0].error, "Invalid HSN Code")
+
+    def test_failed_generation(self):
+        name = create_bulk_generation_log("Reconciliation Email", "GSTIN", 2)
+        start_bulk_generation(name)
+        fail_bulk_generation(name)
+
+        log = frappe.get_doc("GST Bulk Generation Log", name)
+        self.assertEqual(log.status, "Failed")
+        self.assertTrue(log.completed_on)
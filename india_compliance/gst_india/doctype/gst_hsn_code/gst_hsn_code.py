@@ -1,20 +1,105 @@
 # Copyright (c) 2017, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
 
+from bisect import bisect_left
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
+from frappe.utils.caching import site_cache
 
 from india_compliance.gst_india.utils import (
     get_hsn_settings,
     join_list_with_custom_separators,
 )
 
+# Index is built in each process and rebuilt after these many seconds,
+# as codes may be added or updated by other processes
+INDEX_TTL = 3600
+
 
 class GSTHSNCode(Document):
     def validate(self):
         validate_hsn_code(self.hsn_code)
 
+    def on_update(self):
+        clear_hsn_code_index()
+
+    def on_trash(self):
+        clear_hsn_code_index()
+
+
+class HSNCodeIndex:
+    """
+    Sorted arrays of HSN/SAC codes and their descriptions.
+    Lookups use binary search, and do not query the database.
+    """
+
+    def __init__(self, hsn_codes):
+        """
+        :param hsn_codes: iterable of (hsn_code, description)
+        """
+        hsn_codes = sorted(hsn_codes)
+        self.codes = tuple(code for code, _description in hsn_codes)
+        self.descriptions = tuple(description for _code, description in hsn_codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, hsn_code):
+        return self.get_index(hsn_code) is not None
+
+    def get_index(self, hsn_code):
+        index = bisect_left(self.codes, hsn_code)
+        if index < len(self.codes) and self.codes[index] == hsn_code:
+            return index
+
+    def get_description(self, hsn_code):
+        index = self.get_index(hsn_code)
+        if index is not None:
+            return self.descriptions[index]
+
+    def get_codes_with_prefix(self, prefix, limit=None):
+        """Returns codes starting with `prefix` in ascending order"""
+        codes = []
+
+        for index in range(bisect_left(self.codes, prefix), len(self.codes)):
+            code = self.codes[index]
+            if not code.startswith(prefix) or len(codes) == limit:
+                break
+
+            codes.append(code)
+
+        return codes
+
+
+@site_cache(ttl=INDEX_TTL)
+def get_hsn_code_index():
+    return HSNCodeIndex(
+        frappe.get_all(
+            "GST HSN Code",
+            fields=("hsn_code", "description"),
+            order_by=None,
+            as_list=True,
+        )
+    )
+
+
+def clear_hsn_code_index():
+    """
+    Clears index of this process.
+    Other processes use their index for upto `INDEX_TTL` seconds.
+    """
+    get_hsn_code_index.clear_cache()
+
+
+def hsn_code_exists(hsn_code):
+    if hsn_code in get_hsn_code_index():
+        return True
+
+    # code may have been added after the index was built
+    return bool(frappe.db.exists("GST HSN Code", hsn_code))
+
 
 @frappe.whitelist()
 def update_taxes_in_item_master(taxes, hsn_code):
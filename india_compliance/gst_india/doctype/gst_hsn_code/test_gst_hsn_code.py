@@ -1,8 +1,46 @@
 # Copyright (c) 2017, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-import unittest
+import frappe
+from frappe.tests.utils import FrappeTestCase
 
+from india_compliance.gst_india.doctype.gst_hsn_code.gst_hsn_code import (
+    HSNCodeIndex,
+    get_hsn_code_index,
+    hsn_code_exists,
+)
 
-class TestGSTHSNCode(unittest.TestCase):
-    pass
+
+class TestGSTHSNCode(FrappeTestCase):
+    def test_hsn_code_index(self):
+        index = HSNCodeIndex(
+            [
+                ("998311", "Management consulting"),
+                ("61149090", "Other garments"),
+                ("6114", "Other garments, knitted"),
+                ("61142000", "Of cotton"),
+            ]
+        )
+
+        self.assertEqual(len(index), 4)
+        self.assertIn("6114", index)
+        self.assertNotIn("611", index)
+        self.assertEqual(index.get_description("998311"), "Management consulting")
+        self.assertIsNone(index.get_description("99831"))
+        self.assertEqual(
+            index.get_codes_with_prefix("6114"), ["6114", "61142000", "61149090"]
+        )
+        self.assertEqual(index.get_codes_with_prefix("6114", limit=1), ["6114"])
+        self.assertEqual(index.get_codes_with_prefix("7"), [])
+
+    def test_index_is_updated(self):
+        hsn_code = "99999901"
+        frappe.delete_doc_if_exists("GST HSN Code", hsn_code)
+        self.assertFalse(hsn_code_exists(hsn_code))
+
+        frappe.get_doc(
+            {"doctype": "GST HSN Code", "hsn_code": hsn_code, "description": "Test"}
+        ).insert()
+
+        self.assertIn(hsn_code, get_hsn_code_index())
+        self.assertEqual(get_hsn_code_index().get_description(hsn_code), "Test")
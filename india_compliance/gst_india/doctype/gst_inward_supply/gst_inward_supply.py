@@ -4,9 +4,10 @@
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import get_link_to_form
+from frappe.utils import create_batch, get_link_to_form, getdate
 
 from india_compliance.gst_india.constants import ORIGINAL_VS_AMENDED
+from india_compliance.gst_india.utils import set_cleaner_bill_no
 
 
 class GSTInwardSupply(Document):
@@ -17,29 +18,161 @@ class GSTInwardSupply(Document):
         if self.gstr_1_filing_date:
             self.gstr_1_filled = True
 
+        set_cleaner_bill_no(self, self.bill_date)
+
         if self.match_status != "Amended" and (
             self.other_return_period or self.is_amended
         ):
             update_docs_for_amendment(self)
 
 
-def create_inward_supply(transaction):
-    filters = {
-        "bill_no": transaction.bill_no,
-        "bill_date": transaction.bill_date,
-        "classification": transaction.classification,
-        "supplier_gstin": transaction.supplier_gstin,
-    }
+INWARD_SUPPLY_KEY_FIELDS = ("bill_no", "bill_date", "classification", "supplier_gstin")
+BATCH_SIZE = 1000
 
-    if name := frappe.get_value("GST Inward Supply", filters):
-        gst_inward_supply = frappe.get_doc("GST Inward Supply", name)
-    else:
-        gst_inward_supply = frappe.new_doc("GST Inward Supply")
 
+def create_inward_supplies(transactions):
+    """
+    Create or update Inward Supplies for all transactions of an import.
+
+    - Existing records are resolved with a single keyed lookup.
+    - New records that do not need amendment handling are inserted in bulk.
+    - Others are saved as documents.
+    """
+    existing = get_existing_inward_supplies(transactions)
+    new_docs = {}
+
+    for transaction in transactions:
+        key = get_inward_supply_key(transaction)
+
+        if key in new_docs:
+            # duplicate in the same import
+            new_docs[key].update(transaction)
+
+        elif name := existing.get(key):
+            save_inward_supply(frappe.get_doc("GST Inward Supply", name), transaction)
+
+        elif needs_amendment_handling(transaction):
+            # originals may be pending for insert
+            insert_inward_supplies(new_docs.values())
+            existing.update({_key: doc.name for _key, doc in new_docs.items()})
+            new_docs = {}
+
+            doc = save_inward_supply(frappe.new_doc("GST Inward Supply"), transaction)
+            existing[key] = doc.name
+
+        else:
+            new_docs[key] = get_new_inward_supply(transaction)
+
+    insert_inward_supplies(new_docs.values())
+
+
+def get_existing_inward_supplies(transactions):
+    """
+    Returns dict of names for existing Inward Supplies by
+    (bill_no, bill_date, classification, supplier_gstin).
+
+    Only records with bill nos of the given transactions are read.
+    """
+    bill_nos = {transaction.bill_no for transaction in transactions}
+    supplier_gstins = list({transaction.supplier_gstin for transaction in transactions})
+    classifications = list({transaction.classification for transaction in transactions})
+    existing = {}
+
+    for batch in create_batch(list(bill_nos), BATCH_SIZE):
+        for doc in frappe.get_all(
+            "GST Inward Supply",
+            filters={
+                "bill_no": ("in", batch),
+                "supplier_gstin": ("in", supplier_gstins),
+                "classification": ("in", classifications),
+            },
+            fields=["name", *INWARD_SUPPLY_KEY_FIELDS],
+            order_by="modified desc",
+        ):
+            # same as first record returned by `frappe.get_value`
+            existing.setdefault(get_inward_supply_key(doc), doc.name)
+
+    return existing
+
+
+def get_inward_supply_key(doc):
+    """
+    Returns key of Inward Supply, compared the way the database compares
+    these fields, i.e. ignoring case and trailing spaces of text.
+    """
+    key = []
+
+    for field in INWARD_SUPPLY_KEY_FIELDS:
+        value = doc.get(field)
+
+        if field == "bill_date" and value:
+            value = getdate(value)
+
+        elif isinstance(value, str):
+            value = value.rstrip().casefold()
+
+        key.append(value)
+
+    return tuple(key)
+
+
+def needs_amendment_handling(transaction):
+    return transaction.classification.endswith("A") or transaction.get(
+        "other_return_period"
+    )
+
+
+def save_inward_supply(gst_inward_supply, transaction):
     gst_inward_supply.update(transaction)
     return gst_inward_supply.save(ignore_permissions=True)
 
 
+def get_new_inward_supply(transaction):
+    gst_inward_supply = frappe.new_doc("GST Inward Supply")
+    gst_inward_supply.update(transaction)
+    return gst_inward_supply
+
+
+def insert_inward_supplies(docs):
+    """
+    Insert new Inward Supplies and their items using multi-row INSERTs.
+    Only for documents not requiring amendment handling in `before_save`.
+
+    Only `before_save` is run for these documents. Validation, mandatory
+    and link checks and `doc_events` hooks are skipped, same as any
+    `frappe.db.bulk_insert`.
+    """
+    if not docs:
+        return
+
+    parents = []
+    children = []
+
+    for doc in docs:
+        doc.before_save()
+        doc.set_new_name()
+        doc.set_parent_in_children()
+        doc.set_user_and_timestamp()
+
+        parents.append(doc.get_valid_dict())
+        children.extend(item.get_valid_dict() for item in doc.items)
+
+    for doctype, rows in (
+        ("GST Inward Supply", parents),
+        ("GST Inward Supply Item", children),
+    ):
+        if not rows:
+            continue
+
+        fields = list(rows[0])
+        frappe.db.bulk_insert(
+            doctype,
+            fields=fields,
+            values=[tuple(row.get(field) for field in fields) for row in rows],
+            chunk_size=BATCH_SIZE,
+        )
+
+
 def update_docs_for_amendment(doc):
     fields = [
         "name",
@@ -1,9 +1,47 @@
 # Copyright (c) 2022, Resilient Tech and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from india_compliance.gst_india.doctype.gst_inward_supply.gst_inward_supply import (
+    get_existing_inward_supplies,
+    get_inward_supply_key,
+)
+
 
 class TestGSTInwardSupply(FrappeTestCase):
-    pass
+    def test_inward_supply_key_ignores_case(self):
+        transaction = frappe._dict(
+            bill_no="inv/001 ",
+            bill_date="2023-04-01",
+            classification="B2B",
+            supplier_gstin="24aaqcr8871e1ze",
+        )
+        existing = frappe._dict(
+            bill_no="INV/001",
+            bill_date=frappe.utils.getdate("2023-04-01"),
+            classification="B2B",
+            supplier_gstin="24AAQCR8871E1ZE",
+        )
+
+        self.assertEqual(
+            get_inward_supply_key(transaction), get_inward_supply_key(existing)
+        )
+
+    def test_existing_inward_supplies_of_bill_nos(self):
+        values = {
+            "doctype": "GST Inward Supply",
+            "company_gstin": "24AAQCA8719H1ZC",
+            "supplier_gstin": "24AABCR6898M1ZN",
+            "bill_date": "2023-04-01",
+            "classification": "B2B",
+        }
+        imported = frappe.get_doc({**values, "bill_no": "TEST-IS-1"}).insert()
+        frappe.get_doc({**values, "bill_no": "TEST-IS-2"}).insert()
+
+        existing = get_existing_inward_supplies(
+            [frappe._dict(values, bill_no="test-is-1")]
+        )
+
+        self.assertEqual(list(existing.values()), [imported.name])
@@ -16,9 +16,14 @@ from india_compliance.gst_india.page.india_compliance_account import (
     _disable_api_promo,
     post_login,
 )
-from india_compliance.gst_india.utils import can_enable_api, is_api_enabled
+from india_compliance.gst_india.utils import (
+    can_enable_api,
+    clear_gst_account_index,
+    is_api_enabled,
+)
 from india_compliance.gst_india.utils.custom_fields import toggle_custom_fields
 from india_compliance.gst_india.utils.gstin_info import get_gstin_info
+from india_compliance.gst_india.utils.validation_context import clear_validation_context
 
 E_INVOICE_START_DATE = "2021-01-01"
 
@@ -50,9 +55,14 @@ class GSTSettings(Document):
 
     def on_update(self):
         self.update_custom_fields()
+        clear_gst_account_index()
+        clear_validation_context()
         # clear session boot cache
         frappe.cache.delete_keys("bootinfo")
 
+        # index could be rebuilt from stale settings before they are committed
+        frappe.db.after_commit.add(clear_gst_account_index)
+
     def update_retry_e_invoice_scheduled_job(self):
         if not self.has_value_changed("enable_retry_e_invoice_generation"):
             return
@@ -1,8 +1,28 @@
 # Copyright (c) 2018, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-import unittest
+import frappe
+from frappe.tests.utils import FrappeTestCase
 
+from india_compliance.gst_india.utils import (
+    get_gst_account_fields_by_type,
+    get_gst_account_index,
+    get_gst_accounts_by_type,
+)
 
-class TestGSTSettings(unittest.TestCase):
-    pass
+
+class TestGSTSettings(FrappeTestCase):
+    def test_gst_account_index(self):
+        company = "_Test Indian Registered Company"
+        accounts = get_gst_accounts_by_type(company, "Output")
+
+        self.assertEqual(
+            get_gst_account_fields_by_type(company, "Output")[accounts.igst_account],
+            "igst_account",
+        )
+
+        frappe.get_doc("GST Settings").save()
+        self.assertIsNone(frappe.cache.get_value("ic_gst_account_index"))
+        self.assertDictEqual(
+            get_gst_account_index()["accounts"][(company, "Output")], accounts
+        )
@@ -1,11 +1,25 @@
 # Copyright (c) 2023, Resilient Tech and contributors
 # For license information, please see license.txt
 
+import math
+from collections import Counter, defaultdict
+from functools import partial
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import date_diff, format_date, get_datetime
+from frappe.utils import (
+    add_to_date,
+    cint,
+    create_batch,
+    date_diff,
+    flt,
+    format_date,
+    get_datetime,
+)
+from frappe.utils.caching import site_cache
 
+from india_compliance.gst_india.api_classes.base import wait_for_rate_limit
 from india_compliance.gst_india.api_classes.e_invoice import EInvoiceAPI
 from india_compliance.gst_india.api_classes.public import PublicAPI
 from india_compliance.gst_india.utils import (
@@ -24,16 +38,62 @@ GSTIN_STATUS = {
 
 GSTIN_BLOCK_STATUS = {"U": 0, "B": 1}
 
+# Active and Cancelled statuses are refreshed as per GST Settings,
+# others are likely to change and are refreshed after these many seconds
+TRANSIENT_STATUS_REFRESH_INTERVAL = 3600
+
+# Details are cached in each process for a short while,
+# as they may be updated by other processes
+LOCAL_CACHE_TTL = 60
+LOCAL_CACHE_SIZE = 1024
+CACHE_TTL = 86400
+
+# Lookups are counted in each process and added to Redis in batches
+CACHE_METRICS = ("lookups", "redis", "table", "missing")
+CACHE_METRICS_FLUSH_SIZE = 100
+
+# Stale GSTINs refreshed by the scheduler in each sweep
+REFRESH_BATCH_SIZE = 500
+REFRESH_WORKERS = 4
+REFRESH_RATE_LIMIT = 5  # requests per second
+
+# GSTINs that failed to refresh are skipped by the sweep for these many seconds
+REFRESH_FAILURE_BACKOFF = 86400
+
+GSTIN_FIELDS = (
+    "gstin",
+    "status",
+    "registration_date",
+    "cancelled_date",
+    "is_blocked",
+    "last_updated_on",
+)
+
+_cache_lookups = defaultdict(Counter)
+
 
 class GSTIN(Document):
     def before_save(self):
         self.status = GSTIN_STATUS.get(self.status, self.status)
         self.is_blocked = GSTIN_BLOCK_STATUS.get(self.is_blocked, 0)
         self.last_updated_on = get_datetime()
+        self.last_refresh_failed_on = None
 
         if not self.cancelled_date and self.status == "Cancelled":
             self.cancelled_date = self.registration_date
 
+    def on_update(self):
+        self.clear_cache()
+
+    def on_trash(self):
+        self.clear_cache()
+
+    def clear_cache(self):
+        clear_gstin_cache(self.gstin)
+
+        # other processes could cache details read before commit
+        frappe.db.after_commit.add(partial(clear_gstin_cache, self.gstin))
+
     @frappe.whitelist()
     def update_gstin_status(self):
         """
@@ -55,10 +115,7 @@ def get_gstin_status(
     if not int(force_update) and not is_status_refresh_required(
         gstin, transaction_date
     ):
-        if not frappe.db.exists("GSTIN", gstin):
-            return
-
-        return frappe.get_doc("GSTIN", gstin)
+        return get_cached_gstin(gstin)
 
     return get_updated_gstin(gstin, transaction_date, is_request_from_ui)
 
@@ -202,23 +259,248 @@ def is_status_refresh_required(gstin, transaction_date):
     settings = frappe.get_cached_doc("GST Settings")
 
     if (
-        not settings.validate_gstin_status
-        or not is_api_enabled(settings)
-        or settings.sandbox_mode
+        not is_status_validation_enabled(settings)
         or not transaction_date  # not from transactions
         or frappe.cache.get_value(gstin)
     ):
         return
 
-    doc = frappe.db.get_value(
-        "GSTIN", gstin, ["last_updated_on", "status"], as_dict=True
+    if not (gstin_details := get_cached_gstin(gstin)):
+        return True
+
+    return get_datetime() >= get_status_refresh_due_on(gstin_details, settings)
+
+
+def is_status_validation_enabled(settings):
+    return (
+        settings.validate_gstin_status
+        and is_api_enabled(settings)
+        and not settings.sandbox_mode
     )
 
-    if not doc or doc.status not in ("Active", "Cancelled"):
-        return True
 
-    days_since_last_update = date_diff(get_datetime(), doc.get("last_updated_on"))
-    return days_since_last_update >= settings.gstin_status_refresh_interval
+def get_status_refresh_due_on(gstin_details, settings):
+    return add_to_date(
+        gstin_details.last_updated_on,
+        seconds=get_status_refresh_interval(gstin_details.status, settings),
+        as_datetime=True,
+    )
+
+
+def get_status_refresh_interval(status, settings):
+    """Returns seconds after which status of a GSTIN is to be refreshed"""
+    if status in ("Active", "Cancelled"):
+        return cint(settings.gstin_status_refresh_interval) * 86400
+
+    return TRANSIENT_STATUS_REFRESH_INTERVAL
+
+
+#######################################################################################
+### GSTIN Details Cache ###############################################################
+#######################################################################################
+
+
+def get_cached_gstin(gstin):
+    """
+    Returns details of GSTIN from the cache of this process, Redis or the GSTIN
+    table, in that order. Returns None if GSTIN is not found.
+    """
+    record_cache_lookup("lookups")
+
+    if gstin_details := _get_cached_gstin(gstin):
+        # cached dict is shared by callers in this process
+        return gstin_details.copy()
+
+
+@site_cache(ttl=LOCAL_CACHE_TTL, maxsize=LOCAL_CACHE_SIZE)
+def _get_cached_gstin(gstin):
+    key = get_gstin_cache_key(gstin)
+
+    if gstin_details := frappe.cache.get_value(key, expires=True):
+        record_cache_lookup("redis")
+        return gstin_details
+
+    gstin_details = frappe.db.get_value("GSTIN", gstin, GSTIN_FIELDS, as_dict=True)
+    if not gstin_details:
+        record_cache_lookup("missing")
+        return
+
+    record_cache_lookup("table")
+    gstin_details.update(doctype="GSTIN", name=gstin)
+    frappe.cache.set_value(key, gstin_details, expires_in_sec=CACHE_TTL)
+
+    return gstin_details
+
+
+def clear_gstin_cache(*gstins):
+    """
+    Clears cached details of GSTINs from Redis and this process.
+    Other processes use their cached details for upto `LOCAL_CACHE_TTL` seconds.
+    """
+    frappe.cache.delete_value([get_gstin_cache_key(gstin) for gstin in gstins])
+    _get_cached_gstin.clear_cache()
+
+
+def get_gstin_cache_key(gstin):
+    return f"ic_gstin:{gstin}"
+
+
+def record_cache_lookup(metric):
+    lookups = _cache_lookups[frappe.local.site]
+    lookups[metric] += 1
+
+    if lookups["lookups"] >= CACHE_METRICS_FLUSH_SIZE:
+        flush_cache_lookups()
+
+
+def flush_cache_lookups():
+    if not (lookups := _cache_lookups.pop(frappe.local.site, None)):
+        return
+
+    for metric, count in lookups.items():
+        frappe.cache.incrby(get_cache_metric_key(metric), count)
+
+
+def get_cache_metric_key(metric):
+    return frappe.cache.make_key(f"ic_gstin_cache:{metric}")
+
+
+def get_cache_metrics(reset=False):
+    """
+    Returns lookups of GSTIN details and the share served by each cache.
+    Lookups yet to be flushed by other processes are not included.
+    """
+    flush_cache_lookups()
+
+    counts = {}
+    for metric in CACHE_METRICS:
+        key = get_cache_metric_key(metric)
+        counts[metric] = cint(frappe.cache.get(key))
+
+        if reset:
+            frappe.cache.delete(key)
+
+    lookups = counts.pop("lookups")
+    local = max(lookups - sum(counts.values()), 0)
+
+    return {
+        "lookups": lookups,
+        "local": local,
+        **counts,
+        "hit_rate": flt((local + counts["redis"]) / lookups, 4) if lookups else None,
+    }
+
+
+@frappe.whitelist()
+def get_gstin_status_cache_metrics():
+    frappe.has_permission("GST Settings", throw=True)
+
+    return {
+        **get_cache_metrics(),
+        "last_sweep": frappe.cache.get_value("ic_gstin_status_sweep"),
+    }
+
+
+#######################################################################################
+### Scheduled Status Refresh ##########################################################
+#######################################################################################
+
+
+def refresh_stale_gstin_statuses():
+    """
+    Enqueues refresh of GSTINs that are due for refresh, split across jobs.
+    Called hourly by the scheduler, which also reports the cache hit rate.
+    """
+    settings = frappe.get_cached_doc("GST Settings")
+    if not is_status_validation_enabled(settings):
+        return
+
+    gstins = get_stale_gstins(
+        settings, cint(frappe.conf.ic_gstin_refresh_batch_size) or REFRESH_BATCH_SIZE
+    )
+
+    frappe.cache.set_value(
+        "ic_gstin_status_sweep",
+        {
+            "swept_on": get_datetime(),
+            "stale_gstins": len(gstins),
+            "cache": get_cache_metrics(reset=True),
+        },
+    )
+
+    if not gstins:
+        return
+
+    workers = cint(frappe.conf.ic_gstin_refresh_workers) or REFRESH_WORKERS
+    for batch in create_batch(gstins, math.ceil(len(gstins) / workers)):
+        frappe.enqueue(
+            "india_compliance.gst_india.doctype.gstin.gstin.refresh_gstin_statuses",
+            queue="long",
+            gstins=batch,
+        )
+
+
+def get_stale_gstins(settings, limit):
+    """Returns GSTINs due for refresh, least recently updated first"""
+    gstin = frappe.qb.DocType("GSTIN")
+    now = get_datetime()
+
+    def get_due_condition(statuses, interval):
+        return gstin.status.isin(statuses) & (
+            gstin.last_updated_on
+            < add_to_date(now, seconds=-interval, as_datetime=True)
+        )
+
+    final_statuses = ("Active", "Cancelled")
+    transient_statuses = tuple(
+        status for status in GSTIN_STATUS.values() if status not in final_statuses
+    )
+
+    return (
+        frappe.qb.from_(gstin)
+        .select(gstin.name)
+        .where(
+            get_due_condition(
+                final_statuses, get_status_refresh_interval("Active", settings)
+            )
+            | get_due_condition(transient_statuses, TRANSIENT_STATUS_REFRESH_INTERVAL)
+            | gstin.last_updated_on.isnull()
+        )
+        # back off from GSTINs that failed to refresh, e.g. invalid GSTINs
+        .where(
+            gstin.last_refresh_failed_on.isnull()
+            | (
+                gstin.last_refresh_failed_on
+                < add_to_date(now, seconds=-REFRESH_FAILURE_BACKOFF, as_datetime=True)
+            )
+        )
+        .orderby(gstin.last_updated_on)
+        .limit(limit)
+        .run(pluck=True)
+    )
+
+
+def refresh_gstin_statuses(gstins):
+    """
+    Refreshes status of given GSTINs. Requests are rate-limited across jobs
+    using `ic_gstin_refresh_rate_limit`, to leave room for other API calls.
+    """
+    rate_limit = cint(frappe.conf.ic_gstin_refresh_rate_limit) or REFRESH_RATE_LIMIT
+
+    for gstin in gstins:
+        wait_for_rate_limit("gstin_status_refresh", rate_limit)
+
+        # errors are logged while fetching status
+        if not create_or_update_gstin_status(gstin):
+            frappe.db.set_value(
+                "GSTIN",
+                gstin,
+                "last_refresh_failed_on",
+                get_datetime(),
+                update_modified=False,
+            )
+
+        frappe.db.commit()  # nosemgrep
 
 
 def get_formatted_response(response):
@@ -1,9 +1,53 @@
 # Copyright (c) 2023, Resilient Tech and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, get_datetime
+
+from india_compliance.gst_india.doctype.gstin.gstin import (
+    TRANSIENT_STATUS_REFRESH_INTERVAL,
+    get_cached_gstin,
+    get_stale_gstins,
+    get_status_refresh_interval,
+)
 
 
 class TestGSTIN(FrappeTestCase):
-    pass
+    def test_status_refresh_interval(self):
+        settings = frappe._dict(gstin_status_refresh_interval=30)
+
+        self.assertEqual(get_status_refresh_interval("Active", settings), 30 * 86400)
+        self.assertEqual(
+            get_status_refresh_interval("Suspended", settings),
+            TRANSIENT_STATUS_REFRESH_INTERVAL,
+        )
+
+    def test_cached_gstin_is_updated(self):
+        gstin = "24AAUPV7468F1ZW"
+        frappe.delete_doc_if_exists("GSTIN", gstin)
+        self.assertIsNone(get_cached_gstin(gstin))
+
+        doc = frappe.get_doc({"doctype": "GSTIN", "gstin": gstin, "status": "ACT"})
+        doc.insert()
+        self.assertEqual(get_cached_gstin(gstin).status, "Active")
+
+        doc.status = "SUS"
+        doc.save()
+        self.assertEqual(get_cached_gstin(gstin).status, "Suspended")
+
+    def test_failed_refresh_is_skipped(self):
+        gstin = "24AAUPV7468F1ZW"
+        frappe.delete_doc_if_exists("GSTIN", gstin)
+
+        doc = frappe.get_doc({"doctype": "GSTIN", "gstin": gstin, "status": "ACT"})
+        doc.insert()
+        doc.db_set(
+            "last_updated_on", add_to_date(get_datetime(), days=-60, as_datetime=True)
+        )
+
+        settings = frappe._dict(gstin_status_refresh_interval=30)
+        self.assertIn(gstin, get_stale_gstins(settings, 1000))
+
+        doc.db_set("last_refresh_failed_on", get_datetime())
+        self.assertNotIn(gstin, get_stale_gstins(settings, 1000))
@@ -0,0 +1,8 @@
+// Copyright (c) 2024, Resilient Tech and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("GSTIN Info Archive", {
+    refresh(frm) {
+        frm.disable_form();
+    },
+});
@@ -0,0 +1,186 @@
+# Copyright (c) 2024, Resilient Tech and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, get_datetime, now_datetime
+
+DOCTYPE = "GSTIN Info Archive"
+
+# Integration Requests read in each query while warming up the archive
+WARM_UP_BATCH_SIZE = 1000
+
+
+class GSTINInfoArchive(Document):
+    pass
+
+
+def get_archive_days():
+    return cint(
+        frappe.get_cached_value("GST Settings", None, "archive_party_info_days")
+    )
+
+
+def get_archived_gstin_info(gstin):
+    """
+    Returns archived response of GSTIN search if it is not older than
+    `archive_party_info_days` in GST Settings.
+    """
+    if not (archive_days := get_archive_days()):
+        return
+
+    archive = frappe.db.get_value(
+        DOCTYPE, gstin, ("response", "fetched_on"), as_dict=True
+    )
+
+    if not archive or get_datetime(archive.fetched_on) < get_archive_date_limit(
+        archive_days
+    ):
+        return
+
+    return frappe.parse_json(archive.response)
+
+
+def archive_gstin_info(gstin, response):
+    """Saves response of GSTIN search, replacing the existing one"""
+    if not get_archive_days():
+        return
+
+    values = {"response": json.dumps(response), "fetched_on": now_datetime()}
+
+    if frappe.db.exists(DOCTYPE, gstin):
+        frappe.db.set_value(DOCTYPE, gstin, values)
+        return
+
+    frappe.get_doc({"doctype": DOCTYPE, "gstin": gstin, **values}).insert(
+        ignore_permissions=True, ignore_if_duplicate=True
+    )
+
+
+def delete_expired_gstin_info():
+    """Deletes responses older than `archive_party_info_days`, called daily"""
+    frappe.db.delete(
+        DOCTYPE, {"fetched_on": ("<", get_archive_date_limit(get_archive_days()))}
+    )
+
+
+def get_archive_date_limit(archive_days):
+    return add_days(now_datetime(), -archive_days)
+
+
+def warm_up_archive():
+    """
+    Archives latest responses of GSTIN search from Integration Requests
+    in `archive_party_info_days`. Responses already archived are kept.
+
+    Latest request of each GSTIN is found using request parameters, read in
+    batches ordered by name so that large tables are not scanned by offset.
+    Responses are then read only for these requests.
+    """
+    if not (archive_days := get_archive_days()):
+        return
+
+    # imported here as PublicAPI archives responses using this module
+    from india_compliance.gst_india.api_classes.base import BASE_URL
+    from india_compliance.gst_india.api_classes.public import PublicAPI
+
+    integration_request = frappe.qb.DocType("Integration Request")
+    query = (
+        frappe.qb.from_(integration_request)
+        .select(
+            integration_request.name,
+            integration_request.data,
+            integration_request.modified,
+        )
+        .where(integration_request.status == "Completed")
+        .where(integration_request.url == f"{BASE_URL}/{PublicAPI.BASE_PATH}/search")
+        .where(integration_request.modified > get_archive_date_limit(archive_days))
+        .orderby(integration_request.name)
+        .limit(WARM_UP_BATCH_SIZE)
+    )
+
+    archived = set(frappe.get_all(DOCTYPE, pluck="name"))
+    latest_requests = {}
+    last_name = ""
+
+    while requests := query.where(integration_request.name > last_name).run(
+        as_dict=True
+    ):
+        last_name = requests[-1].name
+
+        for request in requests:
+            gstin = frappe.parse_json(request.data or "{}").get("gstin")
+            if not gstin or gstin in archived:
+                continue
+
+            latest_request = latest_requests.get(gstin)
+            if not latest_request or latest_request.modified < request.modified:
+                latest_requests[gstin] = request
+
+    requests = list(latest_requests.values())
+    for index in range(0, len(requests), WARM_UP_BATCH_SIZE):
+        create_archives(requests[index : index + WARM_UP_BATCH_SIZE])
+
+
+def create_archives(requests):
+    outputs = dict(
+        frappe.get_all(
+            "Integration Request",
+            filters={"name": ("in", [request.name for request in requests])},
+            fields=("name", "output"),
+            as_list=True,
+        )
+    )
+
+    user = frappe.session.user
+    now = now_datetime()
+    values = []
+
+    for request in requests:
+        if not (response := get_response(outputs.get(request.name))):
+            continue
+
+        values.append(
+            (
+                response.gstin,
+                now,
+                now,
+                user,
+                user,
+                response.gstin,
+                json.dumps(response),
+                request.modified,
+            )
+        )
+
+    if not values:
+        return
+
+    frappe.db.bulk_insert(
+        DOCTYPE,
+        (
+            "name",
+            "creation",
+            "modified",
+            "owner",
+            "modified_by",
+            "gstin",
+            "response",
+            "fetched_on",
+        ),
+        values,
+        ignore_duplicates=True,
+    )
+
+
+def get_response(output):
+    try:
+        output = json.loads(output or "{}", object_hook=frappe._dict)
+    except ValueError:
+        # output was truncated while logging
+        return
+
+    if (response := output.get("result")) and response.get("gstin"):
+        return response
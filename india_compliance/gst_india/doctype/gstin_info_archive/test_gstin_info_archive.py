@@ -0,0 +1,49 @@
+# Copyright (c) 2024, Resilient Tech and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase, change_settings
+from frappe.utils import add_days, now_datetime
+
+from india_compliance.gst_india.api_classes.base import BASE_URL
+from india_compliance.gst_india.doctype.gstin_info_archive.gstin_info_archive import (
+    archive_gstin_info,
+    delete_expired_gstin_info,
+    get_archived_gstin_info,
+    warm_up_archive,
+)
+from india_compliance.gst_india.utils.api import create_integration_request
+
+DOCTYPE = "GSTIN Info Archive"
+GSTIN = "24AAUPV7468F1ZW"
+
+
+class TestGSTINInfoArchive(FrappeTestCase):
+    def setUp(self):
+        frappe.db.delete(DOCTYPE)
+
+    @change_settings("GST Settings", {"archive_party_info_days": 7})
+    def test_archived_gstin_info(self):
+        self.assertIsNone(get_archived_gstin_info(GSTIN))
+
+        archive_gstin_info(GSTIN, {"gstin": GSTIN, "sts": "Active"})
+        archive_gstin_info(GSTIN, {"gstin": GSTIN, "sts": "Cancelled"})
+        self.assertEqual(get_archived_gstin_info(GSTIN).sts, "Cancelled")
+
+        frappe.db.set_value(DOCTYPE, GSTIN, "fetched_on", add_days(now_datetime(), -8))
+        self.assertIsNone(get_archived_gstin_info(GSTIN))
+
+        delete_expired_gstin_info()
+        self.assertFalse(frappe.db.exists(DOCTYPE, GSTIN))
+
+    @change_settings("GST Settings", {"archive_party_info_days": 7})
+    def test_warm_up_archive(self):
+        for status in ("Active", "Cancelled"):
+            create_integration_request(
+                url=f"{BASE_URL}/commonapi/search",
+                data={"action": "TP", "gstin": GSTIN},
+                output={"success": True, "result": {"gstin": GSTIN, "sts": status}},
+            )
+
+        warm_up_archive()
+        self.assertEqual(get_archived_gstin_info(GSTIN).sts, "Cancelled")
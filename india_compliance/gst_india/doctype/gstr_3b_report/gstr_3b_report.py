@@ -8,9 +8,8 @@ import os
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.query_builder import DatePart
-from frappe.query_builder.functions import Extract, Sum
-from frappe.utils import cstr, flt, get_date_str, get_first_day, get_last_day
+from frappe.query_builder.functions import Sum
+from frappe.utils import cstr, flt, get_first_day, get_last_day
 
 from india_compliance.gst_india.constants import INVOICE_DOCTYPES
 from india_compliance.gst_india.report.gstr_3b_details.gstr_3b_details import (
@@ -20,6 +19,14 @@ from india_compliance.gst_india.utils import (
     get_gst_accounts_by_type,
     is_overseas_transaction,
 )
+from india_compliance.gst_india.utils.item_gst_summary import get_item_gst_query
+
+NIL_OR_EXEMPT_TREATMENTS = ("Nil-Rated", "Exempted")
+INTER_STATE_SUPPLY_CATEGORIES = (
+    "Unregistered",
+    "Registered Composition",
+    "UIN Holders",
+)
 
 
 class GSTR3BReport(Document):
@@ -33,12 +40,11 @@ class GSTR3BReport(Document):
         self.report_dict["gstin"] = self.gst_details.get("gstin")
         self.report_dict["ret_period"] = get_period(self.month, self.year)
         self.month_no = get_period(self.month)
+        self.from_date = get_first_day(f"{self.year}-{self.month_no}-01")
+        self.to_date = get_last_day(self.from_date)
         self.account_heads = self.get_account_heads()
 
-        self.get_outward_supply_details("Sales Invoice")
         self.set_outward_taxable_supplies()
-
-        self.get_outward_supply_details("Purchase Invoice", reverse_charge=True)
         self.set_supplies_liable_to_reverse_charge()
 
         itc_details = self.get_itc_details()
@@ -201,10 +207,7 @@ class GSTR3BReport(Document):
                 .join(boe_taxes)
                 .on(boe_taxes.parent == boe.name)
                 .where(
-                    boe.posting_date.between(
-                        get_date_str(get_first_day(f"{self.year}-{self.month_no}-01")),
-                        get_date_str(get_last_day(f"{self.year}-{self.month_no}-01")),
-                    )
+                    boe.posting_date.between(self.from_date, self.to_date)
                     & boe.company_gstin.eq(self.gst_details.get("gstin"))
                     & boe.docstatus.eq(1)
                     & boe_taxes.account_head.eq(gst_accounts[account_type])
@@ -263,26 +266,18 @@ class GSTR3BReport(Document):
 
         return inward_nil_exempt_details
 
-    def get_outward_supply_details(self, doctype, reverse_charge=None):
-        self.get_outward_tax_invoices(doctype, reverse_charge=reverse_charge)
-        self.get_outward_items(doctype)
-        self.get_outward_tax_details(doctype)
-
-    def get_outward_tax_invoices(self, doctype, reverse_charge=None):
-        self.invoice_map = {}
+    def get_item_gst_details(self, doctype, group_by, reverse_charge=False):
+        """
+        Returns taxable value and GST amounts of items of invoices in the period,
+        summed by `group_by` as per `get_item_gst_query`.
 
+        Rows are aggregated in the database, so their number depends on
+        distinct values of `group_by` and not on number of invoices.
+        """
         invoice = frappe.qb.DocType(doctype)
-        fields = [invoice.name, invoice.gst_category, invoice.place_of_supply]
-
-        if doctype == "Sales Invoice":
-            fields.append(invoice.is_export_with_gst)
-
         query = (
-            frappe.qb.from_(invoice)
-            .select(*fields)
-            .where(invoice.docstatus == 1)
-            .where(Extract(DatePart.month, invoice.posting_date).eq(self.month_no))
-            .where(Extract(DatePart.year, invoice.posting_date).eq(self.year))
+            get_item_gst_query(doctype, group_by)
+            .where(invoice.posting_date.between(self.from_date, self.to_date))
             .where(invoice.company == self.company)
             .where(invoice.company_gstin == self.gst_details.get("gstin"))
             .where(invoice.is_opening == "No")
@@ -291,244 +286,92 @@ class GSTR3BReport(Document):
         if reverse_charge:
             query = query.where(invoice.is_reverse_charge == 1)
 
-        invoice_details = query.orderby(invoice.name).run(as_dict=True)
-        self.invoice_map = {d.name: d for d in invoice_details}
-
-    def get_outward_items(self, doctype):
-        self.invoice_items = frappe._dict()
-        self.is_nil_or_exempt = []
-        self.is_non_gst = []
-
-        if not self.invoice_map:
-            return
-
-        item_details = frappe.db.sql(
-            f"""
-            SELECT
-                item_code, parent, taxable_value, item_tax_rate,
-                gst_treatment
-            FROM
-                `tab{doctype} Item`
-            WHERE parent in ({", ".join(["%s"] * len(self.invoice_map))})
-            """,
-            tuple(self.invoice_map),
-            as_dict=1,
-        )
-
-        for d in item_details:
-            self.invoice_items.setdefault(d.parent, {}).setdefault(d.item_code, 0.0)
-            self.invoice_items[d.parent][d.item_code] += d.get("taxable_value", 0)
+        return query.run(as_dict=True)
 
-            is_nil_rated = d.gst_treatment == "Nil-Rated"
-            is_exempted = d.gst_treatment == "Exempted"
-            is_non_gst = d.gst_treatment == "Non-GST"
-
-            if (
-                is_nil_rated or is_exempted
-            ) and d.item_code not in self.is_nil_or_exempt:
-                self.is_nil_or_exempt.append(d.item_code)
+    def set_outward_taxable_supplies(self):
+        sup_details = self.report_dict["sup_details"]
+        inter_state_supply_details = {}
 
-            if is_non_gst and d.item_code not in self.is_non_gst:
-                self.is_non_gst.append(d.item_code)
+        for row in self.get_item_gst_details(
+            "Sales Invoice",
+            (
+                "gst_category",
+                "place_of_supply",
+                "is_export_with_gst",
+                "gst_treatment",
+                "gst_rate",
+                "igst_rate",
+            ),
+        ):
+            gst_category = row.gst_category
+            place_of_supply = row.place_of_supply or "00-Other Territory"
+            taxable_value = flt(row.taxable_value, 2)
+
+            sup_details["osup_det"]["csamt"] += flt(
+                flt(row.cess_amount) + flt(row.cess_non_advol_amount), 2
+            )
 
-    def get_outward_tax_details(self, doctype):
-        if doctype == "Sales Invoice":
-            tax_template = "Sales Taxes and Charges"
-        elif doctype == "Purchase Invoice":
-            tax_template = "Purchase Taxes and Charges"
+            if row.gst_treatment in NIL_OR_EXEMPT_TREATMENTS:
+                sup_details["osup_nil_exmp"]["txval"] += taxable_value
 
-        self.items_based_on_tax_rate = {}
-        self.invoice_cess = frappe._dict()
-        self.cgst_sgst_invoices = []
+            elif row.gst_treatment == "Non-GST":
+                sup_details["osup_nongst"]["txval"] += taxable_value
 
-        if not self.invoice_map:
-            return
+            elif (
+                is_overseas_transaction("Sales Invoice", gst_category, place_of_supply)
+                and not row.is_export_with_gst
+            ):
+                sup_details["osup_zero"]["txval"] += taxable_value
+
+            elif row.gst_rate:
+                self.update_tax_details(sup_details["osup_det"], row)
+
+                if (
+                    row.igst_rate
+                    and gst_category in INTER_STATE_SUPPLY_CATEGORIES
+                    and self.gst_details.get("gst_state")
+                    != place_of_supply.split("-")[1]
+                ):
+                    supply_details = inter_state_supply_details.setdefault(
+                        (gst_category, place_of_supply),
+                        {
+                            "txval": 0.0,
+                            "pos": place_of_supply.split("-")[0],
+                            "iamt": 0.0,
+                        },
+                    )
+                    supply_details["txval"] += taxable_value
+                    supply_details["iamt"] += flt(row.igst_amount, 2)
 
-        tax_details = frappe.db.sql(
-            f"""
-            SELECT
-                parent, account_head, item_wise_tax_detail, base_tax_amount_after_discount_amount
-            FROM `tab{tax_template}`
-            WHERE
-                parenttype = %s and docstatus = 1
-                and parent in ({", ".join(["%s"] * len(self.invoice_map))})
-            ORDER BY account_head
-            """,
-            (doctype, *self.invoice_map.keys()),
-        )
+        self.set_inter_state_supply(inter_state_supply_details)
 
-        for parent, account, item_wise_tax_detail, tax_amount in tax_details:
-            if account in self.account_heads.get("csamt"):
-                self.invoice_cess.setdefault(parent, tax_amount)
-            else:
-                if item_wise_tax_detail:
-                    try:
-                        item_wise_tax_detail = json.loads(item_wise_tax_detail)
-                        cgst_or_sgst = False
-                        if account in self.account_heads.get(
-                            "camt"
-                        ) or account in self.account_heads.get("samt"):
-                            cgst_or_sgst = True
-
-                        for item_code, tax_amounts in item_wise_tax_detail.items():
-                            if not (
-                                cgst_or_sgst
-                                or account in self.account_heads.get("iamt")
-                                or (
-                                    item_code in self.is_non_gst + self.is_nil_or_exempt
-                                )
-                            ):
-                                continue
-
-                            tax_rate = tax_amounts[0]
-                            if tax_rate:
-                                if cgst_or_sgst:
-                                    tax_rate *= 2
-                                    if parent not in self.cgst_sgst_invoices:
-                                        self.cgst_sgst_invoices.append(parent)
-
-                                rate_based_dict = (
-                                    self.items_based_on_tax_rate.setdefault(
-                                        parent, {}
-                                    ).setdefault(tax_rate, [])
-                                )
-                                if item_code not in rate_based_dict:
-                                    rate_based_dict.append(item_code)
-                    except ValueError:
-                        continue
+    def set_supplies_liable_to_reverse_charge(self):
+        isup_rev = self.report_dict["sup_details"]["isup_rev"]
 
-        # Build itemised tax for export invoices, nil and exempted where tax table is blank
-        for invoice, items in self.invoice_items.items():
-            invoice_details = self.invoice_map.get(invoice, {})
+        for row in self.get_item_gst_details(
+            "Purchase Invoice",
+            ("gst_category", "place_of_supply", "gst_treatment", "gst_rate"),
+            reverse_charge=True,
+        ):
             if (
-                invoice not in self.items_based_on_tax_rate
-                and not invoice_details.get("is_export_with_gst")
-                and is_overseas_transaction(
-                    "Sales Invoice",
-                    invoice_details.get("gst_category"),
-                    invoice_details.get("place_of_supply"),
+                row.gst_treatment == "Taxable"
+                and not row.gst_rate
+                and not is_overseas_transaction(
+                    "Purchase Invoice", row.gst_category, row.place_of_supply
                 )
             ):
-                self.items_based_on_tax_rate.setdefault(invoice, {}).setdefault(
-                    0, items.keys()
-                )
-            else:
-                for item in items.keys():
-                    if (
-                        item in self.is_nil_or_exempt + self.is_non_gst
-                        and item
-                        not in self.items_based_on_tax_rate.get(invoice, {}).get(0, [])
-                    ):
-                        self.items_based_on_tax_rate.setdefault(invoice, {}).setdefault(
-                            0, []
-                        )
-                        self.items_based_on_tax_rate[invoice][0].append(item)
+                continue
 
-    def set_outward_taxable_supplies(self):
-        inter_state_supply_details = {}
-
-        for inv, items_based_on_rate in self.items_based_on_tax_rate.items():
-            invoice_details = self.invoice_map.get(inv, {})
-            gst_category = invoice_details.get("gst_category")
-            place_of_supply = (
-                invoice_details.get("place_of_supply") or "00-Other Territory"
+            self.update_tax_details(isup_rev, row)
+            isup_rev["csamt"] += flt(
+                flt(row.cess_amount) + flt(row.cess_non_advol_amount), 2
             )
 
-            for rate, items in items_based_on_rate.items():
-                for item_code, taxable_value in self.invoice_items.get(inv).items():
-                    if item_code in items:
-                        if item_code in self.is_nil_or_exempt:
-                            self.report_dict["sup_details"]["osup_nil_exmp"][
-                                "txval"
-                            ] += taxable_value
-                        elif item_code in self.is_non_gst:
-                            self.report_dict["sup_details"]["osup_nongst"][
-                                "txval"
-                            ] += taxable_value
-                        elif rate == 0 or (
-                            is_overseas_transaction(
-                                "Sales Invoice", gst_category, place_of_supply
-                            )
-                            and not invoice_details.get("is_export_with_gst")
-                        ):
-                            self.report_dict["sup_details"]["osup_zero"][
-                                "txval"
-                            ] += taxable_value
-                        else:
-                            if inv in self.cgst_sgst_invoices:
-                                tax_rate = rate / 2
-                                self.report_dict["sup_details"]["osup_det"][
-                                    "camt"
-                                ] += flt(taxable_value * tax_rate / 100, 2)
-                                self.report_dict["sup_details"]["osup_det"][
-                                    "samt"
-                                ] += flt(taxable_value * tax_rate / 100, 2)
-                                self.report_dict["sup_details"]["osup_det"][
-                                    "txval"
-                                ] += flt(taxable_value, 2)
-                            else:
-                                self.report_dict["sup_details"]["osup_det"][
-                                    "iamt"
-                                ] += flt(taxable_value * rate / 100, 2)
-                                self.report_dict["sup_details"]["osup_det"][
-                                    "txval"
-                                ] += flt(taxable_value, 2)
-
-                                if (
-                                    gst_category
-                                    in [
-                                        "Unregistered",
-                                        "Registered Composition",
-                                        "UIN Holders",
-                                    ]
-                                    and self.gst_details.get("gst_state")
-                                    != place_of_supply.split("-")[1]
-                                ):
-                                    inter_state_supply_details.setdefault(
-                                        (gst_category, place_of_supply),
-                                        {
-                                            "txval": 0.0,
-                                            "pos": place_of_supply.split("-")[0],
-                                            "iamt": 0.0,
-                                        },
-                                    )
-                                    inter_state_supply_details[
-                                        (gst_category, place_of_supply)
-                                    ]["txval"] += flt(taxable_value, 2)
-                                    inter_state_supply_details[
-                                        (gst_category, place_of_supply)
-                                    ]["iamt"] += flt(taxable_value * rate / 100, 2)
-
-            if self.invoice_cess.get(inv):
-                self.report_dict["sup_details"]["osup_det"]["csamt"] += flt(
-                    self.invoice_cess.get(inv), 2
-                )
-
-        self.set_inter_state_supply(inter_state_supply_details)
-
-    def set_supplies_liable_to_reverse_charge(self):
-        for inv, items_based_on_rate in self.items_based_on_tax_rate.items():
-            for rate, items in items_based_on_rate.items():
-                for item_code, taxable_value in self.invoice_items.get(inv).items():
-                    if item_code in items:
-                        if inv in self.cgst_sgst_invoices:
-                            tax_rate = rate / 2
-                            self.report_dict["sup_details"]["isup_rev"]["camt"] += flt(
-                                taxable_value * tax_rate / 100, 2
-                            )
-                            self.report_dict["sup_details"]["isup_rev"]["samt"] += flt(
-                                taxable_value * tax_rate / 100, 2
-                            )
-                            self.report_dict["sup_details"]["isup_rev"]["txval"] += flt(
-                                taxable_value, 2
-                            )
-                        else:
-                            self.report_dict["sup_details"]["isup_rev"]["iamt"] += flt(
-                                taxable_value * rate / 100, 2
-                            )
-                            self.report_dict["sup_details"]["isup_rev"]["txval"] += flt(
-                                taxable_value, 2
-                            )
+    def update_tax_details(self, details, row):
+        details["txval"] += flt(row.taxable_value, 2)
+        details["iamt"] += flt(row.igst_amount, 2)
+        details["camt"] += flt(row.cgst_amount, 2)
+        details["samt"] += flt(row.sgst_amount, 2)
 
     def set_inter_state_supply(self, inter_state_supply):
         for key, value in inter_state_supply.items():
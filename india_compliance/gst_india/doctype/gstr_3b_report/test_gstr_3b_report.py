@@ -5,11 +5,16 @@ import json
 import unittest
 
 import frappe
-from frappe.utils import getdate
+from frappe.utils import flt, getdate
 
+from india_compliance.gst_india.doctype.gstr_3b_report.gstr_3b_report import (
+    GSTR3BReport,
+)
+from india_compliance.gst_india.utils import is_overseas_transaction
 from india_compliance.gst_india.utils.tests import (
     create_purchase_invoice,
     create_sales_invoice,
+    create_sales_invoices_for_gst_reports,
 )
 
 
@@ -57,6 +62,8 @@ class TestGSTR3BReport(unittest.TestCase):
         output = json.loads(report.json_output)
         self.assertEqual(output["sup_details"]["osup_det"]["iamt"], 18)
         self.assertEqual(output["sup_details"]["osup_det"]["txval"], 300)
+        self.assertEqual(output["sup_details"]["osup_nil_exmp"]["txval"], 100)
+        self.assertEqual(output["inter_sup"]["comp_details"][0]["txval"], 100)
         self.assertEqual(output["sup_details"]["isup_rev"]["txval"], 100)
         self.assertEqual(output["sup_details"]["isup_rev"]["camt"], 9)
         self.assertEqual(output["itc_elg"]["itc_net"]["samt"], 40)
@@ -78,6 +85,261 @@ class TestGSTR3BReport(unittest.TestCase):
         gst_settings.round_off_gst_values = 1
         gst_settings.save()
 
+    def test_outward_supplies_match_item_wise_tax_detail(self):
+        create_sales_invoices_for_gst_reports()
+
+        values = {
+            "doctype": "GSTR 3B Report",
+            "company": "_Test Indian Registered Company",
+            "company_address": "_Test Indian Registered Company-Billing",
+            "year": getdate().year,
+            "month": getdate().strftime("%B"),
+        }
+
+        report = frappe.get_doc(values)
+        report.get_data()
+
+        expected_report = ItemWiseTaxDetailGSTR3BReport(values)
+        expected_report.get_data()
+
+        for section in ("osup_det", "osup_zero", "osup_nil_exmp", "osup_nongst"):
+            with self.subTest(section=section):
+                self.assertDictEqual(
+                    get_rounded_values(report.report_dict["sup_details"][section]),
+                    get_rounded_values(
+                        expected_report.report_dict["sup_details"][section]
+                    ),
+                )
+
+        for section, details in expected_report.report_dict["inter_sup"].items():
+            with self.subTest(section=section):
+                self.assertCountEqual(
+                    [
+                        get_rounded_values(row)
+                        for row in report.report_dict["inter_sup"][section]
+                    ],
+                    [get_rounded_values(row) for row in details],
+                )
+
+
+def get_rounded_values(details):
+    return {
+        key: flt(value, 2) if isinstance(value, float) else value
+        for key, value in details.items()
+    }
+
+
+class ItemWiseTaxDetailGSTR3BReport(GSTR3BReport):
+    """GSTR-3B with outward supplies computed from `item_wise_tax_detail`"""
+
+    def set_outward_taxable_supplies(self):
+        self.get_outward_tax_invoices()
+        self.get_outward_items()
+        self.get_outward_tax_details()
+
+        inter_state_supply_details = {}
+
+        for inv, items_based_on_rate in self.items_based_on_tax_rate.items():
+            invoice_details = self.invoice_map.get(inv, {})
+            gst_category = invoice_details.get("gst_category")
+            place_of_supply = (
+                invoice_details.get("place_of_supply") or "00-Other Territory"
+            )
+
+            for rate, items in items_based_on_rate.items():
+                for item_code, taxable_value in self.invoice_items.get(inv).items():
+                    if item_code not in items:
+                        continue
+
+                    sup_details = self.report_dict["sup_details"]
+                    if item_code in self.is_nil_or_exempt:
+                        sup_details["osup_nil_exmp"]["txval"] += taxable_value
+                    elif item_code in self.is_non_gst:
+                        sup_details["osup_nongst"]["txval"] += taxable_value
+                    elif rate == 0 or (
+                        is_overseas_transaction(
+                            "Sales Invoice", gst_category, place_of_supply
+                        )
+                        and not invoice_details.get("is_export_with_gst")
+                    ):
+                        sup_details["osup_zero"]["txval"] += taxable_value
+                    elif inv in self.cgst_sgst_invoices:
+                        tax_rate = rate / 2
+                        sup_details["osup_det"]["camt"] += flt(
+                            taxable_value * tax_rate / 100, 2
+                        )
+                        sup_details["osup_det"]["samt"] += flt(
+                            taxable_value * tax_rate / 100, 2
+                        )
+                        sup_details["osup_det"]["txval"] += flt(taxable_value, 2)
+                    else:
+                        sup_details["osup_det"]["iamt"] += flt(
+                            taxable_value * rate / 100, 2
+                        )
+                        sup_details["osup_det"]["txval"] += flt(taxable_value, 2)
+
+                        if (
+                            gst_category
+                            in [
+                                "Unregistered",
+                                "Registered Composition",
+                                "UIN Holders",
+                            ]
+                            and self.gst_details.get("gst_state")
+                            != place_of_supply.split("-")[1]
+                        ):
+                            supply_details = inter_state_supply_details.setdefault(
+                                (gst_category, place_of_supply),
+                                {
+                                    "txval": 0.0,
+                                    "pos": place_of_supply.split("-")[0],
+                                    "iamt": 0.0,
+                                },
+                            )
+                            supply_details["txval"] += flt(taxable_value, 2)
+                            supply_details["iamt"] += flt(taxable_value * rate / 100, 2)
+
+            if self.invoice_cess.get(inv):
+                self.report_dict["sup_details"]["osup_det"]["csamt"] += flt(
+                    self.invoice_cess.get(inv), 2
+                )
+
+        self.set_inter_state_supply(inter_state_supply_details)
+
+    def get_outward_tax_invoices(self):
+        invoice = frappe.qb.DocType("Sales Invoice")
+        invoice_details = (
+            frappe.qb.from_(invoice)
+            .select(
+                invoice.name,
+                invoice.gst_category,
+                invoice.place_of_supply,
+                invoice.is_export_with_gst,
+            )
+            .where(invoice.docstatus == 1)
+            .where(invoice.posting_date.between(self.from_date, self.to_date))
+            .where(invoice.company == self.company)
+            .where(invoice.company_gstin == self.gst_details.get("gstin"))
+            .where(invoice.is_opening == "No")
+            .orderby(invoice.name)
+            .run(as_dict=True)
+        )
+
+        self.invoice_map = {d.name: d for d in invoice_details}
+
+    def get_outward_items(self):
+        self.invoice_items = frappe._dict()
+        self.is_nil_or_exempt = []
+        self.is_non_gst = []
+
+        if not self.invoice_map:
+            return
+
+        item = frappe.qb.DocType("Sales Invoice Item")
+        item_details = (
+            frappe.qb.from_(item)
+            .select(item.item_code, item.parent, item.taxable_value, item.gst_treatment)
+            .where(item.parent.isin(list(self.invoice_map)))
+            .run(as_dict=True)
+        )
+
+        for d in item_details:
+            self.invoice_items.setdefault(d.parent, {}).setdefault(d.item_code, 0.0)
+            self.invoice_items[d.parent][d.item_code] += d.get("taxable_value", 0)
+
+            if (
+                d.gst_treatment in ("Nil-Rated", "Exempted")
+                and d.item_code not in self.is_nil_or_exempt
+            ):
+                self.is_nil_or_exempt.append(d.item_code)
+
+            if d.gst_treatment == "Non-GST" and d.item_code not in self.is_non_gst:
+                self.is_non_gst.append(d.item_code)
+
+    def get_outward_tax_details(self):
+        self.items_based_on_tax_rate = {}
+        self.invoice_cess = frappe._dict()
+        self.cgst_sgst_invoices = []
+
+        if not self.invoice_map:
+            return
+
+        taxes = frappe.qb.DocType("Sales Taxes and Charges")
+        tax_details = (
+            frappe.qb.from_(taxes)
+            .select(
+                taxes.parent,
+                taxes.account_head,
+                taxes.item_wise_tax_detail,
+                taxes.base_tax_amount_after_discount_amount,
+            )
+            .where(taxes.parenttype == "Sales Invoice")
+            .where(taxes.docstatus == 1)
+            .where(taxes.parent.isin(list(self.invoice_map)))
+            .orderby(taxes.account_head)
+            .run()
+        )
+
+        for parent, account, item_wise_tax_detail, tax_amount in tax_details:
+            if account in self.account_heads.get("csamt"):
+                self.invoice_cess.setdefault(parent, tax_amount)
+                continue
+
+            if not item_wise_tax_detail:
+                continue
+
+            cgst_or_sgst = account in self.account_heads.get(
+                "camt"
+            ) or account in self.account_heads.get("samt")
+
+            for item_code, tax_amounts in json.loads(item_wise_tax_detail).items():
+                if not (
+                    cgst_or_sgst
+                    or account in self.account_heads.get("iamt")
+                    or item_code in self.is_non_gst + self.is_nil_or_exempt
+                ):
+                    continue
+
+                tax_rate = tax_amounts[0]
+                if not tax_rate:
+                    continue
+
+                if cgst_or_sgst:
+                    tax_rate *= 2
+                    if parent not in self.cgst_sgst_invoices:
+                        self.cgst_sgst_invoices.append(parent)
+
+                rate_based_dict = self.items_based_on_tax_rate.setdefault(
+                    parent, {}
+                ).setdefault(tax_rate, [])
+                if item_code not in rate_based_dict:
+                    rate_based_dict.append(item_code)
+
+        # export, nil rated and exempted items where tax table is blank
+        for invoice, items in self.invoice_items.items():
+            invoice_details = self.invoice_map.get(invoice, {})
+            if (
+                invoice not in self.items_based_on_tax_rate
+                and not invoice_details.get("is_export_with_gst")
+                and is_overseas_transaction(
+                    "Sales Invoice",
+                    invoice_details.get("gst_category"),
+                    invoice_details.get("place_of_supply"),
+                )
+            ):
+                self.items_based_on_tax_rate.setdefault(invoice, {}).setdefault(
+                    0, items.keys()
+                )
+                continue
+
+            for item in items.keys():
+                if item in self.is_nil_or_exempt + self.is_non_gst and item not in (
+                    self.items_based_on_tax_rate.get(invoice, {}).get(0, [])
+                ):
+                    self.items_based_on_tax_rate.setdefault(invoice, {}).setdefault(
+                        0, []
+                    ).append(item)
+
 
 def create_sales_invoices():
     create_sales_invoice(is_in_state=True)
@@ -1,25 +1,47 @@
 # Copyright (c) 2022, Resilient Tech and contributors
 # For license information, please see license.txt
 
+import hashlib
+import os
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
+from itertools import repeat
 
 from dateutil.rrule import MONTHLY, rrule
-from rapidfuzz import fuzz, process
+from rapidfuzz import fuzz
 
 import frappe
 from frappe.query_builder import Case
 from frappe.query_builder.custom import ConstantColumn
 from frappe.query_builder.functions import Abs, IfNull, Sum
-from frappe.utils import add_months, format_date, getdate, rounded
+from frappe.utils import (
+    add_months,
+    add_to_date,
+    cint,
+    create_batch,
+    format_date,
+    get_datetime,
+    getdate,
+    now,
+    now_datetime,
+    rounded,
+)
 
 from india_compliance.gst_india.constants import GST_TAX_TYPES
 from india_compliance.gst_india.utils import (
+    get_cleaner_bill_no,
     get_escaped_name,
     get_gst_accounts_by_type,
+    get_gst_fy,
     get_party_for_gstin,
 )
 from india_compliance.gst_india.utils.gstr import IMPORT_CATEGORY, ReturnType
 
+# Watermarks of incremental reconciliation, not updated since, are deleted
+WATERMARK_KEY_PREFIX = "reconciliation_watermark_"
+WATERMARK_EXPIRY_DAYS = 90
+
 
 class Fields(Enum):
     FISCAL_YEAR = "fy"
@@ -263,13 +285,18 @@ class InwardSupply:
         categories = [category, amended_category or None]
         query = self.with_period_filter()
         data = (
-            query.where(IfNull(self.GSTR2.match_status, "") == "")
+            query.select(
+                self.GSTR2.cleaner_bill_no.as_("_bill_no"),
+                self.GSTR2.bill_fiscal_year.as_("fy"),
+                self.GSTR2.modified,
+            )
+            .where(IfNull(self.GSTR2.match_status, "") == "")
             .where(self.GSTR2.classification.isin(categories))
             .run(as_dict=True)
         )
 
         for doc in data:
-            doc.fy = BaseUtil.get_fy(doc.bill_date)
+            doc.fy = doc.fy or BaseUtil.get_fy(doc.bill_date)
 
         return BaseUtil.get_dict_for_key("supplier_gstin", data)
 
@@ -374,6 +401,11 @@ class PurchaseInvoice:
 
         query = (
             self.get_query(is_return=is_return)
+            .select(
+                self.PI.cleaner_bill_no.as_("_bill_no"),
+                self.PI.bill_fiscal_year.as_("fy"),
+                self.PI.modified,
+            )
             .where(self.PI.posting_date[self.from_date : self.to_date])
             .where(
                 self.PI.name.notin(
@@ -389,7 +421,7 @@ class PurchaseInvoice:
         data = query.run(as_dict=True)
 
         for doc in data:
-            doc.fy = BaseUtil.get_fy(doc.bill_date or doc.posting_date)
+            doc.fy = doc.fy or BaseUtil.get_fy(doc.bill_date or doc.posting_date)
 
         return BaseUtil.get_dict_for_key("supplier_gstin", data)
 
@@ -529,6 +561,7 @@ class BillOfEntry:
 
         query = (
             self.get_query()
+            .select(self.BOE.modified)
             .where(self.PI.gst_category == gst_category)
             .where(self.BOE.posting_date[self.from_date : self.to_date])
             .where(
@@ -740,14 +773,247 @@ class BaseReconciliation:
         return self.get_unmatched_purchase(category)
 
 
+class CandidateIndex:
+    """
+    Index of inward supplies for a supplier, used to limit the pairs probed by a rule.
+
+    - Inward supplies are bucketed by fields that the rule matches exactly.
+    - For fuzzy bill no match, bill dates are sorted to probe only the
+      inward supplies within `FUZZY_MATCH_DAYS` of the purchase.
+    - Candidates are returned in their original order so that the
+      first match is the same as in a sequential scan.
+
+    Only fields that are compared before any amount in the rule are indexed.
+    This ensures skipped pairs are ones that would fail the rule anyway.
+    """
+
+    INDEXED_FIELDS = (
+        Fields.FISCAL_YEAR,
+        Fields.SUPPLIER_GSTIN,
+        Fields.BILL_NO,
+        Fields.PLACE_OF_SUPPLY,
+        Fields.REVERSE_CHARGE,
+    )
+
+    FUZZY_MATCH_DAYS = 10
+
+    def __init__(self, inward_supplies, rules, by_month=False):
+        self.key_fields = [
+            field.value
+            for field, rule in rules.items()
+            if field in self.INDEXED_FIELDS and rule == Rule.EXACT_MATCH
+        ]
+        self.by_month = by_month
+        self.is_fuzzy = rules.get(Fields.BILL_NO) == Rule.FUZZY_MATCH
+        self.removed = set()
+
+        self.buckets = {}
+        for position, doc in enumerate(inward_supplies.values()):
+            if self.is_fuzzy and not (doc.bill_no and doc.bill_date):
+                # can never be a fuzzy match
+                continue
+
+            self.buckets.setdefault(self.get_key(doc), []).append((position, doc))
+
+        if self.is_fuzzy:
+            self.date_index = {
+                key: sorted(
+                    (
+                        (doc.bill_date.toordinal(), position, doc)
+                        for position, doc in docs
+                    ),
+                    key=lambda row: row[:2],
+                )
+                for key, docs in self.buckets.items()
+            }
+
+    def get_key(self, doc):
+        key = tuple(doc.get(field) for field in self.key_fields)
+
+        if self.by_month:
+            key += (doc.bill_date.month,)
+
+        return key
+
+    def get_candidates(self, purchase):
+        if self.is_fuzzy:
+            candidates = self.get_fuzzy_candidates(purchase)
+        else:
+            candidates = self.buckets.get(self.get_key(purchase), ())
+
+        for _, doc in candidates:
+            if doc.name not in self.removed:
+                yield doc
+
+    def get_fuzzy_candidates(self, purchase):
+        if not (purchase.bill_no and purchase.bill_date):
+            return ()
+
+        dates = self.date_index.get(self.get_key(purchase))
+        if not dates:
+            return ()
+
+        bill_date = purchase.bill_date.toordinal()
+        start = bisect_left(dates, (bill_date - self.FUZZY_MATCH_DAYS,))
+        end = bisect_right(dates, (bill_date + self.FUZZY_MATCH_DAYS, float("inf")))
+
+        # restore original order
+        return sorted((row[1], row[2]) for row in dates[start:end])
+
+    def remove(self, doc):
+        self.removed.add(doc.name)
+
+
+class FuzzyBillNoMatcher:
+    """
+    Fuzzy bill no match results for pairs of purchases and inward supplies.
+
+    Only candidates found by `CandidateIndex` within the date window are scored,
+    so results are proportional to candidates and not to all pairs.
+    Results are reused across rules as only unmatched docs are carried forward.
+    """
+
+    def __init__(self):
+        self.matches = {}
+
+    def is_matching(self, purchase, inward_supply):
+        key = (purchase.name, inward_supply.name)
+        if (is_matching := self.matches.get(key)) is None:
+            is_matching = self.matches[key] = self.get_is_matching(
+                purchase, inward_supply
+            )
+
+        return is_matching
+
+    def get_is_matching(self, purchase, inward_supply):
+        """
+        - First check for partial ratio, with 100% confidence
+        - Next check for approximate match, with 90% confidence
+        """
+        BaseUtil.update_cleaner_bill_no(purchase)
+        BaseUtil.update_cleaner_bill_no(inward_supply)
+
+        if fuzz.partial_ratio(purchase._bill_no, inward_supply._bill_no) == 100:
+            return True
+
+        return fuzz.WRatio(purchase._bill_no, inward_supply._bill_no) >= 90
+
+
+def delete_expired_watermarks():
+    """Deletes watermarks of filters not reconciled recently, called daily"""
+    DefaultValue = frappe.qb.DocType("DefaultValue")
+    (
+        frappe.qb.from_(DefaultValue)
+        .delete()
+        .where(DefaultValue.parent == "__default")
+        .where(DefaultValue.defkey.like(f"{WATERMARK_KEY_PREFIX}%"))
+        # watermark is the time of reconciliation
+        .where(
+            DefaultValue.defvalue
+            < str(add_to_date(now_datetime(), days=-WATERMARK_EXPIRY_DAYS))
+        )
+        .run()
+    )
+
+    frappe.defaults.clear_cache("__default")
+
+
+def reconcile_partition(category, purchases, inward_supplies):
+    """
+    Returns matches found for a partition of suppliers.
+    Runs in a worker process and hence does not access the database.
+    """
+    reconciler = Reconciler()
+    reconciler.reconcile_suppliers(purchases, inward_supplies, category)
+    return reconciler.matching_docs
+
+
 class Reconciler(BaseReconciliation):
+    BATCH_SIZE = 1000
+    PARALLEL_THRESHOLD = 10000
+
+    # Number of progress updates published per category
+    PROGRESS_UPDATES = 20
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.matching_docs = {}
+        self.bill_no_matcher = FuzzyBillNoMatcher()
+
     def reconcile(self, category, amended_category):
         """
         Reconcile purchases and inward supplies for given category.
+        Returns count of inward supplies updated for each match status.
         """
-        # GSTIN Level matching
+        # taken before reading documents, so that documents updated while
+        # reconciling are considered as changed in the next run
+        started_on = now()
+
+        watermark = None
+        if getattr(self, "incremental_reconciliation", None):
+            watermark = self.get_watermark(category)
+
+        if watermark:
+            self.unlink_changed_matches(
+                category, amended_category, watermark, started_on
+            )
+
         purchases = self.get_unmatched_purchase_or_bill_of_entry(category)
         inward_supplies = self.get_unmatched_inward_supply(category, amended_category)
+
+        # Suppliers with different PAN are never matched with each other
+        partitions = self.get_partitions(purchases, inward_supplies)
+        if watermark:
+            partitions = [
+                partition
+                for partition in partitions
+                if self.has_changes(partition, watermark)
+            ]
+
+        total_partitions = len(partitions)
+        workers = self.get_workers(partitions)
+
+        if workers == 1:
+            self.update_matching_docs(
+                category,
+                (reconcile_partition(category, *partition) for partition in partitions),
+                total_partitions,
+            )
+
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                self.update_matching_docs(
+                    category,
+                    executor.map(
+                        reconcile_partition,
+                        repeat(category),
+                        *zip(*partitions),
+                        chunksize=max(1, total_partitions // (workers * 4)),
+                    ),
+                    total_partitions,
+                )
+
+        summary = self.save_matching_docs(started_on)
+        self.set_watermark(category, started_on)
+
+        return summary
+
+    def update_matching_docs(self, category, results, total_partitions):
+        step = max(1, total_partitions // self.PROGRESS_UPDATES)
+
+        for current_partition, matching_docs in enumerate(results, start=1):
+            self.matching_docs.update(matching_docs)
+
+            if current_partition % step and current_partition != total_partitions:
+                continue
+
+            self.publish_progress(category, current_partition, total_partitions)
+
+    def reconcile_suppliers(self, purchases, inward_supplies, category):
+        """
+        Reconcile purchases and inward supplies of suppliers with the same PAN.
+        """
+        # GSTIN Level matching
         self.reconcile_for_rules(GSTIN_RULES, purchases, inward_supplies, category)
 
         # In case of IMPG GST in not available in 2A. So skip PAN level matching.
@@ -759,10 +1025,175 @@ class Reconciler(BaseReconciliation):
         inward_supplies = self.get_pan_level_data(inward_supplies)
         self.reconcile_for_rules(PAN_RULES, purchases, inward_supplies, category)
 
+    def get_partitions(self, purchases, inward_supplies):
+        """
+        Returns list of (purchases, inward supplies) for each PAN,
+        retaining supplier GSTIN wise data as is.
+
+        GSTINs with data on one side are retained, as these could be matched
+        with another GSTIN of the same PAN.
+        """
+        partitions = {}
+        for index, data in enumerate((purchases, inward_supplies)):
+            for supplier_gstin, docs in data.items():
+                pan = supplier_gstin[2:-3] if supplier_gstin else supplier_gstin
+                partition = partitions.setdefault(pan, ({}, {}))
+                partition[index][supplier_gstin] = docs
+
+        # nothing to match for PANs with data on one side
+        return [partition for partition in partitions.values() if all(partition)]
+
+    def get_workers(self, partitions):
+        """
+        Process pool is used only where there is enough data to offset its overhead.
+        Workers can be limited using `ic_reconciliation_workers` in site config.
+        """
+        total_docs = sum(
+            len(docs)
+            for partition in partitions
+            for data in partition
+            for docs in data.values()
+        )
+
+        if total_docs < self.PARALLEL_THRESHOLD:
+            return 1
+
+        workers = cint(frappe.conf.ic_reconciliation_workers) or os.cpu_count() or 1
+        return max(1, min(workers, len(partitions)))
+
+    def get_watermark_key(self, category):
+        """
+        Watermark is maintained for each category and set of filters,
+        as documents may be reconciled for one period and not for another.
+        """
+        # normalised, as filters could be dates or strings
+        filters = (
+            self.company_gstin,
+            self.gst_return,
+            *(
+                str(getdate(date)) if date else None
+                for date in (
+                    self.purchase_from_date,
+                    self.purchase_to_date,
+                    self.inward_supply_from_date,
+                    self.inward_supply_to_date,
+                )
+            ),
+            cint(self.include_ignored),
+        )
+        filters_hash = hashlib.sha1(str(filters).encode()).hexdigest()[:10]
+
+        return f"{WATERMARK_KEY_PREFIX}{self.company_gstin}_{category}_{filters_hash}"
+
+    def get_watermark(self, category):
+        if watermark := frappe.db.get_default(self.get_watermark_key(category)):
+            return get_datetime(watermark)
+
+    def set_watermark(self, category, watermark):
+        """
+        Set to the time when this run started, after matches are saved.
+
+        Inward Supplies matched by this run are saved with the same modified
+        time, so that these are not considered as changed in the next run.
+        """
+        frappe.db.set_default(self.get_watermark_key(category), watermark)
+
+    def has_changes(self, partition, watermark):
+        """
+        Returns true if any purchase or inward supply of the partition
+        is created or updated after the last run.
+        """
+        return any(
+            doc.modified > watermark
+            for data in partition
+            for docs in data.values()
+            for doc in docs.values()
+        )
+
+    def unlink_changed_matches(self, category, amended_category, watermark, modified):
+        """
+        Unlink automatic matches where either of the documents is updated after the
+        last run, so that these are matched again.
+        Matches with actions taken or manual matches are not changed.
+        """
+        GSTR2 = frappe.qb.DocType("GST Inward Supply")
+        inward_supplies = (
+            self.query_inward_supply(["link_doctype", "link_name", "modified"])
+            .where(GSTR2.classification.isin((category, amended_category or None)))
+            .where(
+                GSTR2.match_status.isin(
+                    (
+                        MatchStatus.EXACT_MATCH.value,
+                        MatchStatus.SUGGESTED_MATCH.value,
+                        MatchStatus.MISMATCH.value,
+                    )
+                )
+            )
+            .where(IfNull(GSTR2.action, "No Action") == "No Action")
+            .where(GSTR2.link_doctype.isin(("Purchase Invoice", "Bill of Entry")))
+            .run(as_dict=True)
+        )
+
+        if not inward_supplies:
+            return
+
+        modified_on = {}
+        for doctype in ("Purchase Invoice", "Bill of Entry"):
+            names = {
+                doc.link_name for doc in inward_supplies if doc.link_doctype == doctype
+            }
+            if not names:
+                continue
+
+            for doc in frappe.get_all(
+                doctype,
+                filters={"name": ("in", names)},
+                fields=["name", "modified"],
+            ):
+                modified_on[(doctype, doc.name)] = doc.modified
+
+        changed = []
+        for doc in inward_supplies:
+            # linked document is updated, cancelled or deleted
+            link_modified_on = modified_on.get((doc.link_doctype, doc.link_name))
+
+            if (
+                doc.modified > watermark
+                or not link_modified_on
+                or link_modified_on > watermark
+            ):
+                changed.append(doc.name)
+
+        for names in create_batch(changed, self.BATCH_SIZE):
+            (
+                frappe.qb.update(GSTR2)
+                .set(GSTR2.match_status, "")
+                .set(GSTR2.link_doctype, "")
+                .set(GSTR2.link_name, "")
+                # to be considered as changed when filtering partitions
+                .set(GSTR2.modified, modified)
+                .where(GSTR2.name.isin(names))
+                .run()
+            )
+
+    def publish_progress(self, category, current_partition, total_partitions):
+        frappe.publish_realtime(
+            "update_reconciliation_progress",
+            {
+                "current_progress": current_partition * 100 / total_partitions,
+                "category": category,
+            },
+            user=frappe.session.user,
+            doctype="Purchase Reconciliation Tool",
+        )
+
     def reconcile_for_rules(self, rules, purchases, inward_supplies, category):
         if not (purchases and inward_supplies):
             return
 
+        # results are kept only while reconciling for these rules, to bound memory
+        self.bill_no_matcher = FuzzyBillNoMatcher()
+
         for rule in rules:
             self.reconcile_for_rule(
                 purchases,
@@ -791,6 +1222,10 @@ class Reconciler(BaseReconciliation):
                     purchases[supplier_gstin], inward_supplies[supplier_gstin]
                 )
 
+            candidate_index = CandidateIndex(
+                inward_supplies[supplier_gstin], rules, by_month=bool(summary_diff)
+            )
+
             for purchase_invoice_name, purchase in (
                 purchases[supplier_gstin].copy().items()
             ):
@@ -799,15 +1234,7 @@ class Reconciler(BaseReconciliation):
                 ):
                     continue
 
-                for inward_supply_name, inward_supply in (
-                    inward_supplies[supplier_gstin].copy().items()
-                ):
-                    if (
-                        summary_diff
-                        and purchase.bill_date.month != inward_supply.bill_date.month
-                    ):
-                        continue
-
+                for inward_supply in candidate_index.get_candidates(purchase):
                     if not self.is_doc_matching(purchase, inward_supply, rules):
                         continue
 
@@ -820,7 +1247,8 @@ class Reconciler(BaseReconciliation):
 
                     # Remove from current data to ensure matching is done only once.
                     purchases[supplier_gstin].pop(purchase_invoice_name)
-                    inward_supplies[supplier_gstin].pop(inward_supply_name)
+                    inward_supplies[supplier_gstin].pop(inward_supply.name)
+                    candidate_index.remove(inward_supply)
                     break
 
     def get_summary_difference(self, data1, data2):
@@ -879,33 +1307,18 @@ class Reconciler(BaseReconciliation):
         """
         Returns true if the (cleaned) bill_no approximately match.
         - For a fuzzy match, month of invoice and inward supply should be same.
-        - First check for partial ratio, with 100% confidence
-        - Next check for approximate match, with 90% confidence
+        - Bill nos are scored and cached by `FuzzyBillNoMatcher`.
         """
         if not purchase.bill_no or not inward_supply.bill_no:
             return False
 
-        if abs((purchase.bill_date - inward_supply.bill_date).days) > 10:
+        if (
+            abs((purchase.bill_date - inward_supply.bill_date).days)
+            > CandidateIndex.FUZZY_MATCH_DAYS
+        ):
             return False
 
-        if not purchase._bill_no:
-            purchase._bill_no = BaseUtil.get_cleaner_bill_no(
-                purchase.bill_no, purchase.fy
-            )
-
-        if not inward_supply._bill_no:
-            inward_supply._bill_no = BaseUtil.get_cleaner_bill_no(
-                inward_supply.bill_no, inward_supply.fy
-            )
-
-        partial_ratio = fuzz.partial_ratio(purchase._bill_no, inward_supply._bill_no)
-        if float(partial_ratio) == 100:
-            return True
-
-        return (
-            float(process.extractOne(purchase._bill_no, [inward_supply._bill_no])[1])
-            >= 90.0
-        )
+        return self.bill_no_matcher.is_matching(purchase, inward_supply)
 
     def get_amount_difference(self, purchase, inward_supply, field):
         if field == "cess":
@@ -916,21 +1329,76 @@ class Reconciler(BaseReconciliation):
     def update_matching_doc(
         self, match_status, purchase_invoice_name, inward_supply_name, link_doctype
     ):
-        """Update matching doc for records."""
+        """
+        Update matching doc for records.
+        Changes are persisted in bulk using `save_matching_docs`.
+        """
 
         if match_status == "Residual Match":
             match_status = "Mismatch"
 
-        inward_supply_fields = {
-            "match_status": match_status,
-            "link_doctype": link_doctype,
-            "link_name": purchase_invoice_name,
-        }
-
-        frappe.db.set_value(
-            "GST Inward Supply", inward_supply_name, inward_supply_fields
+        self.matching_docs[inward_supply_name] = frappe._dict(
+            match_status=match_status,
+            link_doctype=link_doctype,
+            link_name=purchase_invoice_name,
         )
 
+    def save_matching_docs(self, modified=None):
+        """
+        Bulk update Inward Supplies matched so far.
+
+        - Inward supplies with the same match status and link doctype are
+          updated together, with link name set using CASE.
+        - If `modified` is given, Inward Supplies updated after it are skipped,
+          as these were matched using older values.
+        - Returns count of inward supplies updated for each match status.
+        """
+        GSTR2 = frappe.qb.DocType("GST Inward Supply")
+        summary = {}
+        groups = {}
+
+        for inward_supply_name, doc in self.matching_docs.items():
+            groups.setdefault((doc.match_status, doc.link_doctype), {})[
+                inward_supply_name
+            ] = doc.link_name
+
+        for (match_status, link_doctype), docs in groups.items():
+            for names in create_batch(list(docs), self.BATCH_SIZE):
+                if modified:
+                    names = (
+                        frappe.qb.from_(GSTR2)
+                        .select(GSTR2.name)
+                        .where(GSTR2.name.isin(names))
+                        .where(GSTR2.modified <= modified)
+                        .run(pluck=True)
+                    )
+
+                    if not names:
+                        continue
+
+                link_name = Case()
+                for name in names:
+                    link_name = link_name.when(GSTR2.name == name, docs[name])
+
+                query = (
+                    frappe.qb.update(GSTR2)
+                    .set(GSTR2.match_status, match_status)
+                    .set(GSTR2.link_doctype, link_doctype)
+                    .set(GSTR2.link_name, link_name)
+                    .set(GSTR2.modified, modified or now())
+                    .set(GSTR2.modified_by, frappe.session.user)
+                    .where(GSTR2.name.isin(names))
+                )
+
+                if modified:
+                    query = query.where(GSTR2.modified <= modified)
+
+                query.run()
+                summary[match_status] = summary.get(match_status, 0) + len(names)
+
+        self.matching_docs = {}
+        return summary
+
     def get_pan_level_data(self, data):
         out = {}
         for gstin, invoices in data.items():
@@ -1255,39 +1723,21 @@ class ReconciledData(BaseReconciliation):
 class BaseUtil:
     @staticmethod
     def get_fy(date):
-        if not date:
-            return
-
-        # Standard for India as per GST
-        if date.month < 4:
-            return f"{date.year - 1}-{date.year}"
-
-        return f"{date.year}-{date.year + 1}"
+        return get_gst_fy(date)
 
     @staticmethod
     def get_cleaner_bill_no(bill_no, fy):
+        return get_cleaner_bill_no(bill_no, fy)
+
+    @staticmethod
+    def update_cleaner_bill_no(doc):
         """
-        - Attempts to return bill number without financial year.
-        - Removes trailing zeros from bill number.
+        Sets cleaner bill no if not already fetched from the database.
         """
+        if not doc._bill_no and doc.bill_no and doc.fy:
+            doc._bill_no = get_cleaner_bill_no(doc.bill_no, doc.fy)
 
-        fy = fy.split("-")
-        replace_list = [
-            f"{fy[0]}-{fy[1]}",
-            f"{fy[0]}/{fy[1]}",
-            f"{fy[0]}-{fy[1][2:]}",
-            f"{fy[0]}/{fy[1][2:]}",
-            f"{fy[0][2:]}-{fy[1][2:]}",
-            f"{fy[0][2:]}/{fy[1][2:]}",
-            "/",  # these are only special characters allowed in invoice
-            "-",
-        ]
-
-        inv = bill_no
-        for replace in replace_list:
-            inv = inv.replace(replace, " ")
-        inv = " ".join(inv.split()).lstrip("0")
-        return inv
+        return doc._bill_no or ""
 
     @staticmethod
     def get_dict_for_key(key, args_list):
@@ -73,6 +73,14 @@ frappe.ui.form.on("Purchase Reconciliation Tool", {
 
         await frappe.require("purchase_reconciliation_tool.bundle.js");
         frm.purchase_reconciliation_tool = new PurchaseReconciliationTool(frm);
+
+        frappe.realtime.on("update_reconciliation_progress", data => {
+            frm.dashboard.show_progress(
+                "Reconciliation Progress",
+                data.current_progress,
+                __("Reconciling {0} documents", [data.category])
+            );
+        });
     },
 
     onload(frm) {
@@ -127,6 +135,10 @@ frappe.ui.form.on("Purchase Reconciliation Tool", {
             frm.purchase_reconciliation_tool.export_data()
         );
 
+        frm.add_custom_button(__("Email Suppliers"), () =>
+            frm.purchase_reconciliation_tool.email_suppliers()
+        );
+
         // move actions button next to filters
         for (let button of $(".custom-actions .inner-group-button")) {
             if (button.innerText?.trim() != "Actions") continue;
@@ -155,6 +167,7 @@ frappe.ui.form.on("Purchase Reconciliation Tool", {
     },
 
     after_save(frm) {
+        frm.dashboard.hide_progress("Reconciliation Progress");
         frm.purchase_reconciliation_tool.refresh(
             frm.doc.reconciliation_data ? JSON.parse(frm.doc.reconciliation_data) : []
         );
@@ -498,6 +511,28 @@ class PurchaseReconciliationTool {
         });
     }
 
+    async email_suppliers() {
+        const { message: bulk_generation_log } = await frappe.call({
+            method: "india_compliance.gst_india.doctype.purchase_reconciliation_tool.purchase_reconciliation_tool.enqueue_reconciliation_emails",
+            args: {
+                data: JSON.stringify(this.get_filtered_data()),
+                doc: JSON.stringify(this.frm.doc),
+            },
+            freeze: true,
+        });
+
+        frappe.show_alert({
+            message: __("Emails to suppliers are being queued. Track progress in {0}", [
+                frappe.utils.get_form_link(
+                    "GST Bulk Generation Log",
+                    bulk_generation_log,
+                    true
+                ),
+            ]),
+            indicator: "blue",
+        });
+    }
+
     get_filtered_data(selected_row = null) {
         let supplier_filter = null;
 
@@ -2,14 +2,28 @@
 # For license information, please see license.txt
 
 import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from typing import List
 
 import frappe
+from frappe import _
+from frappe.core.doctype.communication.email import make
+from frappe.email.doctype.email_template.email_template import get_email_template
 from frappe.model.document import Document
 from frappe.query_builder.functions import IfNull
+from frappe.utils import cint, flt, now_datetime
 from frappe.utils.response import json_handler
 
 from india_compliance.gst_india.constants import ORIGINAL_VS_AMENDED
+from india_compliance.gst_india.doctype.gst_bulk_generation_log.gst_bulk_generation_log import (
+    create_bulk_generation_log,
+    fail_bulk_generation,
+    start_bulk_generation,
+    update_bulk_generation_log,
+)
 from india_compliance.gst_india.doctype.purchase_reconciliation_tool import (
     BaseUtil,
     BillOfEntry,
@@ -17,7 +31,11 @@ from india_compliance.gst_india.doctype.purchase_reconciliation_tool import (
     ReconciledData,
     Reconciler,
 )
-from india_compliance.gst_india.utils import get_json_from_file, get_timespan_date_range
+from india_compliance.gst_india.utils import (
+    get_json_outline,
+    get_party_contact_details,
+    get_timespan_date_range,
+)
 from india_compliance.gst_india.utils.exporter import ExcelExporter
 from india_compliance.gst_india.utils.gstr import (
     IMPORT_CATEGORY,
@@ -26,10 +44,25 @@ from india_compliance.gst_india.utils.gstr import (
     ReturnType,
     download_gstr_2a,
     download_gstr_2b,
-    save_gstr_2a,
-    save_gstr_2b,
+    upload_gstr_2a,
+    upload_gstr_2b,
+)
+
+RECONCILIATION_FIELDS = (
+    "company",
+    "company_gstin",
+    "gst_return",
+    "purchase_from_date",
+    "purchase_to_date",
+    "inward_supply_from_date",
+    "inward_supply_to_date",
+    "include_ignored",
+    "incremental_reconciliation",
 )
 
+# Suppliers after which workbooks are rendered in parallel processes
+RECONCILIATION_EMAIL_PARALLEL_THRESHOLD = 20
+
 STATUS_MAP = {
     "Accept My Values": "Reconciled",
     "Accept Supplier Values": "Reconciled",
@@ -44,17 +77,7 @@ class PurchaseReconciliationTool(Document):
         self.ReconciledData = ReconciledData(**self.get_reco_doc())
 
     def get_reco_doc(self):
-        fields = (
-            "company",
-            "company_gstin",
-            "gst_return",
-            "purchase_from_date",
-            "purchase_to_date",
-            "inward_supply_from_date",
-            "inward_supply_to_date",
-            "include_ignored",
-        )
-        return {field: self.get(field) for field in fields}
+        return {field: self.get(field) for field in RECONCILIATION_FIELDS}
 
     def onload(self):
         date_range = [
@@ -73,8 +96,14 @@ class PurchaseReconciliationTool(Document):
             return
 
         _Reconciler = Reconciler(**self.get_reco_doc())
+        summary = {}
         for row in ORIGINAL_VS_AMENDED:
-            _Reconciler.reconcile(row["original"], row["amended"])
+            for match_status, count in _Reconciler.reconcile(
+                row["original"], row["amended"]
+            ).items():
+                summary[match_status] = summary.get(match_status, 0) + count
+
+        self.show_reconciliation_summary(summary)
 
         self.ReconciledData = ReconciledData(**self.get_reco_doc())
         self.reconciliation_data = json.dumps(
@@ -83,17 +112,31 @@ class PurchaseReconciliationTool(Document):
 
         self.db_set("is_modified", 0)
 
+    def show_reconciliation_summary(self, summary):
+        if not summary:
+            return
+
+        frappe.msgprint(
+            _("Inward Supplies updated: {0}").format(
+                ", ".join(
+                    f"{_(match_status)}: {count}"
+                    for match_status, count in summary.items()
+                )
+            ),
+            indicator="green",
+            alert=True,
+        )
+
     @frappe.whitelist()
     def upload_gstr(self, return_type, period, file_path):
         frappe.has_permission("Purchase Reconciliation Tool", "write", throw=True)
 
         return_type = ReturnType(return_type)
-        json_data = get_json_from_file(file_path)
         if return_type == ReturnType.GSTR2A:
-            return save_gstr_2a(self.company_gstin, period, json_data)
+            return upload_gstr_2a(self.company_gstin, period, file_path)
 
         if return_type == ReturnType.GSTR2B:
-            return save_gstr_2b(self.company_gstin, period, json_data)
+            return upload_gstr_2b(self.company_gstin, period, file_path)
 
     @frappe.whitelist()
     def download_gstr_2a(self, date_range, force=False, otp=None):
@@ -207,12 +250,12 @@ class PurchaseReconciliationTool(Document):
 
         return_type = ReturnType(return_type)
         try:
-            json_data = get_json_from_file(file_path)
+            outline = get_json_outline(file_path)
             if return_type == ReturnType.GSTR2A:
-                return json_data.get("fp")
+                return outline.fields.get("fp")
 
             if return_type == ReturnType.GSTR2B:
-                return json_data.get("data").get("rtnprd")
+                return outline.fields.get("data.rtnprd")
 
         except Exception:
             pass
@@ -537,6 +580,362 @@ def generate_excel_attachment(data, doc):
     return [file]
 
 
+@frappe.whitelist()
+def enqueue_reconciliation_emails(data, doc):
+    """
+    Enqueues emails of reconciliation reports to all suppliers in the data.
+    Returns name of GST Bulk Generation Log that tracks the progress.
+    """
+    frappe.has_permission("Purchase Reconciliation Tool", "email", throw=True)
+
+    data = frappe.parse_json(data)
+    doc = frappe.parse_json(doc)
+
+    return _enqueue_reconciliation_emails(
+        frappe._dict(
+            doc={field: doc.get(field) for field in RECONCILIATION_FIELDS},
+            purchases=data.get("purchases"),
+            inward_supplies=data.get("inward_supplies"),
+        )
+    )
+
+
+@frappe.whitelist()
+def retry_reconciliation_emails(bulk_generation_log):
+    """Enqueues emails again for suppliers that failed in the given log"""
+    frappe.has_permission("Purchase Reconciliation Tool", "email", throw=True)
+
+    supplier_gstins = frappe.get_all(
+        "GST Bulk Generation Failure",
+        filters={
+            "parent": bulk_generation_log,
+            "parenttype": "GST Bulk Generation Log",
+        },
+        pluck="document_name",
+    )
+
+    if not supplier_gstins:
+        frappe.throw(_("There are no failed emails to retry"))
+
+    manifest = get_reconciliation_email_manifest(bulk_generation_log)
+    manifest.supplier_gstins = supplier_gstins
+
+    return _enqueue_reconciliation_emails(manifest)
+
+
+def _enqueue_reconciliation_emails(manifest):
+    log = create_bulk_generation_log("Reconciliation Email", "GSTIN", 0)
+    save_reconciliation_email_manifest(log, manifest)
+
+    frappe.enqueue(
+        "india_compliance.gst_india.doctype.purchase_reconciliation_tool.purchase_reconciliation_tool.send_reconciliation_emails",
+        queue="long",
+        timeout=3600,
+        enqueue_after_commit=True,
+        bulk_generation_log=log,
+    )
+
+    return log
+
+
+def save_reconciliation_email_manifest(bulk_generation_log, manifest):
+    """
+    Saves filters and documents to be emailed, so that failed emails can be
+    retried for the same reconciliation data.
+    """
+    frappe.get_doc(
+        {
+            "doctype": "File",
+            "attached_to_doctype": "GST Bulk Generation Log",
+            "attached_to_name": bulk_generation_log,
+            "file_name": f"{bulk_generation_log}-manifest.json",
+            "is_private": 1,
+            "content": json.dumps(manifest, default=json_handler),
+        }
+    ).insert(ignore_permissions=True)
+
+
+def get_reconciliation_email_manifest(bulk_generation_log):
+    file = frappe.get_doc(
+        "File",
+        {
+            "attached_to_doctype": "GST Bulk Generation Log",
+            "attached_to_name": bulk_generation_log,
+            "file_name": f"{bulk_generation_log}-manifest.json",
+        },
+    )
+
+    return frappe.parse_json(file.get_content())
+
+
+def send_reconciliation_emails(bulk_generation_log):
+    """
+    Emails reconciliation report of each supplier, with the invoices of the
+    supplier attached as a workbook.
+
+    Reconciliation data is fetched once and partitioned by supplier GSTIN.
+    Workbooks are rendered in parallel worker processes, and emails are queued
+    as each workbook is ready.
+
+    Log is marked as failed if emails are aborted, e.g. if a worker crashes.
+    """
+    try:
+        _send_reconciliation_emails(bulk_generation_log)
+
+    except Exception:
+        frappe.db.rollback()
+        fail_bulk_generation(bulk_generation_log)
+        frappe.db.commit()  # nosemgrep
+        raise
+
+
+def _send_reconciliation_emails(bulk_generation_log):
+    manifest = get_reconciliation_email_manifest(bulk_generation_log)
+    doc = frappe._dict(manifest.doc)
+
+    data = ReconciledData(**doc).get_consolidated_data(
+        manifest.purchases, manifest.inward_supplies, prefix="inward_supply"
+    )
+    partitions = get_supplier_partitions(data, manifest.supplier_gstins)
+
+    frappe.db.set_value(
+        "GST Bulk Generation Log",
+        bulk_generation_log,
+        "total_documents",
+        len(partitions),
+    )
+    start_bulk_generation(bulk_generation_log)
+
+    if not partitions:
+        frappe.db.set_value(
+            "GST Bulk Generation Log",
+            bulk_generation_log,
+            {"status": "Completed", "completed_on": now_datetime()},
+        )
+        return
+
+    email_template = get_reconciliation_email_template()
+    frappe.db.commit()  # nosemgrep
+
+    workers = get_reconciliation_email_workers(partitions)
+    if workers == 1:
+        send_supplier_emails(
+            bulk_generation_log,
+            doc,
+            email_template,
+            partitions,
+            (render_supplier_workbook(doc, partition) for partition in partitions),
+        )
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        send_supplier_emails(
+            bulk_generation_log,
+            doc,
+            email_template,
+            partitions,
+            executor.map(
+                render_supplier_workbook,
+                repeat(doc),
+                partitions,
+                chunksize=max(1, len(partitions) // (workers * 4)),
+            ),
+        )
+
+
+def send_supplier_emails(bulk_generation_log, doc, email_template, partitions, results):
+    """
+    Sends email for each rendered workbook, as results are received.
+    Failure for a supplier is recorded in the log, without stopping others.
+    """
+    for partition, (file_name, content, error) in zip(partitions, results):
+        supplier_gstin = partition.supplier_summary.supplier_gstin
+
+        try:
+            if error:
+                # last line of traceback has the exception
+                raise frappe.ValidationError(error.splitlines()[-1])
+
+            send_reconciliation_email(
+                bulk_generation_log,
+                frappe._dict({**doc, **partition.supplier_summary}),
+                email_template,
+                file_name,
+                content,
+            )
+            update_bulk_generation_log(bulk_generation_log, supplier_gstin)
+
+        except Exception as e:
+            frappe.db.rollback()
+            error_log = frappe.log_error(
+                title=_("Reconciliation email failed for supplier {0}").format(
+                    supplier_gstin
+                ),
+                message=error or frappe.get_traceback(),
+            )
+            update_bulk_generation_log(
+                bulk_generation_log,
+                supplier_gstin,
+                error=str(e) or error_log.method,
+                error_log=error_log.name,
+            )
+            frappe.clear_last_message()
+
+        finally:
+            # each email needs to be committed individually
+            frappe.db.commit()  # nosemgrep
+
+
+def get_supplier_partitions(data, supplier_gstins=None):
+    """
+    Returns data to be exported for each supplier, with summaries as computed
+    by the Purchase Reconciliation Tool.
+    """
+    invoices = {}
+    for row in data:
+        invoices.setdefault(row.supplier_gstin, []).append(row)
+
+    if supplier_gstins is not None:
+        supplier_gstins = set(supplier_gstins)
+
+    partitions = []
+    for supplier_gstin, rows in invoices.items():
+        if supplier_gstins is not None and supplier_gstin not in supplier_gstins:
+            continue
+
+        supplier_summary = get_reconciliation_summary(rows).pop(None)
+        supplier_summary.update(
+            supplier=next((row.supplier for row in rows if row.get("supplier")), None),
+            supplier_name=rows[0].supplier_name,
+            supplier_gstin=supplier_gstin,
+        )
+
+        partitions.append(
+            frappe._dict(
+                match_summary=list(
+                    get_reconciliation_summary(rows, "match_status").values()
+                ),
+                supplier_summary=supplier_summary,
+                invoice_data=rows,
+            )
+        )
+
+    return partitions
+
+
+def get_reconciliation_summary(data, group_by=None):
+    """Returns counts and differences of reconciliation data by `group_by` field"""
+    summary = {}
+
+    for row in data:
+        key = row.get(group_by) if group_by else None
+        if not (summary_row := summary.get(key)):
+            summary_row = summary[key] = frappe._dict(
+                inward_supply_count=0,
+                purchase_count=0,
+                action_taken_count=0,
+                total_docs=0,
+                tax_difference=0,
+                taxable_value_difference=0,
+            )
+
+            if group_by:
+                summary_row[group_by] = key
+
+        if row.inward_supply_name:
+            summary_row.inward_supply_count += 1
+
+        if row.purchase_invoice_name:
+            summary_row.purchase_count += 1
+
+        if row.action != "No Action":
+            summary_row.action_taken_count += 1
+
+        summary_row.total_docs += 1
+        summary_row.tax_difference += flt(row.tax_difference)
+        summary_row.taxable_value_difference += flt(row.taxable_value_difference)
+
+    return summary
+
+
+def render_supplier_workbook(doc, partition):
+    """
+    Returns file name, content and error in rendering workbook of a supplier.
+    Runs in a worker process and hence does not access the database.
+    """
+    try:
+        xlsx_file, file_name = BuildExcel(
+            doc, partition, is_supplier_specific=True, email=True
+        ).export_data()
+
+        return file_name, xlsx_file.getvalue(), None
+
+    except Exception:
+        return None, None, traceback.format_exc()
+
+
+def send_reconciliation_email(
+    bulk_generation_log, supplier_details, email_template, file_name, content
+):
+    party = supplier_details.supplier or supplier_details.supplier_name
+    recipients = (get_party_contact_details(party) or {}).get("contact_email")
+
+    if not recipients:
+        frappe.throw(
+            _("Email not found for the primary contact of supplier {0}").format(
+                supplier_details.supplier_name
+            )
+        )
+
+    file = frappe.get_doc(
+        {
+            "doctype": "File",
+            "attached_to_doctype": "GST Bulk Generation Log",
+            "attached_to_name": bulk_generation_log,
+            "file_name": f"{file_name}.xlsx",
+            "is_private": 1,
+            "content": content,
+        }
+    ).insert(ignore_permissions=True)
+
+    email = frappe._dict(get_email_template(email_template, supplier_details))
+
+    make(
+        doctype="Purchase Reconciliation Tool",
+        name="Purchase Reconciliation Tool",
+        subject=email.subject,
+        content=email.message,
+        recipients=recipients,
+        send_email=True,
+        attachments=[file.name],
+    )
+
+
+def get_reconciliation_email_template():
+    if not (
+        email_template := frappe.get_meta(
+            "Purchase Reconciliation Tool"
+        ).default_email_template
+    ):
+        frappe.throw(
+            _("Please set the default email template for Purchase Reconciliation Tool")
+        )
+
+    return email_template
+
+
+def get_reconciliation_email_workers(partitions):
+    """
+    Returns number of processes to render workbooks.
+    Workers can be limited using `ic_reconciliation_workers` in site config.
+    """
+    if len(partitions) < RECONCILIATION_EMAIL_PARALLEL_THRESHOLD:
+        return 1
+
+    workers = cint(frappe.conf.ic_reconciliation_workers) or os.cpu_count() or 1
+    return max(1, min(workers, len(partitions)))
+
+
 @frappe.whitelist()
 def download_excel_report(data, doc, is_supplier_specific=False):
     frappe.has_permission("Purchase Reconciliation Tool", "export", throw=True)
@@ -592,7 +991,7 @@ class BuildExcel:
 
     def export_data(self):
         """Exports data to an excel file"""
-        excel = ExcelExporter()
+        excel = ExcelExporter(write_only=True)
         excel.create_sheet(
             sheet_name="Match Summary Data",
             filters=self.filters,
@@ -669,7 +1068,10 @@ class BuildExcel:
         )
 
     def get_invoice_data(self):
-        data = ReconciledData(**self.doc).get_consolidated_data(
+        # consolidated data is passed when emails are sent in bulk
+        data = self.data.get("invoice_data") or ReconciledData(
+            **self.doc
+        ).get_consolidated_data(
             self.data.get("purchases"),
             self.data.get("inward_supplies"),
             prefix="inward_supply",
@@ -682,11 +1084,10 @@ class BuildExcel:
         return self.process_data(data, self.invoice_header)
 
     def process_data(self, data, column_list):
-        """return required list of dict for the excel file"""
+        """yields required dict for each row of the excel file"""
         if not data:
             return
 
-        out = []
         fields = [d.get("fieldname") for d in column_list]
         purchase_fields = [field.get("fieldname") for field in self.pr_columns]
         for row in data:
@@ -701,9 +1102,7 @@ class BuildExcel:
 
                 self.assign_value(field, row, new_row)
 
-            out.append(new_row)
-
-        return out
+            yield new_row
 
     def assign_value(self, field, source_data, target_data):
         if source_data.get(field) is None:
@@ -1,9 +1,306 @@
 # Copyright (c) 2022, Resilient Tech and Contributors
 # See license.txt
 
-# import frappe
+import random
+from datetime import date, timedelta
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now
+
+from india_compliance.gst_india.doctype.purchase_reconciliation_tool import (
+    GSTIN_RULES,
+    PAN_RULES,
+    BaseUtil,
+    Reconciler,
+)
+from india_compliance.gst_india.doctype.purchase_reconciliation_tool.purchase_reconciliation_tool import (
+    get_supplier_partitions,
+)
 
 
 class TestPurchaseReconciliationTool(FrappeTestCase):
-    pass
+    def test_supplier_partitions(self):
+        data = [
+            frappe._dict(
+                supplier_gstin=supplier_gstin,
+                supplier=None,
+                supplier_name=supplier_gstin,
+                match_status=match_status,
+                action=action,
+                purchase_invoice_name="PINV"
+                if match_status != "Missing in PI"
+                else None,
+                inward_supply_name="GSTR2B",
+                tax_difference=1,
+                taxable_value_difference=10,
+            )
+            for supplier_gstin, match_status, action in (
+                ("24AAUPV7468F1ZW", "Exact Match", "No Action"),
+                ("24AAUPV7468F1ZW", "Missing in PI", "Pending"),
+                ("24AABCR6898M1ZN", "Exact Match", "Accept My Values"),
+            )
+        ]
+
+        partitions = get_supplier_partitions(data, ["24AAUPV7468F1ZW"])
+        self.assertEqual(len(partitions), 1)
+
+        partition = partitions[0]
+        self.assertEqual(len(partition.invoice_data), 2)
+        self.assertEqual(partition.supplier_summary.total_docs, 2)
+        self.assertEqual(partition.supplier_summary.purchase_count, 1)
+        self.assertEqual(partition.supplier_summary.action_taken_count, 1)
+        self.assertEqual(partition.supplier_summary.taxable_value_difference, 20)
+        self.assertEqual(
+            [row.match_status for row in partition.match_summary],
+            ["Exact Match", "Missing in PI"],
+        )
+
+
+class TestReconciler(FrappeTestCase):
+    def test_indexed_matching_is_same_as_sequential_matching(self):
+        purchases, inward_supplies = get_synthetic_invoices(500)
+
+        indexed = get_matches(
+            IndexedReconciler(),
+            BaseUtil.get_dict_for_key("supplier_gstin", purchases),
+            BaseUtil.get_dict_for_key("supplier_gstin", inward_supplies),
+        )
+        sequential = get_matches(
+            SequentialReconciler(),
+            BaseUtil.get_dict_for_key("supplier_gstin", purchases),
+            BaseUtil.get_dict_for_key("supplier_gstin", inward_supplies),
+        )
+
+        self.assertTrue(indexed)
+        self.assertEqual(indexed, sequential)
+
+    def test_pan_level_matching_across_gstins(self):
+        purchases, _ = get_synthetic_invoices(1)
+        purchases[0].supplier_gstin = "29AABCR1718E1ZL"
+
+        # same invoice reported under another GSTIN of the same PAN
+        inward_supplies = [purchases[0].copy()]
+        inward_supplies[0].update(name="IS-0", supplier_gstin="29AABCR1718E2ZK")
+        del inward_supplies[0]["doctype"]
+
+        reconciler = UnsavedReconciler(
+            BaseUtil.get_dict_for_key("supplier_gstin", purchases),
+            BaseUtil.get_dict_for_key("supplier_gstin", inward_supplies),
+        )
+        reconciler.reconcile("B2B", "BA2B")
+
+        self.assertEqual(
+            reconciler.matching_docs[inward_supplies[0].name].link_name,
+            purchases[0].name,
+        )
+
+    def test_summary_of_saved_matches(self):
+        inward_supplies = [
+            frappe.get_doc(
+                doctype="GST Inward Supply",
+                company_gstin="24AAQCA8719H1ZC",
+                supplier_gstin="24AABCR6898M1ZN",
+                bill_no=f"TEST-RECO-{i}",
+                bill_date="2023-04-01",
+                classification="B2B",
+            ).insert()
+            for i in range(3)
+        ]
+        names = [doc.name for doc in inward_supplies]
+        started_on = now()
+
+        # updated after reconciliation started, hence skipped
+        frappe.db.set_value(
+            "GST Inward Supply",
+            names[2],
+            "modified",
+            add_to_date(started_on, seconds=1),
+            update_modified=False,
+        )
+
+        reconciler = Reconciler()
+        for name, match_status in zip(
+            names, ("Exact Match", "Suggested Match", "Mismatch")
+        ):
+            reconciler.update_matching_doc(
+                match_status, f"PINV-{name}", name, "Purchase Invoice"
+            )
+
+        summary = reconciler.save_matching_docs(started_on)
+        updated = frappe.get_all(
+            "GST Inward Supply",
+            filters={"name": ("in", names), "link_name": ("is", "set")},
+            fields=["match_status", "count(name) as count"],
+            group_by="match_status",
+        )
+
+        self.assertDictEqual(summary, {"Exact Match": 1, "Suggested Match": 1})
+        self.assertDictEqual(summary, {row.match_status: row.count for row in updated})
+
+    def test_progress_is_throttled(self):
+        reconciler = UnsavedReconciler({}, {})
+        reconciler.update_matching_docs("B2B", ({} for _ in range(1000)), 1000)
+
+        self.assertEqual(len(reconciler.progress), Reconciler.PROGRESS_UPDATES)
+        self.assertEqual(reconciler.progress[-1], 1000)
+
+    def test_watermark_key_is_same_for_dates_and_strings(self):
+        filters = {
+            "company_gstin": "24AAQCA8719H1ZC",
+            "gst_return": "GSTR 2B",
+            "include_ignored": 0,
+        }
+
+        self.assertEqual(
+            Reconciler(
+                **filters,
+                purchase_from_date=date(2023, 4, 1),
+                purchase_to_date=date(2023, 4, 30),
+                inward_supply_from_date=date(2023, 4, 1),
+                inward_supply_to_date=None,
+            ).get_watermark_key("B2B"),
+            Reconciler(
+                **filters,
+                purchase_from_date="2023-04-01",
+                purchase_to_date="2023-04-30",
+                inward_supply_from_date="2023-04-01",
+                inward_supply_to_date=None,
+            ).get_watermark_key("B2B"),
+        )
+
+
+class UnsavedReconciler(Reconciler):
+    """Reconciles given data without reading or saving documents"""
+
+    def __init__(self, purchases, inward_supplies):
+        super().__init__()
+        self.purchases = purchases
+        self.inward_supplies = inward_supplies
+        self.progress = []
+
+    def get_unmatched_purchase_or_bill_of_entry(self, category):
+        return self.purchases
+
+    def get_unmatched_inward_supply(self, category, amended_category):
+        return self.inward_supplies
+
+    def publish_progress(self, category, current_partition, total_partitions):
+        self.progress.append(current_partition)
+
+    def save_matching_docs(self, modified=None):
+        return {}
+
+    def set_watermark(self, category, watermark):
+        pass
+
+
+class IndexedReconciler(Reconciler):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.matches = []
+
+    def update_matching_doc(self, match_status, purchase, inward_supply, doctype):
+        self.matches.append((match_status, purchase, inward_supply))
+
+
+class SequentialReconciler(IndexedReconciler):
+    """Compares every purchase with every inward supply"""
+
+    def reconcile_for_rule(
+        self, purchases, inward_supplies, match_status, rules, category
+    ):
+        for supplier_gstin in purchases:
+            if not inward_supplies.get(supplier_gstin):
+                continue
+
+            summary_diff = {}
+            if match_status == "Residual Match":
+                summary_diff = self.get_summary_difference(
+                    purchases[supplier_gstin], inward_supplies[supplier_gstin]
+                )
+
+            for purchase_name, purchase in purchases[supplier_gstin].copy().items():
+                if summary_diff and abs(summary_diff[purchase.bill_date.month]) >= 2:
+                    continue
+
+                for inward_supply_name, inward_supply in (
+                    inward_supplies[supplier_gstin].copy().items()
+                ):
+                    if (
+                        summary_diff
+                        and purchase.bill_date.month != inward_supply.bill_date.month
+                    ):
+                        continue
+
+                    if not self.is_doc_matching(purchase, inward_supply, rules):
+                        continue
+
+                    self.update_matching_doc(
+                        match_status, purchase.name, inward_supply.name, None
+                    )
+                    purchases[supplier_gstin].pop(purchase_name)
+                    inward_supplies[supplier_gstin].pop(inward_supply_name)
+                    break
+
+
+def get_matches(reconciler, purchases, inward_supplies):
+    reconciler.reconcile_for_rules(GSTIN_RULES, purchases, inward_supplies, "B2B")
+    reconciler.reconcile_for_rules(
+        PAN_RULES,
+        reconciler.get_pan_level_data(purchases),
+        reconciler.get_pan_level_data(inward_supplies),
+        "B2B",
+    )
+
+    return reconciler.matches
+
+
+def get_synthetic_invoices(count):
+    """
+    Returns purchases and inward supplies with a mix of exact, fuzzy
+    and mismatched values across a few suppliers.
+    """
+    rng = random.Random(count)
+    suppliers = ("29AABCR1718E1ZL", "29AABCR1718E2ZK", "24AANFA2641L1ZF")
+    purchases = []
+    inward_supplies = []
+
+    for i in range(count):
+        taxable_value = rng.randint(100, 10000)
+        bill_date = date(2023, 4, 1) + timedelta(days=rng.randint(0, 60))
+        values = {
+            "supplier_gstin": rng.choice(suppliers),
+            "bill_no": f"INV/{rng.randint(1, count)}/23-24",
+            "bill_date": bill_date,
+            "place_of_supply": "29-Karnataka",
+            "is_reverse_charge": rng.choice((0, 0, 1)),
+            "taxable_value": taxable_value,
+            "cgst": taxable_value * 0.09,
+            "sgst": taxable_value * 0.09,
+            "igst": 0,
+            "cess": 0,
+        }
+
+        purchase = frappe._dict(values, name=f"PI-{i}", doctype="Purchase Invoice")
+        inward_supply = frappe._dict(values, name=f"IS-{i}")
+
+        variation = rng.random()
+        if variation < 0.2:
+            inward_supply.bill_no = inward_supply.bill_no.replace("/23-24", "")
+            inward_supply.bill_date += timedelta(days=rng.randint(-12, 12))
+        elif variation < 0.3:
+            inward_supply.taxable_value += 0.5
+        elif variation < 0.4:
+            inward_supply.bill_no = f"X{rng.randint(1, 99)}"
+        elif variation < 0.5:
+            inward_supply.supplier_gstin = rng.choice(suppliers)
+
+        purchases.append(purchase)
+        inward_supplies.append(inward_supply)
+
+    rng.shuffle(inward_supplies)
+    for doc in purchases + inward_supplies:
+        doc.fy = BaseUtil.get_fy(doc.bill_date)
+
+    return purchases, inward_supplies
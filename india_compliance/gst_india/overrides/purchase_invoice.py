@@ -6,7 +6,11 @@ from india_compliance.gst_india.overrides.sales_invoice import (
     update_dashboard_with_gst_logs,
 )
 from india_compliance.gst_india.overrides.transaction import validate_transaction
-from india_compliance.gst_india.utils import get_gst_accounts_by_type, is_api_enabled
+from india_compliance.gst_india.utils import (
+    get_gst_accounts_by_type,
+    is_api_enabled,
+    set_cleaner_bill_no,
+)
 from india_compliance.gst_india.utils.e_waybill import get_e_waybill_info
 
 
@@ -48,6 +52,9 @@ def validate(doc, method=None):
     validate_supplier_invoice_number(doc)
     validate_with_inward_supply(doc)
     set_reconciliation_status(doc)
+    set_cleaner_bill_no(
+        doc, doc.posting_date if doc.is_return else doc.bill_date or doc.posting_date
+    )
 
 
 def set_reconciliation_status(doc):
@@ -12,6 +12,7 @@ from india_compliance.gst_india.overrides.transaction import DOCTYPES_WITH_GST_D
 from india_compliance.gst_india.utils.tests import (
     _append_taxes,
     append_item,
+    create_cess_accounts,
     create_transaction,
 )
 
@@ -711,47 +712,3 @@ class TestSpecificTransactions(FrappeTestCase):
         si_return = make_sales_return(si.name)
 
         self.assertEqual(si_return.vehicle_no, None)
-
-
-def create_cess_accounts():
-    input_cess_non_advol_account = create_tax_accounts("Input Tax Cess Non Advol")
-    output_cess_non_advol_account = create_tax_accounts("Output Tax Cess Non Advol")
-    input_cess_account = create_tax_accounts("Input Tax Cess")
-    output_cess_account = create_tax_accounts("Output Tax Cess")
-
-    settings = frappe.get_doc("GST Settings")
-    for row in settings.gst_accounts:
-        if row.company != "_Test Indian Registered Company":
-            continue
-
-        if row.account_type == "Input":
-            row.cess_account = input_cess_account.name
-            row.cess_non_advol_account = input_cess_non_advol_account.name
-
-        if row.account_type == "Output":
-            row.cess_account = output_cess_account.name
-            row.cess_non_advol_account = output_cess_non_advol_account.name
-
-    settings.save()
-
-
-def create_tax_accounts(account_name):
-    defaults = {
-        "company": "_Test Indian Registered Company",
-        "doctype": "Account",
-        "account_type": "Tax",
-        "is_group": 0,
-    }
-
-    if "Input" in account_name:
-        parent_account = "Tax Assets - _TIRC"
-    else:
-        parent_account = "Duties and Taxes - _TIRC"
-
-    return frappe.get_doc(
-        {
-            "account_name": account_name,
-            "parent_account": parent_account,
-            **defaults,
-        }
-    ).save()
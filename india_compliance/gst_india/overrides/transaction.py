@@ -15,12 +15,14 @@ from india_compliance.gst_india.constants import (
     STATE_NUMBERS,
 )
 from india_compliance.gst_india.constants.custom_fields import E_WAYBILL_INV_FIELDS
+from india_compliance.gst_india.doctype.gst_hsn_code.gst_hsn_code import hsn_code_exists
 from india_compliance.gst_india.doctype.gstin.gstin import (
     _validate_gstin_info,
     get_gstin_status,
 )
 from india_compliance.gst_india.utils import (
     get_all_gst_accounts,
+    get_gst_account_fields_by_type,
     get_gst_accounts_by_tax_type,
     get_gst_accounts_by_type,
     get_hsn_settings,
@@ -30,6 +32,7 @@ from india_compliance.gst_india.utils import (
     join_list_with_custom_separators,
     validate_gst_category,
 )
+from india_compliance.gst_india.utils.validation_context import get_validation_context
 from india_compliance.income_tax_india.overrides.tax_withholding_category import (
     get_tax_withholding_accounts,
 )
@@ -111,7 +114,11 @@ def update_taxable_values(doc, valid_accounts):
 
 
 def get_tds_amount(doc):
-    tds_accounts = get_tax_withholding_accounts(doc.company)
+    tds_accounts = get_validation_context().get(
+        "tax_withholding_accounts",
+        doc.company,
+        lambda: get_tax_withholding_accounts(doc.company),
+    )
     tds_amount = 0
     for row in doc.taxes:
         if row.account_head not in tds_accounts:
@@ -128,8 +135,12 @@ def get_tds_amount(doc):
 
 def is_indian_registered_company(doc):
     if not doc.get("company_gstin"):
-        country, gst_category = frappe.get_cached_value(
-            "Company", doc.company, ("country", "gst_category")
+        country, gst_category = get_validation_context().get(
+            "company",
+            doc.company,
+            lambda: frappe.get_cached_value(
+                "Company", doc.company, ("country", "gst_category")
+            ),
         )
 
         if country != "India" or gst_category == "Unregistered":
@@ -203,11 +214,18 @@ def validate_gst_accounts(doc, is_sales_transaction=False):
     if not doc.taxes:
         return
 
+    context = get_validation_context()
+    all_gst_accounts = context.get(
+        "all_gst_accounts",
+        doc.company,
+        lambda: set(get_all_gst_accounts(doc.company)),
+    )
+
     if not (
         rows_to_validate := [
             row
             for row in doc.taxes
-            if row.tax_amount and row.account_head in get_all_gst_accounts(doc.company)
+            if row.tax_amount and row.account_head in all_gst_accounts
         ]
     ):
         return
@@ -227,13 +245,19 @@ def validate_gst_accounts(doc, is_sales_transaction=False):
     def _throw(message, title=None):
         frappe.throw(message, title=title or _("Invalid GST Account"))
 
-    all_valid_accounts, intra_state_accounts, inter_state_accounts = get_valid_accounts(
-        doc.company,
-        for_sales=is_sales_transaction,
-        for_purchase=not is_sales_transaction,
+    all_valid_accounts, intra_state_accounts, inter_state_accounts = context.get(
+        "valid_accounts",
+        (doc.company, is_sales_transaction),
+        lambda: get_valid_accounts(
+            doc.company,
+            for_sales=is_sales_transaction,
+            for_purchase=not is_sales_transaction,
+        ),
     )
-    cess_non_advol_accounts = get_gst_accounts_by_tax_type(
-        doc.company, "cess_non_advol"
+    cess_non_advol_accounts = context.get(
+        "cess_non_advol_accounts",
+        doc.company,
+        lambda: get_gst_accounts_by_tax_type(doc.company, "cess_non_advol"),
     )
 
     # Company GSTIN = Party GSTIN
@@ -286,7 +310,13 @@ def validate_gst_accounts(doc, is_sales_transaction=False):
     elif not doc.is_reverse_charge:
         if idx := _get_matched_idx(
             rows_to_validate,
-            get_gst_accounts_by_type(doc.company, "Reverse Charge").values(),
+            context.get(
+                "reverse_charge_accounts",
+                doc.company,
+                lambda: list(
+                    get_gst_accounts_by_type(doc.company, "Reverse Charge").values()
+                ),
+            ),
         ):
             _throw(
                 _(
@@ -490,8 +520,11 @@ def validate_items(doc):
 
 
 def validate_place_of_supply(doc):
-    valid_options = get_place_of_supply_options(
-        as_list=True,
+    context = get_validation_context()
+    valid_options = context.get(
+        "place_of_supply_options",
+        None,
+        lambda: set(get_place_of_supply_options(as_list=True)),
     )
 
     if doc.place_of_supply not in valid_options:
@@ -509,7 +542,13 @@ def validate_place_of_supply(doc):
         and doc.place_of_supply != "96-Other Countries"
         and (
             not doc.shipping_address_name
-            or frappe.db.get_value("Address", doc.shipping_address_name, "country")
+            or context.get(
+                "address_country",
+                doc.shipping_address_name,
+                lambda: frappe.db.get_value(
+                    "Address", doc.shipping_address_name, "country"
+                ),
+            )
             != "India"
         )
     ):
@@ -542,17 +581,23 @@ def get_source_state_code(doc):
         return "96"
 
     if doc.gst_category == "Unregistered" and doc.supplier_address:
-        return frappe.db.get_value(
-            "Address",
+        return get_validation_context().get(
+            "address_state_number",
             doc.supplier_address,
-            "gst_state_number",
+            lambda: frappe.db.get_value(
+                "Address",
+                doc.supplier_address,
+                "gst_state_number",
+            ),
         )
 
     return (doc.supplier_gstin or doc.company_gstin)[:2]
 
 
 def validate_hsn_codes(doc, method=None):
-    validate_hsn_code, valid_hsn_length = get_hsn_settings()
+    validate_hsn_code, valid_hsn_length = get_validation_context().get(
+        "hsn_settings", None, get_hsn_settings
+    )
 
     if not validate_hsn_code:
         return
@@ -560,9 +605,14 @@ def validate_hsn_codes(doc, method=None):
     return _validate_hsn_codes(doc, valid_hsn_length, message=None)
 
 
-def _validate_hsn_codes(doc, valid_hsn_length, message=None):
+def _validate_hsn_codes(doc, valid_hsn_length, message=None, validate_existence=False):
+    """
+    :param validate_existence: codes not found in GST HSN Code are invalid on submit,
+        else only a warning is shown for them on save
+    """
     rows_with_missing_hsn = []
     rows_with_invalid_hsn = []
+    rows_with_unknown_hsn = []
 
     for item in doc.items:
         if not (hsn_code := item.get("gst_hsn_code")):
@@ -571,10 +621,16 @@ def _validate_hsn_codes(doc, valid_hsn_length, message=None):
         elif len(hsn_code) not in valid_hsn_length:
             rows_with_invalid_hsn.append(str(item.idx))
 
+        elif not hsn_code_exists(hsn_code):
+            rows_with_unknown_hsn.append(str(item.idx))
+
     if doc.docstatus == 1:
         # Same error for erroneous rows on submit
         rows_with_invalid_hsn += rows_with_missing_hsn
 
+        if validate_existence:
+            rows_with_invalid_hsn += rows_with_unknown_hsn
+
         if not rows_with_invalid_hsn:
             return
 
@@ -609,6 +665,16 @@ def _validate_hsn_codes(doc, valid_hsn_length, message=None):
             title=_("Invalid HSN/SAC"),
         )
 
+    if rows_with_unknown_hsn:
+        frappe.msgprint(
+            _(
+                "{0}"
+                "HSN/SAC code could not be found in GST HSN Code for the following"
+                " row numbers: <br>{1}"
+            ).format(message or "", frappe.bold(", ".join(rows_with_unknown_hsn))),
+            title=_("Invalid HSN/SAC"),
+        )
+
 
 def validate_overseas_gst_category(doc, method=None):
     if not is_overseas_doc(doc):
@@ -991,8 +1057,9 @@ class ItemGSTDetails:
         else:
             account_type = "Input"
 
-        gst_account_map = get_gst_accounts_by_type(company, account_type, throw=False)
-        self.gst_account_map = {v: k for k, v in gst_account_map.items()}
+        self.gst_account_map = get_gst_account_fields_by_type(
+            company, account_type, throw=False
+        )
 
     def update_item_count(self):
         self.item_count = frappe._dict()
@@ -1023,6 +1090,7 @@ class ItemGSTDetails:
         """
         tax_details = frappe._dict()
         item_defaults = frappe._dict(count=0)
+        item_count = self.item_count
 
         for row in GST_TAX_TYPES:
             item_defaults.update({f"{row}_rate": 0, f"{row}_amount": 0})
@@ -1037,23 +1105,24 @@ class ItemGSTDetails:
 
             account_type = self.gst_account_map[row.account_head]
             tax = account_type[:-8]
-
-            old = frappe.parse_json(row.item_wise_tax_detail)
+            rate_field = f"{tax}_rate"
+            amount_field = f"{tax}_amount"
 
             # update item taxes
-            for item_name in set(old.keys()):
-                item_taxes = tax_details.setdefault(item_name, item_defaults.copy())
+            for item_name, (tax_rate, tax_amount) in frappe.parse_json(
+                row.item_wise_tax_detail
+            ).items():
+                if not (item_taxes := tax_details.get(item_name)):
+                    item_taxes = tax_details[item_name] = item_defaults.copy()
 
-                item_taxes["count"] = self.item_count[item_name]
-
-                tax_rate, tax_amount = old[item_name]
+                item_taxes["count"] = item_count[item_name]
 
                 # cases when charge type == "Actual"
                 if tax_amount and not tax_rate:
                     continue
 
-                item_taxes[f"{tax}_rate"] = tax_rate
-                item_taxes[f"{tax}_amount"] += tax_amount
+                item_taxes[rate_field] = tax_rate
+                item_taxes[amount_field] += tax_amount
 
         self.item_tax_details = tax_details
 
@@ -1078,26 +1147,22 @@ class ItemGSTDetails:
         if not item_tax_detail:
             return {}
 
-        if item_tax_detail.count == 1:
+        if item_tax_detail["count"] == 1:
             return item_tax_detail
 
         # Handle rounding errors
         response = item_tax_detail.copy()
-        for tax in GST_TAX_TYPES:
-            if (tax_rate := item_tax_detail[f"{tax}_rate"]) == 0:
+        for rate_field, amount_field, precision, multiplier_field in self.tax_fields:
+            if (tax_rate := item_tax_detail[rate_field]) == 0:
                 continue
 
-            tax_amount_field = f"{tax}_amount"
-            precision = self.precision.get(tax_amount_field)
-
-            multiplier = item.qty if tax == "cess_non_advol" else item.taxable_value
-            tax_amount = flt(tax_rate * multiplier, precision)
-            tax_amount = max(tax_amount, item_tax_detail[tax_amount_field])
+            tax_amount = flt(tax_rate * item.get(multiplier_field), precision)
+            tax_amount = max(tax_amount, item_tax_detail[amount_field])
 
-            item_tax_detail[tax_amount_field] -= tax_amount
+            item_tax_detail[amount_field] -= tax_amount
             item_tax_detail["count"] -= 1
 
-            response.update({tax_amount_field: tax_amount})
+            response[amount_field] = tax_amount
 
         return response
 
@@ -1115,6 +1180,17 @@ class ItemGSTDetails:
             precision = meta.get_field(field).precision
             self.precision.update({field: precision})
 
+        # fields used for each tax type to handle rounding errors
+        self.tax_fields = [
+            (
+                f"{tax_type}_rate",
+                f"{tax_type}_amount",
+                self.precision.get(f"{tax_type}_amount"),
+                "qty" if tax_type == "cess_non_advol" else "taxable_value",
+            )
+            for tax_type in GST_TAX_TYPES
+        ]
+
 
 def set_gst_treatment_for_item(doc):
     for item in doc.items:
@@ -1170,7 +1246,11 @@ def validate_gstin(gstin, transaction_date):
     if not settings.validate_gstin_status:
         return
 
-    gstin_doc = get_gstin_status(gstin, transaction_date)
+    gstin_doc = get_validation_context().get(
+        "gstin_status",
+        (gstin, transaction_date),
+        lambda: get_gstin_status(gstin, transaction_date),
+    )
 
     if not gstin_doc:
         return
@@ -1182,6 +1262,8 @@ def validate_transaction(doc, method=None):
     if ignore_gst_validations(doc):
         return False
 
+    get_validation_context().validated_docs += 1
+
     if doc.place_of_supply:
         validate_place_of_supply(doc)
     else:
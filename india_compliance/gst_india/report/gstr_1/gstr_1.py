@@ -17,6 +17,8 @@ from india_compliance.gst_india.utils import (
     get_gst_accounts_by_type,
     is_overseas_transaction,
 )
+from india_compliance.gst_india.utils.item_gst_summary import get_item_gst_summary
+from india_compliance.gst_india.utils.query import get_rows_in_batches
 
 B2C_LIMIT = 2_50_000
 
@@ -398,18 +400,16 @@ class Gstr1Report:
         self.invoice_items = frappe._dict()
         self.nil_exempt_non_gst = {}
 
-        items = frappe.db.sql(
-            """
-			select item_code, item_name, parent, taxable_value, item_tax_rate, gst_treatment
-            from `tab%s Item`
-			where parent in (%s)
-		"""
-            % (self.doctype, ", ".join(["%s"] * len(self.invoices))),
-            tuple(self.invoices),
-            as_dict=1,
+        item = frappe.qb.DocType(f"{self.doctype} Item")
+        query = frappe.qb.from_(item).select(
+            item.item_code,
+            item.item_name,
+            item.parent,
+            item.taxable_value,
+            item.gst_treatment,
         )
 
-        for d in items:
+        for d in get_rows_in_batches(query, item.parent, self.invoices):
             d.item_code = d.item_code or d.item_name
             self.invoice_items.setdefault(d.parent, {}).setdefault(d.item_code, 0.0)
             self.invoice_items[d.parent][d.item_code] += d.get("taxable_value", 0)
@@ -427,68 +427,48 @@ class Gstr1Report:
                 self.nil_exempt_non_gst[d.parent][2] += d.get("taxable_value", 0)
 
     def get_items_based_on_tax_rate(self):
-        tax_details = frappe.db.sql(
-            """
-			select
-				parent, account_head, item_wise_tax_detail
-			from `tab%s`
-			where
-				parenttype = %s and docstatus = 1
-				and parent in (%s)
-			order by account_head
-		"""
-            % (self.tax_doctype, "%s", ", ".join(["%s"] * len(self.invoices.keys()))),
-            tuple([self.doctype] + list(self.invoices.keys())),
+        taxes = frappe.qb.DocType(self.tax_doctype)
+        query = (
+            frappe.qb.from_(taxes)
+            .select(taxes.parent, taxes.account_head)
+            .where(taxes.parenttype == self.doctype)
+            .where(taxes.docstatus == 1)
+            .distinct()
         )
 
         self.items_based_on_tax_rate = {}
         self.invoice_cess = frappe._dict()
 
+        gst_invoices = set()
         unidentified_gst_accounts = set()
         unidentified_gst_accounts_invoice = set()
-        for parent, account, item_wise_tax_detail in tax_details:
-            if not item_wise_tax_detail:
-                continue
+        for parent, account in get_rows_in_batches(
+            query, taxes.parent, self.invoices, as_dict=False
+        ):
+            if account in self.gst_accounts.values():
+                gst_invoices.add(parent)
 
-            if account not in self.gst_accounts.values():
-                if "gst" in account.lower():
-                    unidentified_gst_accounts.add(account)
-                    unidentified_gst_accounts_invoice.add(parent)
+            elif "gst" in account.lower():
+                unidentified_gst_accounts.add(account)
+                unidentified_gst_accounts_invoice.add(parent)
 
-                continue
+        for item in get_item_gst_summary(
+            self.doctype, gst_invoices, ("parent", "gst_rate", "item_key")
+        ):
+            if item.cess_amount:
+                self.invoice_cess.setdefault(item.parent, {})
+                self.invoice_cess[item.parent].setdefault(item.item_key, 0.0)
+                self.invoice_cess[item.parent][item.item_key] += item.cess_amount
 
-            try:
-                item_wise_tax_detail = json.loads(item_wise_tax_detail)
-            except ValueError:
+            if not item.gst_rate and item.parent not in self.nil_exempt_non_gst:
                 continue
 
-            is_cess = account == self.gst_accounts.cess_account
-            is_cgst_or_sgst = (
-                account == self.gst_accounts.cgst_account
-                or account == self.gst_accounts.sgst_account
+            (
+                self.items_based_on_tax_rate.setdefault(item.parent, {})
+                .setdefault(item.gst_rate, set())
+                .add(item.item_key)
             )
 
-            for item_code, tax_amounts in item_wise_tax_detail.items():
-                tax_rate = tax_amounts[0]
-
-                if not tax_rate and parent not in self.nil_exempt_non_gst:
-                    continue
-
-                if is_cess:
-                    self.invoice_cess.setdefault(parent, {})
-                    self.invoice_cess[parent].setdefault(item_code, 0.0)
-                    self.invoice_cess[parent][item_code] += tax_amounts[1]
-                    continue
-
-                if is_cgst_or_sgst:
-                    tax_rate *= 2
-
-                (
-                    self.items_based_on_tax_rate.setdefault(parent, {})
-                    .setdefault(tax_rate, set())
-                    .add(item_code)
-                )
-
         if unidentified_gst_accounts:
             frappe.msgprint(
                 _("Following accounts might be selected in GST Settings:")
@@ -1,14 +1,22 @@
+import json
+
 import frappe
+from frappe import _
 from frappe.tests.utils import FrappeTestCase
 from frappe.utils import getdate
 
 from india_compliance.gst_india.report.gstr_1.gstr_1 import (
     GSTR1DocumentIssuedSummary,
+    Gstr1Report,
     execute,
     format_data_to_dict,
     get_json,
 )
-from india_compliance.gst_india.utils.tests import create_sales_invoice
+from india_compliance.gst_india.utils import is_overseas_transaction
+from india_compliance.gst_india.utils.tests import (
+    create_sales_invoice,
+    create_sales_invoices_for_gst_reports,
+)
 
 JSON_OUTPUT = {
     "doc_det": [
@@ -112,6 +120,138 @@ class TestGSTR1DocumentIssuedSummary(FrappeTestCase):
         self.assertDictEqual(report_json, JSON_OUTPUT)
 
 
+class TestGSTR1ReportParity(FrappeTestCase):
+    """
+    Compares GSTR-1 against rates and cess computed from `item_wise_tax_detail`
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        create_sales_invoices_for_gst_reports()
+
+    def test_report_matches_item_wise_tax_detail(self):
+        for type_of_business in (
+            "B2B",
+            "B2C Large",
+            "B2C Small",
+            "EXPORT",
+            "NIL Rated",
+        ):
+            filters = {
+                "company": "_Test Indian Registered Company",
+                "company_gstin": "24AAQCA8719H1ZC",
+                "from_date": getdate(),
+                "to_date": getdate(),
+                "type_of_business": type_of_business,
+            }
+
+            with self.subTest(type_of_business=type_of_business):
+                columns, data = Gstr1Report(filters).run()
+                expected_columns, expected_data = ItemWiseTaxDetailGstr1Report(
+                    filters
+                ).run()
+
+                self.assertEqual(columns, expected_columns)
+                self.assertCountEqual(data, expected_data)
+
+
+class ItemWiseTaxDetailGstr1Report(Gstr1Report):
+    def get_items_based_on_tax_rate(self):
+        tax_details = frappe.db.sql(
+            """
+			select
+				parent, account_head, item_wise_tax_detail
+			from `tab%s`
+			where
+				parenttype = %s and docstatus = 1
+				and parent in (%s)
+			order by account_head
+		"""
+            % (self.tax_doctype, "%s", ", ".join(["%s"] * len(self.invoices.keys()))),
+            tuple([self.doctype] + list(self.invoices.keys())),
+        )
+
+        self.items_based_on_tax_rate = {}
+        self.invoice_cess = frappe._dict()
+
+        unidentified_gst_accounts = set()
+        unidentified_gst_accounts_invoice = set()
+        for parent, account, item_wise_tax_detail in tax_details:
+            if not item_wise_tax_detail:
+                continue
+
+            if account not in self.gst_accounts.values():
+                if "gst" in account.lower():
+                    unidentified_gst_accounts.add(account)
+                    unidentified_gst_accounts_invoice.add(parent)
+
+                continue
+
+            try:
+                item_wise_tax_detail = json.loads(item_wise_tax_detail)
+            except ValueError:
+                continue
+
+            is_cess = account == self.gst_accounts.cess_account
+            is_cgst_or_sgst = (
+                account == self.gst_accounts.cgst_account
+                or account == self.gst_accounts.sgst_account
+            )
+
+            for item_code, tax_amounts in item_wise_tax_detail.items():
+                tax_rate = tax_amounts[0]
+
+                if not tax_rate and parent not in self.nil_exempt_non_gst:
+                    continue
+
+                if is_cess:
+                    self.invoice_cess.setdefault(parent, {})
+                    self.invoice_cess[parent].setdefault(item_code, 0.0)
+                    self.invoice_cess[parent][item_code] += tax_amounts[1]
+                    continue
+
+                if is_cgst_or_sgst:
+                    tax_rate *= 2
+
+                (
+                    self.items_based_on_tax_rate.setdefault(parent, {})
+                    .setdefault(tax_rate, set())
+                    .add(item_code)
+                )
+
+        if unidentified_gst_accounts:
+            frappe.msgprint(
+                _("Following accounts might be selected in GST Settings:")
+                + "<br>"
+                + "<br>".join(unidentified_gst_accounts),
+                alert=True,
+            )
+
+        for invoice_no, items in self.invoice_items.items():
+            if (
+                invoice_no in self.items_based_on_tax_rate
+                or invoice_no in unidentified_gst_accounts_invoice
+            ):
+                continue
+
+            invoice = self.invoices.get(invoice_no, {})
+            if not invoice.get("is_export_with_gst") and is_overseas_transaction(
+                "Sales Invoice", invoice.gst_category, invoice.place_of_supply
+            ):
+                self.items_based_on_tax_rate.setdefault(invoice_no, {}).setdefault(
+                    0, []
+                ).extend(items)
+
+            if (
+                invoice_no in self.nil_exempt_non_gst
+                and self.nil_exempt_non_gst[invoice_no][2] == 0
+            ):
+                self.items_based_on_tax_rate.setdefault(invoice_no, {}).setdefault(
+                    0, []
+                ).extend(items)
+
+
 def create_test_items():
     """Create Sales Invoices for testing GSTR1 Document Issued Summary."""
 
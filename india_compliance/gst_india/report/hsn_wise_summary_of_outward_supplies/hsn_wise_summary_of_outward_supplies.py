@@ -6,13 +6,13 @@ import json
 
 import frappe
 from frappe import _
-from frappe.model.meta import get_field_precision
+from frappe.query_builder.functions import IfNull, LiteralValue
 from frappe.utils import cstr, flt, getdate
-import erpnext
 
 from india_compliance.gst_india.constants import GST_ACCOUNT_FIELDS
 from india_compliance.gst_india.report.gstr_1.gstr_1 import get_company_gstin_number
 from india_compliance.gst_india.utils import get_gst_accounts_by_type, get_gst_uom
+from india_compliance.gst_india.utils.item_gst_summary import get_item_gst_query
 
 
 def execute(filters=None):
@@ -22,32 +22,14 @@ def execute(filters=None):
     validate_filters(filters)
 
     columns = get_columns()
-    output_gst_accounts_dict = get_gst_accounts_by_type(filters.company, "Output")
+    output_gst_accounts = get_gst_accounts_by_type(filters.company, "Output")
 
-    output_gst_accounts = set()
-    non_cess_accounts = set()
-    for account_type, account_name in output_gst_accounts_dict.items():
-        if not account_name:
-            continue
-
-        output_gst_accounts.add(account_name)
-        if account_type in GST_ACCOUNT_FIELDS[:3]:
-            non_cess_accounts.add(account_name)
-
-    company_currency = erpnext.get_company_currency(filters.company)
     item_list = get_items(filters)
-    itemised_tax, tax_columns = get_tax_accounts(
-        item_list, columns, company_currency, output_gst_accounts
-    )
+    tax_columns = get_tax_columns(item_list, columns, output_gst_accounts)
 
     data = []
-    added_item = set()
 
     for d in item_list:
-        key = (d.parent, d.gst_hsn_code, d.item_code)
-        if key in added_item:
-            continue
-
         if d.gst_hsn_code.startswith("99"):
             # service item doesn't have qty/uom
             d.stock_qty = 0
@@ -55,31 +37,22 @@ def execute(filters=None):
         else:
             d.uqc = get_gst_uom(d.get("uqc"))
 
-        total_tax = 0
-        tax_rate = 0
-
-        item_tax = itemised_tax.get((d.parent, d.item_code), {})
-        for tax in tax_columns:
-            tax_data = item_tax.get(tax, {})
-            total_tax += flt(tax_data.get("tax_amount", 0))
-            if tax in non_cess_accounts:
-                tax_rate += flt(tax_data.get("tax_rate", 0))
+        total_tax = sum(flt(d.get(tax_amount)) for tax_amount in tax_columns)
 
         row = [
             d.gst_hsn_code,
             d.description,
             d.uqc,
             d.stock_qty,
-            tax_rate,
+            flt(d.gst_rate, 2),
             d.taxable_value + total_tax,
             d.taxable_value,
         ]
 
-        for tax in tax_columns:
-            row.append(item_tax.get(tax, {}).get("tax_amount", 0))
+        for tax_amount in tax_columns:
+            row.append(flt(d.get(tax_amount)))
 
         data.append(row)
-        added_item.add(key)
 
     if data:
         data = get_merged_data(columns, data)  # merge same hsn code data
@@ -146,124 +119,57 @@ def get_columns():
     return columns
 
 
-def get_conditions(filters):
-    conditions = ""
-
-    for opts in (
-        ("company", " and company=%(company)s"),
-        ("gst_hsn_code", " and gst_hsn_code=%(gst_hsn_code)s"),
-        ("company_gstin", " and company_gstin=%(company_gstin)s"),
-        ("from_date", " and posting_date >= %(from_date)s"),
-        ("to_date", " and posting_date <= %(to_date)s"),
-    ):
-        if filters.get(opts[0]):
-            conditions += opts[1]
-
-    return conditions
-
-
 def get_items(filters):
-    conditions = get_conditions(filters)
-    match_conditions = frappe.build_match_conditions("Sales Invoice")
-    if match_conditions:
-        conditions += f" and {match_conditions} "
-
-    items = frappe.db.sql(
-        f"""
-        SELECT
-            `tabSales Invoice Item`.gst_hsn_code,
-            `tabSales Invoice Item`.stock_uom as uqc,
-            sum(`tabSales Invoice Item`.stock_qty) AS stock_qty,
-            sum(`tabSales Invoice Item`.taxable_value) AS taxable_value,
-            `tabSales Invoice Item`.parent,
-            `tabSales Invoice Item`.item_code,
-            `tabGST HSN Code`.description
-        FROM
-            `tabSales Invoice`
-            INNER JOIN `tabSales Invoice Item` ON `tabSales Invoice`.name = `tabSales Invoice Item`.parent
-            INNER JOIN `tabGST HSN Code` ON `tabSales Invoice Item`.gst_hsn_code = `tabGST HSN Code`.name
-        WHERE
-            `tabSales Invoice`.docstatus = 1
-            AND `tabSales Invoice`.company_gstin != IFNULL(`tabSales Invoice`.billing_address_gstin, '')
-            AND `tabSales Invoice Item`.gst_hsn_code IS NOT NULL {conditions}
-        GROUP BY
-            `tabSales Invoice Item`.parent,
-            `tabSales Invoice Item`.item_code
-        """,
-        filters,
-        as_dict=1,
-    )
-
-    return items
-
-
-def get_tax_accounts(
-    item_list,
-    columns,
-    company_currency,
-    output_gst_accounts,
-):
-    if not item_list:
-        return [], {}
-
-    tax_doctype = "Sales Taxes and Charges"
-    tax_columns = set()
-    itemised_tax = {}
-
-    tax_amount_precision = (
-        get_field_precision(
-            frappe.get_meta(tax_doctype).get_field("tax_amount"),
-            currency=company_currency,
+    sales_invoice = frappe.qb.DocType("Sales Invoice")
+    sales_invoice_item = frappe.qb.DocType("Sales Invoice Item")
+    hsn_code = frappe.qb.DocType("GST HSN Code")
+
+    query = (
+        get_item_gst_query("Sales Invoice", ("gst_hsn_code", "stock_uom", "gst_rate"))
+        .join(hsn_code)
+        .on(sales_invoice_item.gst_hsn_code == hsn_code.name)
+        .select(sales_invoice_item.stock_uom.as_("uqc"), hsn_code.description)
+        .where(
+            sales_invoice.company_gstin
+            != IfNull(sales_invoice.billing_address_gstin, "")
         )
-        or 2
+        .where(sales_invoice_item.gst_hsn_code.isnotnull())
     )
 
-    invoice_numbers = [d.parent for d in item_list]
+    for field, condition in (
+        ("company", sales_invoice.company == filters.get("company")),
+        (
+            "gst_hsn_code",
+            sales_invoice_item.gst_hsn_code == filters.get("gst_hsn_code"),
+        ),
+        ("company_gstin", sales_invoice.company_gstin == filters.get("company_gstin")),
+        ("from_date", sales_invoice.posting_date >= filters.get("from_date")),
+        ("to_date", sales_invoice.posting_date <= filters.get("to_date")),
+    ):
+        if filters.get(field):
+            query = query.where(condition)
 
-    doctype = frappe.qb.DocType(tax_doctype)
+    if match_conditions := frappe.build_match_conditions("Sales Invoice"):
+        query = query.where(LiteralValue(match_conditions))
 
-    tax_details = (
-        frappe.qb.from_(doctype)
-        .select(
-            doctype.parent,
-            doctype.account_head,
-            doctype.item_wise_tax_detail,
-            doctype.base_tax_amount_after_discount_amount,
-        )
-        .where(doctype.parenttype == "Sales Invoice")
-        .where(doctype.docstatus == 1)
-        .where(doctype.parent.isin(invoice_numbers))
-        .where(doctype.account_head.isin(output_gst_accounts))
-    ).run()
-
-    for parent, account_head, item_wise_tax_detail, tax_amount in tax_details:
-        if not item_wise_tax_detail:
-            continue
+    return query.run(as_dict=True)
 
-        if account_head and tax_amount:
-            # as description is text editor earlier and markup can break the column convention in reports
-            tax_columns.add(account_head)
-
-        try:
-            item_taxes = json.loads(item_wise_tax_detail)
-            for item_code, tax_data in item_taxes.items():
-                tax_rate, tax_amount = tax_data
-                if not tax_amount:
-                    continue
-
-                item_taxes = itemised_tax.setdefault((parent, item_code), {})
-                item_taxes[account_head] = frappe._dict(
-                    tax_rate=flt(tax_rate, 2),
-                    tax_amount=flt(tax_amount, tax_amount_precision),
-                )
 
-        except ValueError:
-            continue
+def get_tax_columns(item_list, columns, output_gst_accounts):
+    """
+    Adds a column for each GST account with tax amount,
+    and returns item fields of tax amounts by account
+    """
+    tax_columns = {}
+
+    for account_field in GST_ACCOUNT_FIELDS:
+        account_head = output_gst_accounts.get(account_field)
+        tax_amount = f"{account_field[:-8]}_amount"
 
-    for account_head in tax_columns:
-        if account_head not in output_gst_accounts:
+        if not account_head or not any(d.get(tax_amount) for d in item_list):
             continue
 
+        tax_columns[tax_amount] = account_head
         columns.append(
             {
                 "label": account_head,
@@ -273,7 +179,7 @@ def get_tax_accounts(
             }
         )
 
-    return itemised_tax, tax_columns
+    return tax_columns
 
 
 def get_merged_data(columns, data):
@@ -2,14 +2,28 @@
 # For license information, please see license.txt
 
 
+import json
 from unittest import TestCase
 
 import frappe
+from frappe.model.meta import get_field_precision
+from frappe.utils import flt, getdate
+import erpnext
 
+from india_compliance.gst_india.constants import GST_ACCOUNT_FIELDS
 from india_compliance.gst_india.report.hsn_wise_summary_of_outward_supplies.hsn_wise_summary_of_outward_supplies import (
     execute as run_report,
 )
-from india_compliance.gst_india.utils.tests import append_item, create_sales_invoice
+from india_compliance.gst_india.report.hsn_wise_summary_of_outward_supplies.hsn_wise_summary_of_outward_supplies import (
+    get_columns,
+    get_merged_data,
+)
+from india_compliance.gst_india.utils import get_gst_accounts_by_type, get_gst_uom
+from india_compliance.gst_india.utils.tests import (
+    append_item,
+    create_sales_invoice,
+    create_sales_invoices_for_gst_reports,
+)
 
 
 class TestHSNWiseSummaryReport(TestCase):
@@ -53,3 +67,201 @@ class TestHSNWiseSummaryReport(TestCase):
         self.assertEquals(hsn_row["stock_qty"], 6.0)
         self.assertEquals(hsn_row["taxable_amount"], 600)
         self.assertEquals(hsn_row["total_amount"], 708)  # 6 * 100 * 1.18
+
+    def test_hsn_summary_matches_item_wise_tax_detail(self):
+        # invoices with items of different HSN codes, grouped by item before
+        frappe.db.delete(
+            "Sales Invoice", {"company": "_Test Indian Registered Company"}
+        )
+        create_sales_invoices_for_gst_reports()
+
+        filters = frappe._dict(
+            {
+                "company": "_Test Indian Registered Company",
+                "company_gstin": "24AAQCA8719H1ZC",
+                "from_date": getdate(),
+                "to_date": getdate(),
+            }
+        )
+
+        columns, data = run_report(filters=filters)
+        expected_columns, expected_data = run_item_wise_tax_detail_report(filters)
+
+        self.assertCountEqual(
+            [column["fieldname"] for column in columns],
+            [column["fieldname"] for column in expected_columns],
+        )
+        self.assertCountEqual(get_rounded_rows(data), get_rounded_rows(expected_data))
+
+
+def get_rounded_rows(data):
+    return [
+        {
+            fieldname: flt(value, 2) if isinstance(value, float) else value
+            for fieldname, value in row.items()
+        }
+        for row in data
+    ]
+
+
+def run_item_wise_tax_detail_report(filters):
+    """HSN-wise summary with taxes computed from `item_wise_tax_detail`"""
+    columns = get_columns()
+    output_gst_accounts_dict = get_gst_accounts_by_type(filters.company, "Output")
+
+    output_gst_accounts = set()
+    non_cess_accounts = set()
+    for account_type, account_name in output_gst_accounts_dict.items():
+        if not account_name:
+            continue
+
+        output_gst_accounts.add(account_name)
+        if account_type in GST_ACCOUNT_FIELDS[:3]:
+            non_cess_accounts.add(account_name)
+
+    company_currency = erpnext.get_company_currency(filters.company)
+    item_list = get_items_by_invoice(filters)
+    itemised_tax, tax_columns = get_itemised_tax(
+        item_list, columns, company_currency, output_gst_accounts
+    )
+
+    data = []
+    added_item = set()
+
+    for d in item_list:
+        key = (d.parent, d.gst_hsn_code, d.item_code)
+        if key in added_item:
+            continue
+
+        if d.gst_hsn_code.startswith("99"):
+            d.stock_qty = 0
+            d.uqc = "NA"
+        else:
+            d.uqc = get_gst_uom(d.get("uqc"))
+
+        total_tax = 0
+        tax_rate = 0
+
+        item_tax = itemised_tax.get((d.parent, d.item_code), {})
+        for tax in tax_columns:
+            tax_data = item_tax.get(tax, {})
+            total_tax += flt(tax_data.get("tax_amount", 0))
+            if tax in non_cess_accounts:
+                tax_rate += flt(tax_data.get("tax_rate", 0))
+
+        row = [
+            d.gst_hsn_code,
+            d.description,
+            d.uqc,
+            d.stock_qty,
+            tax_rate,
+            d.taxable_value + total_tax,
+            d.taxable_value,
+        ]
+
+        for tax in tax_columns:
+            row.append(item_tax.get(tax, {}).get("tax_amount", 0))
+
+        data.append(row)
+        added_item.add(key)
+
+    if data:
+        data = get_merged_data(columns, data)
+
+    return columns, data
+
+
+def get_items_by_invoice(filters):
+    return frappe.db.sql(
+        """
+        SELECT
+            `tabSales Invoice Item`.gst_hsn_code,
+            `tabSales Invoice Item`.stock_uom as uqc,
+            sum(`tabSales Invoice Item`.stock_qty) AS stock_qty,
+            sum(`tabSales Invoice Item`.taxable_value) AS taxable_value,
+            `tabSales Invoice Item`.parent,
+            `tabSales Invoice Item`.item_code,
+            `tabGST HSN Code`.description
+        FROM
+            `tabSales Invoice`
+            INNER JOIN `tabSales Invoice Item` ON `tabSales Invoice`.name = `tabSales Invoice Item`.parent
+            INNER JOIN `tabGST HSN Code` ON `tabSales Invoice Item`.gst_hsn_code = `tabGST HSN Code`.name
+        WHERE
+            `tabSales Invoice`.docstatus = 1
+            AND `tabSales Invoice`.company_gstin != IFNULL(`tabSales Invoice`.billing_address_gstin, '')
+            AND `tabSales Invoice Item`.gst_hsn_code IS NOT NULL
+            AND company = %(company)s
+            AND company_gstin = %(company_gstin)s
+            AND posting_date >= %(from_date)s
+            AND posting_date <= %(to_date)s
+        GROUP BY
+            `tabSales Invoice Item`.parent,
+            `tabSales Invoice Item`.item_code
+        """,
+        filters,
+        as_dict=1,
+    )
+
+
+def get_itemised_tax(item_list, columns, company_currency, output_gst_accounts):
+    if not item_list:
+        return {}, set()
+
+    tax_doctype = "Sales Taxes and Charges"
+    tax_columns = set()
+    itemised_tax = {}
+
+    tax_amount_precision = (
+        get_field_precision(
+            frappe.get_meta(tax_doctype).get_field("tax_amount"),
+            currency=company_currency,
+        )
+        or 2
+    )
+
+    doctype = frappe.qb.DocType(tax_doctype)
+    tax_details = (
+        frappe.qb.from_(doctype)
+        .select(
+            doctype.parent,
+            doctype.account_head,
+            doctype.item_wise_tax_detail,
+            doctype.base_tax_amount_after_discount_amount,
+        )
+        .where(doctype.parenttype == "Sales Invoice")
+        .where(doctype.docstatus == 1)
+        .where(doctype.parent.isin([d.parent for d in item_list]))
+        .where(doctype.account_head.isin(output_gst_accounts))
+    ).run()
+
+    for parent, account_head, item_wise_tax_detail, tax_amount in tax_details:
+        if not item_wise_tax_detail:
+            continue
+
+        if account_head and tax_amount:
+            tax_columns.add(account_head)
+
+        for item_code, (tax_rate, tax_amount) in json.loads(
+            item_wise_tax_detail
+        ).items():
+            if not tax_amount:
+                continue
+
+            itemised_tax.setdefault((parent, item_code), {})[
+                account_head
+            ] = frappe._dict(
+                tax_rate=flt(tax_rate, 2),
+                tax_amount=flt(tax_amount, tax_amount_precision),
+            )
+
+    for account_head in tax_columns:
+        columns.append(
+            {
+                "label": account_head,
+                "fieldname": frappe.scrub(account_head),
+                "fieldtype": "Float",
+                "width": 110,
+            }
+        )
+
+    return itemised_tax, tax_columns
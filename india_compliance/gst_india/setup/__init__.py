@@ -1,4 +1,7 @@
+from itertools import islice
+
 import click
+import ijson
 
 import frappe
 from frappe.custom.doctype.custom_field.custom_field import (
@@ -17,11 +20,15 @@ from india_compliance.gst_india.constants.custom_fields import (
     HRMS_CUSTOM_FIELDS,
     SALES_REVERSE_CHARGE_FIELDS,
 )
+from india_compliance.gst_india.doctype.gst_hsn_code.gst_hsn_code import (
+    clear_hsn_code_index,
+)
 from india_compliance.gst_india.setup.property_setters import get_property_setters
 from india_compliance.gst_india.utils import get_data_file_path
 from india_compliance.gst_india.utils.custom_fields import toggle_custom_fields
 
 ITEM_VARIANT_FIELDNAMES = frozenset(("gst_hsn_code",))
+HSN_CODES_BATCH_SIZE = 20_000
 
 
 def after_install():
@@ -132,6 +139,7 @@ def create_hsn_codes():
 
 
 def _create_hsn_codes():
+    """Inserts HSN codes in batches, reading one batch of the file at a time"""
     user = frappe.session.user
     now = now_datetime()
 
@@ -145,27 +153,30 @@ def _create_hsn_codes():
         "description",
     ]
 
-    hsn_codes = [
-        [
-            code["hsn_code"],
-            now,
-            now,
-            user,
-            user,
-            code["hsn_code"],
-            code["description"],
-        ]
-        for code in frappe.get_file_json(get_data_file_path("hsn_codes.json"))
-    ]
-
-    frappe.db.bulk_insert(
-        "GST HSN Code",
-        fields,
-        hsn_codes,
-        ignore_duplicates=True,
-        chunk_size=20_000,
-    )
-
+    with open(get_data_file_path("hsn_codes.json"), "rb") as file:
+        codes = ijson.items(file, "item")
+
+        while batch := list(islice(codes, HSN_CODES_BATCH_SIZE)):
+            frappe.db.bulk_insert(
+                "GST HSN Code",
+                fields,
+                [
+                    [
+                        code["hsn_code"],
+                        now,
+                        now,
+                        user,
+                        user,
+                        code["hsn_code"],
+                        code["description"],
+                    ]
+                    for code in batch
+                ],
+                ignore_duplicates=True,
+                chunk_size=HSN_CODES_BATCH_SIZE,
+            )
+
+    clear_hsn_code_index()
     frappe.flags.hsn_codes_corrected = 1
 
 
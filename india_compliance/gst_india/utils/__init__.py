@@ -2,6 +2,7 @@ import copy
 import io
 import tarfile
 
+import ijson
 from dateutil import parser
 from pytz import timezone
 from titlecase import titlecase as _titlecase
@@ -38,6 +39,7 @@ from india_compliance.gst_india.constants import (
     TIMEZONE,
     UOM_MAP,
 )
+from india_compliance.gst_india.utils.validation_context import get_validation_context
 
 
 def get_state(state_number):
@@ -59,6 +61,44 @@ def load_doc(doctype, name, perm="read"):
     return doc
 
 
+def load_docs(doctype, names, perm="read"):
+    """
+    Get docs using a query per table instead of per doc, and check perms.
+    Docs are returned in the order of names.
+    """
+    docs = {
+        row.name: row
+        for row in frappe.get_all(doctype, filters={"name": ("in", names)}, fields="*")
+    }
+
+    for df in frappe.get_meta(doctype).get_table_fields() if docs else ():
+        for row in frappe.get_all(
+            df.options,
+            filters={
+                "parent": ("in", list(docs)),
+                "parenttype": doctype,
+                "parentfield": df.fieldname,
+            },
+            fields="*",
+            order_by="idx",
+        ):
+            docs[row.parent].setdefault(df.fieldname, []).append(row)
+
+    out = []
+    for name in names:
+        if name not in docs:
+            frappe.throw(
+                _("{0} {1} not found").format(_(doctype), name),
+                frappe.DoesNotExistError,
+            )
+
+        doc = frappe.get_doc({**docs[name], "doctype": doctype})
+        doc.check_permission(perm)
+        out.append(doc)
+
+    return out
+
+
 def update_onload(doc, key, value):
     """Set or update onload key in doc"""
 
@@ -398,10 +438,14 @@ def get_place_of_supply(party_details, doctype):
             party_details.gst_category == "Unregistered"
             and party_details.customer_address
         ):
-            gst_state_number, gst_state = frappe.db.get_value(
-                "Address",
+            gst_state_number, gst_state = get_validation_context().get(
+                "address_state",
                 party_details.customer_address,
-                ("gst_state_number", "gst_state"),
+                lambda: frappe.db.get_value(
+                    "Address",
+                    party_details.customer_address,
+                    ("gst_state_number", "gst_state"),
+                ),
             )
             return f"{gst_state_number}-{gst_state}"
 
@@ -440,6 +484,57 @@ def get_escaped_name(name):
     return name.replace("%", "%%")
 
 
+def get_gst_account_index():
+    """
+    Returns GST Accounts of GST Settings indexed for lookups:
+    - `accounts`: {(company, account_type): {"cgst_account": "ABC", ...}}
+    - `account_fields`: {(company, account_type): {"ABC": "cgst_account", ...}}
+    - `tax_type_accounts`: {(company, "cgst_account"): ["ABC", ...]}
+    - `company_accounts`: {company: ["ABC", ...]}
+
+    Index is built once and cleared when GST Settings are saved.
+    It is shared by all callers, so lookups should return copies.
+    """
+    return frappe.cache.get_value(
+        "ic_gst_account_index", generator=build_gst_account_index
+    )
+
+
+def build_gst_account_index():
+    index = {
+        "accounts": {},
+        "account_fields": {},
+        "tax_type_accounts": {},
+        "company_accounts": {},
+    }
+
+    settings = frappe.get_cached_doc("GST Settings")
+    for row in settings.gst_accounts:
+        key = (row.company, row.account_type)
+        company_accounts = index["company_accounts"].setdefault(row.company, [])
+
+        # first row of an account type is used
+        if key not in index["accounts"]:
+            accounts = {field: row.get(field) for field in GST_ACCOUNT_FIELDS}
+            index["accounts"][key] = accounts
+            index["account_fields"][key] = {v: k for k, v in accounts.items()}
+
+        for field in GST_ACCOUNT_FIELDS:
+            tax_type_accounts = index["tax_type_accounts"].setdefault(
+                (row.company, field), []
+            )
+
+            if gst_account := row.get(field):
+                tax_type_accounts.append(gst_account)
+                company_accounts.append(gst_account)
+
+    return index
+
+
+def clear_gst_account_index():
+    frappe.cache.delete_value("ic_gst_account_index")
+
+
 def get_gst_accounts_by_type(company, account_type, throw=True):
     """
     :param company: Company to get GST Accounts for
@@ -454,10 +549,9 @@ def get_gst_accounts_by_type(company, account_type, throw=True):
     if not company:
         frappe.throw(_("Please set Company first"))
 
-    settings = frappe.get_cached_doc("GST Settings", "GST Settings")
-    for row in settings.gst_accounts:
-        if row.account_type == account_type and row.company == company:
-            return frappe._dict((key, row.get(key)) for key in GST_ACCOUNT_FIELDS)
+    accounts = get_gst_account_index()["accounts"].get((company, account_type))
+    if accounts:
+        return frappe._dict(accounts)
 
     if not throw:
         return frappe._dict()
@@ -471,6 +565,20 @@ def get_gst_accounts_by_type(company, account_type, throw=True):
     )
 
 
+def get_gst_account_fields_by_type(company, account_type, throw=True):
+    """
+    Reverse of `get_gst_accounts_by_type`, returns a dict of account fields:
+    {
+        "ABC": "cgst_account",
+        ...
+    }
+    """
+    if not get_gst_accounts_by_type(company, account_type, throw=throw):
+        return {}
+
+    return get_gst_account_index()["account_fields"][(company, account_type)].copy()
+
+
 def get_gst_accounts_by_tax_type(company, tax_type, throw=True):
     """
     :param company: Company to get GST Accounts for
@@ -487,23 +595,12 @@ def get_gst_accounts_by_tax_type(company, tax_type, throw=True):
     if field not in GST_ACCOUNT_FIELDS:
         frappe.throw(_("Invalid Tax Type"))
 
-    settings = frappe.get_cached_doc("GST Settings", "GST Settings")
-    accounts_list = []
-
-    has_account_settings = False
-    for row in settings.gst_accounts:
-        if row.company != company:
-            continue
-
-        has_account_settings = True
-        if gst_account := row.get(field):
-            accounts_list.append(gst_account)
+    index = get_gst_account_index()
+    if accounts_list := index["tax_type_accounts"].get((company, field)):
+        return accounts_list.copy()
 
-    if accounts_list:
-        return accounts_list
-
-    if has_account_settings or not throw:
-        return accounts_list
+    if company in index["company_accounts"] or not throw:
+        return []
 
     frappe.throw(
         _(
@@ -522,18 +619,7 @@ def get_all_gst_accounts(company):
     if not company:
         frappe.throw(_("Please set Company first"))
 
-    settings = frappe.get_cached_doc("GST Settings")
-
-    accounts_list = []
-    for row in settings.gst_accounts:
-        if row.company != company:
-            continue
-
-        for account in GST_ACCOUNT_FIELDS:
-            if gst_account := row.get(account):
-                accounts_list.append(gst_account)
-
-    return accounts_list
+    return get_gst_account_index()["company_accounts"].get(company, []).copy()
 
 
 def parse_datetime(value, day_first=False, throw=True):
@@ -586,6 +672,59 @@ def get_json_from_file(path):
     return frappe._dict(frappe.get_file_json(get_file_path(path)))
 
 
+def get_json_outline(path):
+    """
+    Returns values outside lists and paths of outermost lists in a JSON file,
+    without loading the file in memory.
+
+    Sample Output:
+    --------------
+    {
+        'fields': {'gstin': '24AAQCA8719H1ZC', 'fp': '032023'},
+        'lists': {'b2b', 'cdn'}
+    }
+    """
+    outline = frappe._dict(fields=frappe._dict(), lists=set())
+
+    with open(get_file_path(path), "rb") as file:
+        for prefix, event, value in ijson.parse(file, use_float=True):
+            if "item" in prefix.split("."):
+                continue
+
+            if event == "start_array":
+                outline.lists.add(prefix)
+
+            elif event not in ("start_map", "end_map", "map_key", "end_array"):
+                outline.fields[prefix] = value
+
+    return outline
+
+
+def iter_json_lists(file, prefix, keys):
+    """
+    Yields (key, item) for items of lists at `prefix.key` in a JSON file,
+    building only one item in memory at a time.
+
+    :param file: file object opened in binary mode
+    :param keys: keys of lists to be read, others are skipped
+    """
+    item_prefixes = {".".join(filter(None, (prefix, key, "item"))): key for key in keys}
+    builder = item_prefix = None
+
+    for _prefix, event, value in ijson.parse(file, use_float=True):
+        if builder:
+            builder.event(event, value)
+
+            if _prefix == item_prefix and event == "end_map":
+                yield item_prefixes[item_prefix], builder.value
+                builder = None
+
+        elif event == "start_map" and _prefix in item_prefixes:
+            item_prefix = _prefix
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+
+
 def join_list_with_custom_separators(input, separator=", ", last_separator=" or "):
     if type(input) not in (list, tuple):
         return
@@ -688,7 +827,7 @@ def get_validated_country_code(country):
     if country == "India":
         return
 
-    code = frappe.db.get_value("Country", country, "code")
+    code = frappe.get_cached_value("Country", country, "code")
 
     if not code:
         frappe.throw(
@@ -739,6 +878,54 @@ def get_timespan_date_range(timespan: str, company: str | None = None) -> tuple
     return
 
 
+def get_gst_fy(date):
+    if not date:
+        return
+
+    # Standard for India as per GST
+    if date.month < 4:
+        return f"{date.year - 1}-{date.year}"
+
+    return f"{date.year}-{date.year + 1}"
+
+
+def get_cleaner_bill_no(bill_no, fy):
+    """
+    - Attempts to return bill number without financial year.
+    - Removes trailing zeros from bill number.
+    """
+
+    fy = fy.split("-")
+    replace_list = [
+        f"{fy[0]}-{fy[1]}",
+        f"{fy[0]}/{fy[1]}",
+        f"{fy[0]}-{fy[1][2:]}",
+        f"{fy[0]}/{fy[1][2:]}",
+        f"{fy[0][2:]}-{fy[1][2:]}",
+        f"{fy[0][2:]}/{fy[1][2:]}",
+        "/",  # these are only special characters allowed in invoice
+        "-",
+    ]
+
+    inv = bill_no
+    for replace in replace_list:
+        inv = inv.replace(replace, " ")
+    inv = " ".join(inv.split()).lstrip("0")
+    return inv
+
+
+def set_cleaner_bill_no(doc, bill_date):
+    """
+    Sets financial year and cleaner bill no used for fuzzy matching in reconciliation.
+    """
+    doc.bill_fiscal_year = get_gst_fy(getdate(bill_date) if bill_date else None)
+    doc.cleaner_bill_no = (
+        get_cleaner_bill_no(doc.bill_no, doc.bill_fiscal_year)
+        if doc.bill_no and doc.bill_fiscal_year
+        else None
+    )
+
+
 def merge_dicts(d1: dict, d2: dict) -> dict:
     """
     Sample Input:
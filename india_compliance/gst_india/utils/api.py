@@ -1,14 +1,79 @@
+import gzip
+
+from rq import get_current_job
+
 import frappe
+from frappe.utils import cint
+
+# Logs buffered in a request or job are enqueued together
+LOG_BATCH_SIZE = 20
+
+# Logged payloads larger than this (in characters) are truncated
+MAX_PAYLOAD_SIZE = 100_000
+
+PAYLOAD_FIELDS = ("request_headers", "data", "output", "error")
 
 
 def enqueue_integration_request(**kwargs):
+    """
+    Buffers log of an API request, to be written in a batch after the current
+    request / job. Payloads are serialized right away, as they may be mutated later.
+    """
+    for field in PAYLOAD_FIELDS:
+        kwargs[field] = pretty_json(kwargs.get(field))
+
+    logs = frappe.flags.setdefault("ic_integration_requests", [])
+    logs.append(kwargs)
+
+    if len(logs) >= LOG_BATCH_SIZE or not (frappe.request or get_current_job()):
+        flush_integration_requests()
+
+
+def flush_integration_requests():
+    """Enqueues buffered logs, called after each request and job"""
+    if not (logs := frappe.flags.pop("ic_integration_requests", None)):
+        return
+
     frappe.enqueue(
-        "india_compliance.gst_india.utils.api.create_integration_request",
-        **kwargs,
+        "india_compliance.gst_india.utils.api.create_integration_requests",
+        logs=logs,
     )
 
 
-def create_integration_request(
+def create_integration_requests(logs):
+    docs = []
+    large_payloads = []
+
+    for log in logs:
+        doc = get_integration_request(**log)
+        doc.set_new_name()
+        doc.set_user_and_timestamp()
+        docs.append(doc.get_valid_dict())
+
+        for field in PAYLOAD_FIELDS:
+            if len(doc.get(field) or "") <= get_max_payload_size():
+                continue
+
+            large_payloads.append((doc.name, field, doc.get(field)))
+            docs[-1][field] = get_truncated_payload(doc.get(field))
+
+    fields = list(docs[0])
+    frappe.db.bulk_insert(
+        "Integration Request",
+        fields=fields,
+        values=[tuple(doc.get(field) for field in fields) for doc in docs],
+    )
+
+    if cint(frappe.conf.ic_api_log_large_payloads):
+        for name, field, payload in large_payloads:
+            save_payload(name, field, payload)
+
+
+def create_integration_request(**kwargs):
+    return get_integration_request(**kwargs).insert(ignore_permissions=True)
+
+
+def get_integration_request(
     url=None,
     request_id=None,
     request_headers=None,
@@ -17,6 +82,7 @@ def create_integration_request(
     error=None,
     reference_doctype=None,
     reference_name=None,
+    timings=None,
 ):
     return frappe.get_doc(
         {
@@ -31,6 +97,38 @@ def create_integration_request(
             "status": "Failed" if error else "Completed",
             "reference_doctype": reference_doctype,
             "reference_docname": reference_name,
+            "request_description": format_timings(timings),
+        }
+    )
+
+
+def get_max_payload_size():
+    return cint(frappe.conf.ic_api_log_max_payload_size) or MAX_PAYLOAD_SIZE
+
+
+def get_truncated_payload(payload):
+    note = (
+        "attached as a compressed file"
+        if cint(frappe.conf.ic_api_log_large_payloads)
+        else "truncated"
+    )
+
+    return (
+        f"{payload[:get_max_payload_size()]}\n\n"
+        f"... (payload of {len(payload)} characters {note})"
+    )
+
+
+def save_payload(name, field, payload):
+    """Saves complete payload as a gzip-compressed private file"""
+    frappe.get_doc(
+        {
+            "doctype": "File",
+            "file_name": f"{name}-{field}.json.gz",
+            "attached_to_doctype": "Integration Request",
+            "attached_to_name": name,
+            "is_private": 1,
+            "content": gzip.compress(payload.encode()),
         }
     ).insert(ignore_permissions=True)
 
@@ -43,3 +141,12 @@ def pretty_json(obj):
         return obj
 
     return frappe.as_json(obj, indent=4)
+
+
+def format_timings(timings):
+    if not timings:
+        return
+
+    return ", ".join(
+        f"{key.title()}: {seconds:.3f}s" for key, seconds in timings.items()
+    )
@@ -0,0 +1,129 @@
+"""
+Circuit breaker for GSP endpoints.
+
+After repeated server errors, requests to an endpoint fail fast till it is
+expected to recover. A single trial request is then allowed, which closes the
+circuit if successful. State is stored in Redis, so that it is shared by all
+workers of the site.
+"""
+
+import time
+
+import frappe
+from frappe.utils import cint
+
+# Consecutive server errors after which the circuit is opened
+FAILURE_THRESHOLD = 3
+
+# Seconds for which requests fail fast, doubled for every failed trial request
+RECOVERY_TIMEOUT = 300
+MAX_RECOVERY_TIMEOUT = 3600
+
+CLOSED = "Closed"
+OPEN = "Open"
+HALF_OPEN = "Half Open"
+
+# State is expired if not updated for a day
+STATE_EXPIRY = 86400
+
+
+class CircuitBreaker:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.key = f"ic_circuit_breaker:{endpoint}"
+
+    def get_state(self):
+        state = self.get_data()
+        if not state.opened_on:
+            return CLOSED
+
+        if time.time() < state.retry_after:
+            return OPEN
+
+        return HALF_OPEN
+
+    def allow_request(self):
+        """
+        Returns False while the circuit is open.
+        Once it is half open, allows a single trial request in the timeout.
+        """
+        state = self.get_state()
+        if state == CLOSED:
+            return True
+
+        if state == OPEN:
+            return False
+
+        return bool(
+            frappe.cache.set(
+                frappe.cache.make_key(f"{self.key}:trial"),
+                1,
+                ex=self.get_data().timeout,
+                nx=True,
+            )
+        )
+
+    def record_failure(self):
+        data = self.get_data()
+        data.failures += 1
+
+        if data.opened_on:
+            # trial request failed
+            data.timeout = min(data.timeout * 2, MAX_RECOVERY_TIMEOUT)
+
+        elif data.failures >= get_failure_threshold():
+            data.opened_on = time.time()
+            data.timeout = RECOVERY_TIMEOUT
+
+        else:
+            return self.set_data(data)
+
+        data.retry_after = time.time() + data.timeout
+        frappe.cache.delete(frappe.cache.make_key(f"{self.key}:trial"))
+        self.set_data(data)
+
+    def record_success(self):
+        data = self.get_data()
+        if not data.failures:
+            return
+
+        if data.opened_on:
+            frappe.cache.set_value(
+                f"{self.key}:last_recovery",
+                {
+                    "opened_on": data.opened_on,
+                    "recovered_on": time.time(),
+                    "time_to_recovery": round(time.time() - data.opened_on),
+                },
+                expires_in_sec=STATE_EXPIRY * 30,
+            )
+
+        frappe.cache.delete_value(self.key)
+
+    def get_metrics(self):
+        data = self.get_data()
+        return {
+            "endpoint": self.endpoint,
+            "state": self.get_state(),
+            "consecutive_failures": data.failures,
+            "open_since": round(time.time() - data.opened_on)
+            if data.opened_on
+            else None,
+            "last_recovery": frappe.cache.get_value(
+                f"{self.key}:last_recovery", expires=True
+            ),
+        }
+
+    def get_data(self):
+        # expiring values are not cached locally, as other workers update them
+        return frappe._dict(
+            frappe.cache.get_value(self.key, expires=True)
+            or {"failures": 0, "opened_on": None, "retry_after": 0, "timeout": 0}
+        )
+
+    def set_data(self, data):
+        frappe.cache.set_value(self.key, data, expires_in_sec=STATE_EXPIRY)
+
+
+def get_failure_threshold():
+    return cint(frappe.conf.ic_circuit_breaker_threshold) or FAILURE_THRESHOLD
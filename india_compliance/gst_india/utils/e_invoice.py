@@ -1,15 +1,19 @@
 import json
+import random
 
 import jwt
 
 import frappe
 from frappe import _
+from frappe.query_builder.functions import Count, Min
 from frappe.utils import (
     add_to_date,
+    cint,
     cstr,
     format_date,
     get_datetime,
     getdate,
+    now_datetime,
     random_string,
 )
 
@@ -23,7 +27,17 @@ from india_compliance.gst_india.constants import (
 )
 from india_compliance.gst_india.constants.e_invoice import (
     CANCEL_REASON_CODES,
+    E_INVOICE_WORKERS,
     ITEM_LIMIT,
+    MAX_RETRY_INTERVAL,
+    RETRY_BATCH_SIZE,
+    RETRY_INTERVAL,
+)
+from india_compliance.gst_india.doctype.gst_bulk_generation_log.gst_bulk_generation_log import (
+    create_bulk_generation_log,
+    get_bulk_generation_batches,
+    start_bulk_generation,
+    update_bulk_generation_log,
 )
 from india_compliance.gst_india.overrides.transaction import (
     _validate_hsn_codes,
@@ -39,12 +53,18 @@ from india_compliance.gst_india.utils import (
     send_updated_doc,
     update_onload,
 )
+from india_compliance.gst_india.utils.circuit_breaker import (
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+)
 from india_compliance.gst_india.utils.e_waybill import (
     _cancel_e_waybill,
     log_and_process_e_waybill_generation,
 )
 from india_compliance.gst_india.utils.transaction_data import (
     GSTTransactionData,
+    TransactionDataCache,
     validate_non_gst_items,
 )
 
@@ -62,47 +82,65 @@ def enqueue_bulk_e_invoice_generation(docnames):
         frappe.throw(_("Please enable e-Invoicing in GST Settings first"))
 
     docnames = frappe.parse_json(docnames) if docnames.startswith("[") else [docnames]
-    rq_job = frappe.enqueue(
-        "india_compliance.gst_india.utils.e_invoice.generate_e_invoices",
-        queue="short" if len(docnames) < 5 else "long",
-        timeout=len(docnames) * 240,  # 4 mins per e-Invoice
-        docnames=docnames,
-    )
+    log = create_bulk_generation_log("e-Invoice", "Sales Invoice", len(docnames))
+
+    workers = cint(frappe.conf.ic_e_invoice_workers) or E_INVOICE_WORKERS
+    for batch in get_bulk_generation_batches(docnames, workers):
+        frappe.enqueue(
+            "india_compliance.gst_india.utils.e_invoice.generate_e_invoices",
+            queue="short" if len(docnames) < 5 else "long",
+            timeout=len(batch) * 240,  # 4 mins per e-Invoice
+            enqueue_after_commit=True,
+            docnames=batch,
+            bulk_generation_log=log,
+        )
 
-    return rq_job.id
+    return log
 
 
-def generate_e_invoices(docnames, force=False):
+def generate_e_invoices(docnames, force=False, bulk_generation_log=None):
     """
     Bulk generate e-Invoices for the given Sales Invoices.
-    Permission checks are done in the `generate_e_invoice` function.
+    Permission checks are done while loading each Sales Invoice.
     """
 
-    def log_error():
-        frappe.log_error(
+    def log_error(error):
+        error_log = frappe.log_error(
             title=_("e-Invoice generation failed for Sales Invoice {0}").format(
                 docname
             ),
             message=frappe.get_traceback(),
         )
 
+        if bulk_generation_log:
+            update_bulk_generation_log(
+                bulk_generation_log,
+                docname,
+                error=str(error) or error_log.method,
+                error_log=error_log.name,
+            )
+
+    if bulk_generation_log:
+        start_bulk_generation(bulk_generation_log)
+        frappe.db.commit()  # nosemgrep
+
+    # masters like company address are fetched and sanitized once
+    cache = TransactionDataCache()
+
     for docname in docnames:
         try:
-            generate_e_invoice(docname, throw=False, force=force)
-
-        except GSPServerError:
-            frappe.db.set_value(
-                "Sales Invoice",
-                {"name": ("in", docnames), "irn": ("is", "not set")},
-                "einvoice_status",
-                "Auto-Retry",
+            doc = load_doc("Sales Invoice", docname, "submit")
+
+            # errors are raised in bulk generation, to be recorded in the log
+            _generate_e_invoice(
+                doc, throw=bool(bulk_generation_log), force=force, cache=cache
             )
 
-            log_error()
-            frappe.clear_last_message()
+            if bulk_generation_log:
+                update_bulk_generation_result(bulk_generation_log, docname)
 
-        except Exception:
-            log_error()
+        except Exception as e:
+            log_error(e)
             frappe.clear_last_message()
 
         finally:
@@ -110,21 +148,39 @@ def generate_e_invoices(docnames, force=False):
             frappe.db.commit()  # nosemgrep
 
 
+def update_bulk_generation_result(bulk_generation_log, docname):
+    # server errors are handled in `generate_e_invoice` without raising
+    status = frappe.db.get_value("Sales Invoice", docname, "einvoice_status")
+    update_bulk_generation_log(
+        bulk_generation_log,
+        docname,
+        error=(
+            None
+            if status == "Generated"
+            else _("e-Invoice status is {0}").format(status or _("not set"))
+        ),
+    )
+
+
 @frappe.whitelist()
 def generate_e_invoice(docname, throw=True, force=False):
     doc = load_doc("Sales Invoice", docname, "submit")
+    return _generate_e_invoice(doc, throw=throw, force=force)
 
+
+def _generate_e_invoice(doc, throw=True, force=False, cache=None):
     settings = frappe.get_cached_doc("GST Settings")
 
     try:
+        # queued for retry without a request while the GSP is known to be down
         if (
             not force
             and settings.enable_retry_e_invoice_generation
-            and settings.is_retry_e_invoice_generation_pending
+            and get_e_invoice_circuit_breaker().get_state() == OPEN
         ):
             raise GatewayTimeoutError
 
-        data = EInvoiceData(doc).get_data()
+        data = EInvoiceData(doc, cache=cache).get_data()
         api = EInvoiceAPI(doc)
         result = api.generate_irn(data)
 
@@ -211,7 +267,7 @@ def generate_e_invoice(docname, throw=True, force=False):
         doc,
         {
             "irn": doc.irn,
-            "sales_invoice": docname,
+            "sales_invoice": doc.name,
             "acknowledgement_number": result.AckNo,
             "acknowledged_on": parse_datetime(result.AckDt),
             "signed_invoice": result.SignedInvoice,
@@ -391,6 +447,7 @@ def validate_hsn_codes_for_e_invoice(doc):
         doc,
         valid_hsn_length=[6, 8],
         message=_("Since HSN/SAC Code is mandatory for generating e-Invoices.<br>"),
+        validate_existence=True,
     )
 
 
@@ -450,6 +507,14 @@ def validate_if_e_invoice_can_be_cancelled(doc):
 
 
 def retry_e_invoice_generation():
+    """
+    Retries generation of e-Invoices that are due, oldest first.
+    A bounded batch is retried in each run, and none while the GSP is down.
+
+    `is_retry_e_invoice_generation_pending` only tracks whether the retry
+    queue has e-Invoices. New e-Invoices are queued without a request only
+    while the circuit breaker is open.
+    """
     settings = frappe.get_cached_doc("GST Settings")
     if (
         not settings.enable_retry_e_invoice_generation
@@ -457,15 +522,86 @@ def retry_e_invoice_generation():
     ):
         return
 
-    settings.db_set("is_retry_e_invoice_generation_pending", 0, update_modified=False)
+    if not get_e_invoice_retry_queue_depth():
+        settings.db_set(
+            "is_retry_e_invoice_generation_pending", 0, update_modified=False
+        )
+        return
 
-    queued_sales_invoices = frappe.db.get_all(
-        "Sales Invoice", filters={"einvoice_status": "Auto-Retry"}, pluck="name"
-    )
-    if not queued_sales_invoices:
+    circuit_state = get_e_invoice_circuit_breaker().get_state()
+    if circuit_state == OPEN:
         return
 
-    generate_e_invoices(queued_sales_invoices, force=True)
+    # a single trial request is allowed till the GSP recovers
+    limit = 1 if circuit_state == HALF_OPEN else None
+    docnames = get_due_e_invoice_retries(limit)
+
+    if docnames:
+        generate_e_invoices(docnames, force=True)
+
+
+def get_due_e_invoice_retries(limit=None):
+    sales_invoice = frappe.qb.DocType("Sales Invoice")
+
+    return (
+        get_due_e_invoice_retries_query()
+        .select(sales_invoice.name)
+        .orderby(sales_invoice.posting_date)
+        .orderby(sales_invoice.creation)
+        .limit(limit or get_retry_batch_size())
+        .run(pluck="name")
+    )
+
+
+def get_due_e_invoice_retries_query():
+    sales_invoice = frappe.qb.DocType("Sales Invoice")
+
+    return (
+        frappe.qb.from_(sales_invoice)
+        .where(sales_invoice.einvoice_status == "Auto-Retry")
+        .where(
+            sales_invoice.einvoice_next_retry_on.isnull()
+            | (sales_invoice.einvoice_next_retry_on <= now_datetime())
+        )
+    )
+
+
+def get_retry_batch_size():
+    return cint(frappe.conf.ic_e_invoice_retry_batch_size) or RETRY_BATCH_SIZE
+
+
+def get_e_invoice_retry_queue_depth():
+    return frappe.db.count("Sales Invoice", {"einvoice_status": "Auto-Retry"})
+
+
+def get_e_invoice_circuit_breaker():
+    return CircuitBreaker(f"{EInvoiceAPI.BASE_PATH}/invoice")
+
+
+def get_next_retry_on(retry_count):
+    """Exponential backoff with jitter, so that retries are spread out"""
+    interval = min(RETRY_INTERVAL * 2**retry_count, MAX_RETRY_INTERVAL)
+    return add_to_date(None, seconds=interval * random.uniform(0.5, 1))
+
+
+@frappe.whitelist()
+def get_e_invoice_retry_metrics():
+    frappe.has_permission("GST Settings", throw=True)
+
+    sales_invoice = frappe.qb.DocType("Sales Invoice")
+    oldest = (
+        frappe.qb.from_(sales_invoice)
+        .select(Min(sales_invoice.posting_date))
+        .where(sales_invoice.einvoice_status == "Auto-Retry")
+        .run()
+    )
+
+    return {
+        "queue_depth": get_e_invoice_retry_queue_depth(),
+        "due": get_due_e_invoice_retries_query().select(Count("*")).run()[0][0],
+        "oldest_posting_date": oldest[0][0] if oldest else None,
+        "circuit_breaker": get_e_invoice_circuit_breaker().get_metrics(),
+    }
 
 
 def get_e_invoice_info(doc):
@@ -485,20 +621,28 @@ def handle_server_errors(settings, doc, error):
         GSPServerError: _("GSP/GST Server Down"),
     }
 
-    einvoice_status = "Failed"
+    values = {"einvoice_status": "Failed"}
 
     if settings.enable_retry_e_invoice_generation:
-        einvoice_status = "Auto-Retry"
+        retry_count = (
+            cint(doc.einvoice_retry_count) + 1
+            if doc.einvoice_status == "Auto-Retry"
+            else 0
+        )
+        values = {
+            "einvoice_status": "Auto-Retry",
+            "einvoice_retry_count": retry_count,
+            "einvoice_next_retry_on": get_next_retry_on(retry_count),
+        }
+
         settings.db_set(
             "is_retry_e_invoice_generation_pending", 1, update_modified=False
         )
-        error_message += (
-            " Your e-invoice generation will be automatically retried every 5 minutes."
-        )
+        error_message += " Your e-invoice generation will be automatically retried."
     else:
         error_message += " Please try again after some time."
 
-    doc.db_set({"einvoice_status": einvoice_status}, commit=True)
+    doc.db_set(values, commit=True)
 
     frappe.msgprint(
         msg=_(error_message),
@@ -574,9 +718,7 @@ class EInvoiceData(GSTTransactionData):
         if batch_no := self.sanitize_value(
             item.batch_no, max_length=20, truncate=False
         ):
-            batch_expiry_date = frappe.db.get_value(
-                "Batch", item.batch_no, "expiry_date"
-            )
+            batch_expiry_date = self.cache.get_batch_expiry_date(item.batch_no)
             item_details.update(
                 {
                     "batch_no": batch_no,
@@ -600,8 +742,8 @@ class EInvoiceData(GSTTransactionData):
                     {
                         "original_name": return_against,
                         "original_date": format_date(
-                            frappe.db.get_value(
-                                "Sales Invoice", return_against, "posting_date"
+                            self.cache.get_posting_date(
+                                "Sales Invoice", return_against
                             ),
                             self.DATE_FORMAT,
                         ),
@@ -1,11 +1,15 @@
 import json
 import os
+from io import BytesIO
+from zipfile import ZIP_DEFLATED, ZipFile
 
 import frappe
 from frappe import _
 from frappe.desk.form.load import get_docinfo
 from frappe.utils import (
     add_to_date,
+    cint,
+    create_batch,
     format_date,
     get_datetime,
     get_fullname,
@@ -21,6 +25,8 @@ from india_compliance.gst_india.constants.e_waybill import (
     ADDRESS_FIELDS,
     CANCEL_REASON_CODES,
     CONSIGNMENT_STATUS,
+    E_WAYBILL_JSON_CHUNK_SIZE,
+    E_WAYBILL_WORKERS,
     EXTEND_VALIDITY_REASON_CODES,
     ITEM_LIMIT,
     PERMITTED_DOCTYPES,
@@ -28,14 +34,24 @@ from india_compliance.gst_india.constants.e_waybill import (
     TRANSIT_TYPES,
     UPDATE_VEHICLE_REASON_CODES,
 )
+from india_compliance.gst_india.doctype.gst_bulk_generation_log.gst_bulk_generation_log import (
+    create_bulk_generation_log,
+    get_bulk_generation_batches,
+    start_bulk_generation,
+    update_bulk_generation_log,
+)
 from india_compliance.gst_india.utils import (
     is_foreign_doc,
     load_doc,
+    load_docs,
     parse_datetime,
     send_updated_doc,
     update_onload,
 )
-from india_compliance.gst_india.utils.transaction_data import GSTTransactionData
+from india_compliance.gst_india.utils.transaction_data import (
+    GSTTransactionData,
+    TransactionDataCache,
+)
 
 #######################################################################################
 ### Manual JSON Generation for e-Waybill ##############################################
@@ -45,22 +61,71 @@ from india_compliance.gst_india.utils.transaction_data import GSTTransactionData
 @frappe.whitelist()
 def generate_e_waybill_json(doctype: str, docnames, values=None):
     docnames = frappe.parse_json(docnames) if docnames.startswith("[") else [docnames]
-    ewb_data = {
-        "version": "1.0.0621",
-        "billLists": [],
-    }
 
-    for doc in docnames:
-        doc = frappe.get_doc(doctype, doc)
-        doc.check_permission("submit")
+    if values:
+        values = frappe.parse_json(values)
+    else:
+        # transporter details are updated from values before validation
+        validate_e_waybill_docs(doctype, docnames)
+
+    bill_lists = []
+    for bills in get_e_waybill_bill_lists(doctype, docnames, values):
+        bill_lists.extend(bills)
+
+    return frappe.as_json(get_e_waybill_json(bill_lists), indent=4)
 
-        if values:
-            update_transaction(doc, frappe.parse_json(values))
-            send_updated_doc(doc)
 
-        ewb_data["billLists"].append(EWaybillData(doc, for_json=True).get_data())
+@frappe.whitelist()
+def download_e_waybill_json(doctype: str, docnames):
+    """
+    Downloads a zip of JSON files, each with upto `E_WAYBILL_JSON_CHUNK_SIZE` bills,
+    so that they can be uploaded to the e-Waybill portal.
+    """
+    docnames = frappe.parse_json(docnames) if docnames.startswith("[") else [docnames]
+    validate_e_waybill_docs(doctype, docnames)
 
-    return frappe.as_json(ewb_data, indent=4)
+    file_name = f"Bulk_e-Waybill_Data_{random_string(5)}"
+    zip_buffer = BytesIO()
+
+    with ZipFile(zip_buffer, "w", ZIP_DEFLATED) as zip_file:
+        for idx, bills in enumerate(get_e_waybill_bill_lists(doctype, docnames), 1):
+            zip_file.writestr(
+                f"{file_name}_{idx}.json",
+                frappe.as_json(get_e_waybill_json(bills), indent=4),
+            )
+
+    frappe.response.filename = f"{file_name}.zip"
+    frappe.response.filecontent = zip_buffer.getvalue()
+    frappe.response.type = "download"
+
+
+def get_e_waybill_bill_lists(doctype, docnames, values=None):
+    """
+    Yields e-Waybill data of documents in chunks of `E_WAYBILL_JSON_CHUNK_SIZE`.
+    Only documents of a chunk are loaded at a time, while masters are shared.
+    """
+    cache = TransactionDataCache()
+
+    for chunk in create_batch(docnames, E_WAYBILL_JSON_CHUNK_SIZE):
+        docs = load_docs(doctype, chunk, "submit")
+        cache.prefetch(docs)
+        bills = []
+
+        for doc in docs:
+            if values:
+                update_transaction(doc, values)
+                send_updated_doc(doc)
+
+            bills.append(EWaybillData(doc, for_json=True, cache=cache).get_data())
+
+        yield bills
+
+
+def get_e_waybill_json(bill_lists):
+    return {
+        "version": "1.0.0621",
+        "billLists": bill_lists,
+    }
 
 
 #######################################################################################
@@ -82,6 +147,9 @@ def bulk_update_transporter_in_docs(doctype, docnames, values):
 def enqueue_bulk_e_waybill_generation(doctype, docnames):
     """
     Enqueue bulk generation of e-Waybill for the given documents.
+
+    Documents are validated together before enqueueing, and the ones for which
+    e-Waybill cannot be generated are recorded as failures in the log.
     """
 
     frappe.has_permission(doctype, "submit", throw=True)
@@ -93,39 +161,131 @@ def enqueue_bulk_e_waybill_generation(doctype, docnames):
         frappe.throw(_("Please enable e-Waybill in GST Settings first."))
 
     docnames = frappe.parse_json(docnames) if docnames.startswith("[") else [docnames]
-    rq_job = frappe.enqueue(
-        "india_compliance.gst_india.utils.e_waybill.generate_e_waybills",
-        queue="long",
-        timeout=len(docnames) * 240,  # 4 mins per e-Waybill
-        doctype=doctype,
-        docnames=docnames,
-    )
+    errors = get_e_waybill_validation_errors(doctype, docnames)
+    log = create_bulk_generation_log("e-Waybill", doctype, len(docnames))
+
+    if errors:
+        start_bulk_generation(log)
+        for docname, error in errors.items():
+            update_bulk_generation_log(log, docname, error=error)
+
+    if not (docnames := [docname for docname in docnames if docname not in errors]):
+        return log
+
+    workers = cint(frappe.conf.ic_e_waybill_workers) or E_WAYBILL_WORKERS
+    for batch in get_bulk_generation_batches(docnames, workers):
+        frappe.enqueue(
+            "india_compliance.gst_india.utils.e_waybill.generate_e_waybills",
+            queue="long",
+            timeout=len(batch) * 240,  # 4 mins per e-Waybill
+            enqueue_after_commit=True,
+            doctype=doctype,
+            docnames=batch,
+            bulk_generation_log=log,
+        )
 
-    return rq_job.id
+    return log
 
 
-def generate_e_waybills(doctype, docnames):
+def generate_e_waybills(doctype, docnames, bulk_generation_log=None):
     """
     Bulk generate e-Waybill for the given documents.
     """
 
+    if bulk_generation_log:
+        start_bulk_generation(bulk_generation_log)
+        frappe.db.commit()  # nosemgrep
+
+    # masters like company address are fetched and sanitized once
+    cache = TransactionDataCache()
+
     for docname in docnames:
         try:
             doc = load_doc(doctype, docname, "submit")
-            _generate_e_waybill(doc)
-        except Exception:
-            frappe.log_error(
+            _generate_e_waybill(doc, cache=cache)
+
+            if bulk_generation_log:
+                update_bulk_generation_log(bulk_generation_log, docname)
+
+        except Exception as e:
+            error_log = frappe.log_error(
                 title=_("e-Waybill generation failed for {0} {1}").format(
                     doctype, docname
                 ),
                 message=frappe.get_traceback(),
             )
 
+            if bulk_generation_log:
+                update_bulk_generation_log(
+                    bulk_generation_log,
+                    docname,
+                    error=str(e) or error_log.method,
+                    error_log=error_log.name,
+                )
+
         finally:
             # each e-Waybill needs to be committed individually
             frappe.db.commit()  # nosemgrep
 
 
+def validate_e_waybill_docs(doctype, docnames):
+    if not (errors := get_e_waybill_validation_errors(doctype, docnames)):
+        return
+
+    frappe.throw(
+        "<br>".join(
+            f"{frappe.bold(docname)}: {error}" for docname, error in errors.items()
+        ),
+        title=_("e-Waybill cannot be generated for the following documents"),
+    )
+
+
+def get_e_waybill_validation_errors(doctype, docnames):
+    """
+    Returns errors by document name, for documents for which e-Waybill
+    cannot be generated.
+
+    Validations of `EWaybillData` are run against fields of documents and
+    their items, fetched for all documents together without loading them.
+    """
+    validate_doctype_for_e_waybill(doctype)
+
+    docs = frappe.get_all(doctype, filters={"name": ("in", docnames)}, fields=["*"])
+
+    item = frappe.qb.DocType(f"{doctype} Item")
+    items = {}
+    for row in (
+        frappe.qb.from_(item)
+        .select(item.parent, item.gst_hsn_code, item.gst_treatment)
+        .where(item.parenttype == doctype)
+        .where(item.parent.isin(docnames))
+        .orderby(item.parent, item.idx)
+        .run(as_dict=True)
+    ):
+        items.setdefault(row.parent, []).append(row)
+
+    cache = TransactionDataCache()
+    errors = {}
+
+    for doc in docs:
+        doc.doctype = doctype
+        doc.items = items.get(doc.name, [])
+        e_waybill_data = EWaybillData(doc, cache=cache)
+
+        try:
+            e_waybill_data.validate_transaction()
+        except frappe.ValidationError as e:
+            errors[doc.name] = str(e)
+            frappe.clear_last_message()
+
+    found = {doc.name for doc in docs}
+    for docname in docnames:
+        if docname not in found:
+            errors[docname] = _("{0} {1} not found").format(_(doctype), docname)
+
+    return errors
+
+
 @frappe.whitelist()
 def generate_e_waybill(*, doctype, docname, values=None):
     doc = load_doc(doctype, docname, "submit")
@@ -135,7 +295,7 @@ def generate_e_waybill(*, doctype, docname, values=None):
     _generate_e_waybill(doc, throw=True if values else False)
 
 
-def _generate_e_waybill(doc, throw=True):
+def _generate_e_waybill(doc, throw=True, cache=None):
     try:
         # Via e-Invoice API if not Return or Debit Note
         # Handles following error when generating e-Waybill using IRN:
@@ -144,7 +304,7 @@ def _generate_e_waybill(doc, throw=True):
             doc.is_return or doc.get("is_debit_note") or is_foreign_doc(doc)
         )
 
-        data = EWaybillData(doc).get_data(with_irn=with_irn)
+        data = EWaybillData(doc, cache=cache).get_data(with_irn=with_irn)
 
     except frappe.ValidationError as e:
         if throw:
@@ -1091,13 +1251,7 @@ class EWaybillData(GSTTransactionData):
             )
 
     def validate_doctype_for_e_waybill(self):
-        if self.doc.doctype not in PERMITTED_DOCTYPES:
-            frappe.throw(
-                _("Only {0} are supported for e-Waybill actions").format(
-                    ", ".join(PERMITTED_DOCTYPES)
-                ),
-                title=_("Unsupported DocType"),
-            )
+        validate_doctype_for_e_waybill(self.doc.doctype)
 
     def validate_if_e_waybill_is_set(self):
         if not self.doc.ewaybill:
@@ -1484,3 +1638,13 @@ class EWaybillData(GSTTransactionData):
             "cessRate": item_details.cess_rate,
             "cessNonAdvol": item_details.cess_non_advol_rate,
         }
+
+
+def validate_doctype_for_e_waybill(doctype):
+    if doctype not in PERMITTED_DOCTYPES:
+        frappe.throw(
+            _("Only {0} are supported for e-Waybill actions").format(
+                ", ".join(PERMITTED_DOCTYPES)
+            ),
+            title=_("Unsupported DocType"),
+        )
@@ -1,16 +1,25 @@
 from io import BytesIO
 
 import openpyxl
+from openpyxl.cell import Cell
 from openpyxl.formatting.rule import FormulaRule
-from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
 from openpyxl.utils import get_column_letter
 
 import frappe
 
 
 class ExcelExporter:
-    def __init__(self):
-        self.wb = openpyxl.Workbook()
+    def __init__(self, write_only=False):
+        """
+        :param write_only: rows are streamed to the file, using less memory for
+            large exports. Sheets cannot be edited, and the workbook can only be
+            saved once.
+        """
+        self.wb = openpyxl.Workbook(write_only=write_only)
+
+        # named styles registered in the workbook, by style
+        self.named_styles = {}
 
     def create_sheet(self, **kwargs):
         """
@@ -22,10 +31,10 @@ class ExcelExporter:
                 'label': [column1, colum2]
             }
         :param headers: A List of dictionary (cell properties will be optional)
-        :param data: A list of dictionary to append data to sheet
+        :param data: A list or generator of dictionary to append data to sheet
         """
 
-        Worksheet().create(workbook=self.wb, **kwargs)
+        Worksheet().create(workbook=self.wb, named_styles=self.named_styles, **kwargs)
 
     def save_workbook(self, file_name=None):
         """Save workbook"""
@@ -96,6 +105,7 @@ class Worksheet:
     def __init__(self):
         self.row_dimension = 1
         self.column_dimension = 1
+        self.styles = {}
 
     def create(
         self,
@@ -106,62 +116,102 @@ class Worksheet:
         filters=None,
         merged_headers=None,
         add_totals=True,
+        named_styles=None,
     ):
         """Create worksheet"""
         self.headers = headers
+        self.named_styles = {} if named_styles is None else named_styles
 
         self.ws = workbook.create_sheet(sheet_name)
+        self.workbook = workbook
+
+        # column widths are to be set before rows in write-only worksheets
+        self.set_column_widths("is_total" if add_totals else "is_data")
+
         self.add_data(filters, is_filter=True)
         self.add_merged_header(merged_headers)
         self.add_data(headers, is_header=True)
+
+        self.data_row = self.row_dimension
         self.add_data(data, is_data=True)
+        self.last_data_row = self.row_dimension - 1
+
+        if self.last_data_row < self.data_row:
+            return
 
         if add_totals:
             self.add_data(self.get_totals(), is_total=True)
 
-        self.apply_conditional_formatting(add_totals)
+        self.apply_conditional_formatting()
 
     def add_data(self, data, **kwargs):
         if not data:
             return
 
-        if kwargs.get("is_data"):
-            self.data_row = self.row_dimension
+        rows = (
+            (list(row.values()) for row in data)
+            if kwargs.get("is_data")
+            else self.parse_data(data)
+        )
+
+        for row in rows:
+            self.append_row(
+                {idx: val for idx, val in enumerate(row, 1)},
+                **kwargs,
+            )
+
+    def append_row(self, values, **kwargs):
+        """
+        Append styled cells to the worksheet
+
+        :param values: dict of column index and value
+        """
+        (key, value), *_ = kwargs.items()
+        row = [None] * (max(values, default=0))
+        height = None
 
-        for row in self.parse_data(data):
-            for idx, val in enumerate(row, 1):
-                cell = self.ws.cell(row=self.row_dimension, column=idx)
-                self.apply_format(row=self.row_dimension, column=idx, **kwargs)
-                cell.value = val
+        for column, val in values.items():
+            cell = Cell(self.ws, row=self.row_dimension, column=column, value=val)
 
-            self.row_dimension += 1
+            if value:
+                style_name, style = self.get_style(key, column)
+                cell.style = style_name
+                height = style.height
+
+            row[column - 1] = cell
+
+        if height:
+            self.ws.row_dimensions[self.row_dimension].height = height
+
+        self.ws.append(row)
+        self.row_dimension += 1
 
     def add_merged_header(self, merged_headers):
         if not merged_headers:
             return
 
+        values = {}
+        cell_ranges = []
+
         for key, value in merged_headers.items():
             merge_from_idx = self.get_column_index(value[0])
             merge_to_idx = self.get_column_index(value[1])
 
-            cell_range = self.get_range(
-                start_row=self.row_dimension,
-                start_column=merge_from_idx,
-                end_row=self.row_dimension,
-                end_column=merge_to_idx,
+            cell_ranges.append(
+                self.get_range(
+                    start_row=self.row_dimension,
+                    start_column=merge_from_idx,
+                    end_row=self.row_dimension,
+                    end_column=merge_to_idx,
+                )
             )
 
-            self.ws.cell(row=self.row_dimension, column=merge_from_idx).value = key
+            values[merge_from_idx] = key
 
-            self.ws.merge_cells(cell_range)
+        self.append_row(values, is_header=True)
 
-            self.apply_format(
-                row=self.row_dimension,
-                column=merge_from_idx,
-                is_header=True,
-            )
-
-        self.row_dimension += 1
+        for cell_range in cell_ranges:
+            self.ws.merged_cells.add(cell_range)
 
     def get_totals(self):
         """build total row array of fields to be calculated"""
@@ -171,19 +221,25 @@ class Worksheet:
             if idx == 1:
                 total_row.append("Totals")
             elif column.get("fieldtype") in ("Float", "Int"):
-                cell_range = self.get_range(self.data_row, idx, self.ws.max_row, idx)
+                cell_range = self.get_range(self.data_row, idx, self.last_data_row, idx)
                 total_row.append(f"=SUM({cell_range})")
             else:
                 total_row.append("")
 
         return total_row
 
-    def apply_format(self, row, column, **kwargs):
-        """Get style if defined or apply default format to the cell"""
+    def set_column_widths(self, key):
+        for column in range(1, len(self.headers) + 1):
+            _style_name, style = self.get_style(key, column)
+            self.ws.column_dimensions[get_column_letter(column)].width = style.width
 
-        key, value = kwargs.popitem()
-        if not value:
-            return
+    def get_style(self, key, column):
+        """
+        Returns name of named style and style for cells of `key` in a column.
+        Named styles are shared by all cells with the same style.
+        """
+        if (key, column) in self.styles:
+            return self.styles[(key, column)]
 
         # get default style
         style_name = self.default_styles.get(key)
@@ -202,27 +258,45 @@ class Worksheet:
                 }
             )
 
-        self.apply_style(row, column, style)
-
-    def apply_style(self, row, column, style):
-        """Apply style to cell"""
+        self.styles[(key, column)] = self.get_named_style(style), style
+        return self.styles[(key, column)]
+
+    def get_named_style(self, style):
+        """Register named style for the style if not already registered"""
+        key = (
+            style.font_family,
+            style.font_size,
+            style.bold,
+            style.horizontal,
+            style.vertical,
+            style.wrap_text,
+            style.number_format,
+            style.bg_color,
+        )
 
-        cell = self.ws.cell(row=row, column=column)
-        cell.font = Font(name=style.font_family, size=style.font_size, bold=style.bold)
-        cell.alignment = Alignment(
-            horizontal=style.horizontal,
-            vertical=style.vertical,
-            wrap_text=style.wrap_text,
+        if key in self.named_styles:
+            return self.named_styles[key]
+
+        named_style = NamedStyle(
+            name=f"India Compliance {len(self.named_styles) + 1}",
+            font=Font(name=style.font_family, size=style.font_size, bold=style.bold),
+            alignment=Alignment(
+                horizontal=style.horizontal,
+                vertical=style.vertical,
+                wrap_text=style.wrap_text,
+            ),
+            number_format=style.number_format,
         )
-        cell.number_format = style.number_format
 
         if style.bg_color:
-            cell.fill = PatternFill(fill_type="solid", fgColor=style.bg_color)
+            named_style.fill = PatternFill(fill_type="solid", fgColor=style.bg_color)
+
+        self.workbook.add_named_style(named_style)
+        self.named_styles[key] = named_style.name
 
-        self.ws.column_dimensions[get_column_letter(column)].width = style.width
-        self.ws.row_dimensions[row].height = style.height
+        return named_style.name
 
-    def apply_conditional_formatting(self, has_totals):
+    def apply_conditional_formatting(self):
         """Apply conditional formatting to data based on comparable fields as defined in headers"""
 
         for row in self.headers:
@@ -238,7 +312,7 @@ class Worksheet:
             cell_range = self.get_range(
                 start_row=self.data_row,
                 start_column=column,
-                end_row=self.ws.max_row - has_totals,
+                end_row=self.last_data_row,
                 end_column=column,
             )
 
@@ -1,9 +1,11 @@
+import os
 from enum import Enum
 
 import frappe
 from frappe import _
 from frappe.query_builder.terms import Criterion
 from frappe.utils import cint
+from frappe.utils.file_manager import get_file_path
 
 from india_compliance.gst_india.api_classes.returns import (
     GSTR2aAPI,
@@ -14,7 +16,11 @@ from india_compliance.gst_india.doctype.gstr_import_log.gstr_import_log import (
     create_import_log,
     toggle_scheduled_jobs,
 )
-from india_compliance.gst_india.utils import get_party_for_gstin
+from india_compliance.gst_india.utils import (
+    get_json_outline,
+    get_party_for_gstin,
+    iter_json_lists,
+)
 from india_compliance.gst_india.utils.gstr import gstr_2a, gstr_2b
 
 
@@ -51,40 +57,65 @@ GSTR_MODULES = {
 
 IMPORT_CATEGORY = ("IMPG", "IMPGSEZ")
 
+# Path of GSTR categories in uploaded files, and keys used for them
+GSTR_FILE_FORMATS = {
+    ReturnType.GSTR2A.value: (
+        "",
+        {action.lower(): category for action, category in ACTIONS.items()},
+    ),
+    ReturnType.GSTR2B.value: (
+        "data.docdata",
+        {category.value.lower(): category for category in GSTRCategory},
+    ),
+}
+
 
 def download_gstr_2a(gstin, return_periods, otp=None):
-    total_expected_requests = len(return_periods) * len(ACTIONS)
-    requests_made = 0
     queued_message = False
     settings = frappe.get_cached_doc("GST Settings")
 
     return_type = ReturnType.GSTR2A
     api = GSTR2aAPI(gstin)
-    for return_period in return_periods:
-        is_last_period = return_periods[-1] == return_period
+    requests = [
+        (return_period, action)
+        for return_period in return_periods
+        for action, category in ACTIONS.items()
+        if settings.enable_overseas_transactions
+        or category.value not in IMPORT_CATEGORY
+    ]
+
+    def publish_progress(index, requests_made):
+        return_period = requests[index][0]
+        frappe.publish_realtime(
+            "update_api_progress",
+            {
+                "current_progress": requests_made * 100 / len(requests),
+                "return_period": return_period,
+                "is_last_period": return_periods[-1] == return_period,
+            },
+            user=frappe.session.user,
+            doctype="Purchase Reconciliation Tool",
+        )
+
+    # all periods and categories are fetched in parallel
+    responses = dict(
+        zip(
+            requests,
+            api.get_many(
+                [api.get_data_kwargs(action, period) for period, action in requests],
+                otp,
+                on_response=publish_progress,
+            ),
+        )
+    )
 
+    for return_period in return_periods:
         json_data = frappe._dict({"gstin": gstin, "fp": return_period})
         for action, category in ACTIONS.items():
-            requests_made += 1
-
-            if (
-                not settings.enable_overseas_transactions
-                and category.value in IMPORT_CATEGORY
-            ):
+            if (return_period, action) not in responses:
                 continue
 
-            frappe.publish_realtime(
-                "update_api_progress",
-                {
-                    "current_progress": requests_made * 100 / total_expected_requests,
-                    "return_period": return_period,
-                    "is_last_period": is_last_period,
-                },
-                user=frappe.session.user,
-                doctype="Purchase Reconciliation Tool",
-            )
-
-            response = api.get_data(action, return_period, otp)
+            response = responses[return_period, action]
             if response.error_type in ["otp_requested", "invalid_otp"]:
                 return response
 
@@ -115,13 +146,7 @@ def download_gstr_2a(gstin, return_periods, otp=None):
                 continue
 
             if not (data := response.get(action.lower())):
-                frappe.throw(
-                    _(
-                        "Data received seems to be invalid from the GST Portal. Please try"
-                        " again or raise support ticket."
-                    ),
-                    title=_("Invalid Response Received."),
-                )
+                throw_invalid_response()
 
             # making consistent with GSTR2a upload
             json_data[action.lower()] = data
@@ -133,27 +158,31 @@ def download_gstr_2a(gstin, return_periods, otp=None):
 
 
 def download_gstr_2b(gstin, return_periods, otp=None):
-    total_expected_requests = len(return_periods)
-    requests_made = 0
     queued_message = False
 
     api = GSTR2bAPI(gstin)
-    for return_period in return_periods:
-        is_last_period = return_periods[-1] == return_period
-        requests_made += 1
+
+    def publish_progress(index, requests_made):
+        return_period = return_periods[index]
         frappe.publish_realtime(
             "update_api_progress",
             {
-                "current_progress": requests_made * 100 / total_expected_requests,
+                "current_progress": requests_made * 100 / len(return_periods),
                 "return_period": return_period,
-                "is_last_period": is_last_period,
+                "is_last_period": return_periods[-1] == return_period,
             },
             user=frappe.session.user,
             doctype="Purchase Reconciliation Tool",
         )
 
-        # TODO: skip if today is not greater than 14th return period's next months
-        response = api.get_data(return_period, otp)
+    # TODO: skip if today is not greater than 14th return period's next months
+    responses = api.get_many(
+        [api.get_data_kwargs(return_period) for return_period in return_periods],
+        otp,
+        on_response=publish_progress,
+    )
+
+    for return_period, response in zip(return_periods, responses):
         if response.error_type in ["otp_requested", "invalid_otp"]:
             return response
 
@@ -179,8 +208,13 @@ def download_gstr_2b(gstin, return_periods, otp=None):
 
         # Handle multiple files for GSTR2B
         if response.data and (file_count := response.data.get("fc")):
-            for file_num in range(1, file_count + 1):
-                r = api.get_data(return_period, otp, file_num)
+            for r in api.get_many(
+                [
+                    api.get_data_kwargs(return_period, file_num)
+                    for file_num in range(1, file_count + 1)
+                ],
+                otp,
+            ):
                 save_gstr_2b(gstin, return_period, r)
 
             continue  # skip first response if file_count is greater than 1
@@ -198,13 +232,7 @@ def save_gstr_2a(gstin, return_period, json_data):
         or json_data.get("gstin") != gstin
         or json_data.get("fp") != return_period
     ):
-        frappe.throw(
-            _(
-                "Data received seems to be invalid from the GST Portal. Please try"
-                " again or raise support ticket."
-            ),
-            title=_("Invalid Response Received."),
-        )
+        throw_invalid_response()
 
     for action, category in ACTIONS.items():
         if action.lower() not in json_data:
@@ -224,13 +252,7 @@ def save_gstr_2b(gstin, return_period, json_data):
     json_data = json_data.data
     return_type = ReturnType.GSTR2B
     if not json_data or json_data.get("gstin") != gstin:
-        frappe.throw(
-            _(
-                "Data received seems to be invalid from the GST Portal. Please try"
-                " again or raise support ticket."
-            ),
-            title=_("Invalid Response Received."),
-        )
+        throw_invalid_response()
 
     create_import_log(gstin, return_type.value, return_period)
     save_gstr(
@@ -243,6 +265,102 @@ def save_gstr_2b(gstin, return_period, json_data):
     update_import_history(return_period)
 
 
+def upload_gstr_2a(gstin, return_period, file_path):
+    return_type = ReturnType.GSTR2A
+    outline = get_json_outline(file_path)
+    if (
+        outline.fields.get("gstin") != gstin
+        or outline.fields.get("fp") != return_period
+    ):
+        throw_invalid_response()
+
+    for action, category in ACTIONS.items():
+        if action.lower() not in outline.lists:
+            continue
+
+        create_import_log(
+            gstin, return_type.value, return_period, classification=category.value
+        )
+
+    save_gstr_file(gstin, return_type, return_period, file_path)
+
+
+def upload_gstr_2b(gstin, return_period, file_path):
+    return_type = ReturnType.GSTR2B
+    outline = get_json_outline(file_path)
+    if outline.fields.get("data.gstin") != gstin:
+        throw_invalid_response()
+
+    create_import_log(gstin, return_type.value, return_period)
+    save_gstr_file(
+        gstin,
+        return_type,
+        return_period,
+        file_path,
+        outline.fields.get("data.gendt"),
+    )
+    update_import_history(return_period)
+
+
+def throw_invalid_response():
+    frappe.throw(
+        _(
+            "Data received seems to be invalid from the GST Portal. Please try"
+            " again or raise support ticket."
+        ),
+        title=_("Invalid Response Received."),
+    )
+
+
+def save_gstr_file(gstin, return_type, return_period, file_path, gen_date_2b=None):
+    frappe.enqueue(
+        _save_gstr_file,
+        queue="long",
+        now=frappe.flags.in_test,
+        timeout=1800,
+        gstin=gstin,
+        return_type=return_type.value,
+        return_period=return_period,
+        file_path=get_file_path(file_path),
+        gen_date_2b=gen_date_2b,
+    )
+
+
+def _save_gstr_file(gstin, return_type, return_period, file_path, gen_date_2b=None):
+    """Save uploaded GSTR file to Inward Supply, reading one supplier at a time
+
+    Categories are saved in the order of `GSTRCategory`, with a pass over the
+    file for each, so that originals are saved before their amendments.
+
+    :param file_path: str (Path of JSON file on disk)
+    """
+
+    company = get_party_for_gstin(gstin, "Company")
+    prefix, categories = GSTR_FILE_FORMATS[return_type]
+    file_size = os.path.getsize(file_path) or 1
+
+    outline = get_json_outline(file_path)
+    keys = [
+        key
+        for category in GSTRCategory
+        for key in categories
+        if categories[key] == category
+        and ".".join(filter(None, (prefix, key))) in outline.lists
+    ]
+
+    with open(file_path, "rb") as file:
+        for current_pass, key in enumerate(keys):
+            file.seek(0)
+            category = categories[key]
+            gstr = get_data_handler(return_type, category)
+            gstr(company, gstin, return_period, None, gen_date_2b).create_transactions(
+                category,
+                (supplier for _key, supplier in iter_json_lists(file, prefix, [key])),
+                get_progress=lambda: (current_pass + file.tell() / file_size)
+                / len(keys),
+            )
+
+
 def save_gstr(gstin, return_type, return_period, json_data, gen_date_2b=None):
     frappe.enqueue(
         _save_gstr,
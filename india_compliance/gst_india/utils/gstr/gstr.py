@@ -2,7 +2,7 @@ import frappe
 
 from india_compliance.gst_india.constants import STATE_NUMBERS
 from india_compliance.gst_india.doctype.gst_inward_supply.gst_inward_supply import (
-    create_inward_supply,
+    create_inward_supplies,
 )
 
 
@@ -11,6 +11,12 @@ def get_mapped_value(value, mapping):
 
 
 class GSTR:
+    # Number of transactions imported together
+    CHUNK_SIZE = 1000
+
+    # Number of progress updates published per import
+    PROGRESS_UPDATES = 20
+
     # Maps of API keys to doctype fields
     KEY_MAPS = frappe._dict()
 
@@ -44,41 +50,58 @@ class GSTR:
         self.return_period = return_period
         self._data = data
         self.gen_date_2b = gen_date_2b
+        self.published_progress = None
         self.setup()
 
     def setup(self):
         pass
 
-    def create_transactions(self, category, suppliers):
+    def create_transactions(self, category, suppliers, get_progress=None):
+        """
+        Creates Inward Supplies in chunks of `CHUNK_SIZE` transactions,
+        so that suppliers can be streamed from a file.
+
+        :param suppliers: list or iterator of suppliers
+        :param get_progress: returns fraction of data processed, required
+            if suppliers is an iterator
+        """
         if not suppliers:
             return
 
-        transactions = self.get_all_transactions(category, suppliers)
-        total_transactions = len(transactions)
-        current_transaction = 0
-
-        for transaction in transactions:
-            create_inward_supply(transaction)
-
-            current_transaction += 1
-            frappe.publish_realtime(
-                "update_transactions_progress",
-                {
-                    "current_progress": current_transaction * 100 / total_transactions,
-                    "return_period": self.return_period,
-                },
-                user=frappe.session.user,
-                doctype="Purchase Reconciliation Tool",
-            )
-
-    def get_all_transactions(self, category, suppliers):
         transactions = []
-        for supplier in suppliers:
+        for processed_suppliers, supplier in enumerate(suppliers, start=1):
             transactions.extend(self.get_supplier_transactions(category, supplier))
+            if len(transactions) < self.CHUNK_SIZE:
+                continue
 
+            create_inward_supplies(transactions)
+            transactions = []
+            self.publish_progress(
+                get_progress() if get_progress else processed_suppliers / len(suppliers)
+            )
+
+        create_inward_supplies(transactions)
         self.update_gstins()
+        self.publish_progress(get_progress() if get_progress else 1)
+
+    def publish_progress(self, progress):
+        # publish only when progress reaches the next of `PROGRESS_UPDATES` steps
+        progress_step = int(progress * self.PROGRESS_UPDATES)
+        if self.published_progress is not None and (
+            progress_step <= self.published_progress
+        ):
+            return
 
-        return transactions
+        self.published_progress = progress_step
+        frappe.publish_realtime(
+            "update_transactions_progress",
+            {
+                "current_progress": progress * 100,
+                "return_period": self.return_period,
+            },
+            user=frappe.session.user,
+            doctype="Purchase Reconciliation Tool",
+        )
 
     def get_supplier_transactions(self, category, supplier):
         return [
@@ -2,6 +2,7 @@ from datetime import datetime
 
 import frappe
 
+from india_compliance.gst_india.doctype.gstin.gstin import clear_gstin_cache
 from india_compliance.gst_india.utils import get_datetime, parse_datetime
 from india_compliance.gst_india.utils.gstr.gstr import GSTR, get_mapped_value
 
@@ -74,6 +75,8 @@ class GSTR2a(GSTR):
             "last_updated_on",
             get_datetime(),
         )
+        clear_gstin_cache(*self.all_gstins)
+
         if not self.cancelled_gstins:
             return
 
@@ -94,6 +97,8 @@ class GSTR2a(GSTR):
                 {"cancelled_date": cancelled_date, "status": "Cancelled"},
             )
 
+        clear_gstin_cache(*cancelled_gstins_to_update)
+
 
 class GSTR2aB2B(GSTR2a):
     def setup(self):
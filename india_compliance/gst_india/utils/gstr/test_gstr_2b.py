@@ -4,7 +4,7 @@ import frappe
 from frappe import parse_json, read_file
 from frappe.tests.utils import FrappeTestCase
 
-from india_compliance.gst_india.utils import get_data_file_path
+from india_compliance.gst_india.utils import get_data_file_path, iter_json_lists
 from india_compliance.gst_india.utils.gstr import GSTRCategory, save_gstr_2b
 from india_compliance.gst_india.utils.gstr.test_gstr_2a import TestGSTRMixin
 
@@ -295,3 +295,17 @@ class TestGSTR2b(FrappeTestCase, TestGSTRMixin):
             },
             doc,
         )
+
+
+class TestGSTRFile(FrappeTestCase):
+    def test_suppliers_streamed_from_file(self):
+        file_path = get_data_file_path("test_gstr_2b.json")
+        docdata = parse_json(read_file(file_path)).data.docdata
+
+        with open(file_path, "rb") as file:
+            suppliers = list(iter_json_lists(file, "data.docdata", docdata))
+
+        self.assertEqual(
+            suppliers,
+            [(key, supplier) for key in docdata for supplier in docdata[key]],
+        )
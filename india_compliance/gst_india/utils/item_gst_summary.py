@@ -0,0 +1,70 @@
+"""
+Summaries of item-level GST details stored by `ItemGSTDetails`.
+
+Used by reports instead of decoding `item_wise_tax_detail` of each tax row.
+"""
+
+import frappe
+from frappe.query_builder.functions import Coalesce, NullIf, Sum
+
+from india_compliance.gst_india.constants import GST_TAX_TYPES
+from india_compliance.gst_india.utils.query import get_rows_in_batches
+
+
+def get_item_gst_query(doctype, group_by):
+    """
+    Returns query for taxable value, quantity and GST amounts of items
+    of submitted documents, summed by `group_by`.
+
+    Documents can be filtered using `frappe.qb.DocType(doctype)`,
+    as it is joined with items.
+
+    :param doctype: parent doctype, e.g. Sales Invoice
+    :param group_by: fields of item or parent, or the following
+        - `gst_rate`: sum of IGST, CGST and SGST rates of item
+        - `item_key`: item code, or item name if item code is not set
+        - `place_of_supply`, `gst_category`, `is_export_with_gst`: fields of
+          document
+    """
+    doc = frappe.qb.DocType(doctype)
+    item = frappe.qb.DocType(f"{doctype} Item")
+
+    fields = {
+        "gst_rate": item.igst_rate + item.cgst_rate + item.sgst_rate,
+        "item_key": Coalesce(NullIf(item.item_code, ""), item.item_name),
+        "place_of_supply": doc.place_of_supply,
+        "gst_category": doc.gst_category,
+        "is_export_with_gst": doc.is_export_with_gst,
+    }
+    # not grouped by alias, as items and documents have common columns
+    group_by_terms = [
+        fields[field] if field in fields else item[field] for field in group_by
+    ]
+
+    return (
+        frappe.qb.from_(item)
+        .join(doc)
+        .on(doc.name == item.parent)
+        .select(
+            *(term.as_(field) for term, field in zip(group_by_terms, group_by)),
+            Sum(item.qty).as_("qty"),
+            Sum(item.stock_qty).as_("stock_qty"),
+            Sum(item.taxable_value).as_("taxable_value"),
+            *(Sum(item[f"{tax}_amount"]).as_(f"{tax}_amount") for tax in GST_TAX_TYPES),
+        )
+        .where(doc.docstatus == 1)
+        .where(item.parenttype == doctype)
+        .groupby(*group_by_terms)
+    )
+
+
+def get_item_gst_summary(doctype, parents, group_by):
+    """
+    Yields item GST summary for the given documents, as per `get_item_gst_query`.
+    Documents are queried in batches, so `group_by` should include `parent`.
+    """
+    item = frappe.qb.DocType(f"{doctype} Item")
+
+    return get_rows_in_batches(
+        get_item_gst_query(doctype, group_by), item.parent, parents
+    )
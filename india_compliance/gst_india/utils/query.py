@@ -0,0 +1,30 @@
+"""
+Helpers for queries filtered by a large number of values, e.g. items of
+all invoices of a report.
+"""
+
+from frappe.utils import create_batch
+
+# values in each `IN (...)` list, well within `max_allowed_packet`
+IN_LIST_BATCH_SIZE = 1000
+
+
+def get_rows_in_batches(
+    query, field, values, batch_size=IN_LIST_BATCH_SIZE, as_dict=True
+):
+    """
+    Yields rows of `query` where `field` is in `values`.
+
+    Values are queried in batches, so that a single query is run for up to
+    `batch_size` values and rows of only one batch are held in memory.
+    Hence, `query` should not aggregate rows across values of `field`.
+
+    :param query: query built using `frappe.qb`
+    :param field: field of query to be filtered, e.g. `item.parent`
+    :param values: values of `field`, e.g. names of invoices
+    """
+    if not isinstance(values, (list, tuple)):
+        values = list(values)
+
+    for batch in create_batch(values, batch_size):
+        yield from query.where(field.isin(batch)).run(as_dict=as_dict)
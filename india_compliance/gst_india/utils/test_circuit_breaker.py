@@ -0,0 +1,55 @@
+import time
+
+import time_machine
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from india_compliance.gst_india.utils.circuit_breaker import (
+    CLOSED,
+    FAILURE_THRESHOLD,
+    HALF_OPEN,
+    OPEN,
+    RECOVERY_TIMEOUT,
+    CircuitBreaker,
+)
+
+
+class TestCircuitBreaker(FrappeTestCase):
+    def setUp(self):
+        self.circuit_breaker = CircuitBreaker(f"test/{frappe.generate_hash()}")
+
+    def test_circuit_opens_after_failures(self):
+        for _ in range(FAILURE_THRESHOLD - 1):
+            self.circuit_breaker.record_failure()
+
+        self.assertEqual(self.circuit_breaker.get_state(), CLOSED)
+
+        self.circuit_breaker.record_failure()
+        self.assertEqual(self.circuit_breaker.get_state(), OPEN)
+        self.assertFalse(self.circuit_breaker.allow_request())
+
+    def test_single_trial_request_after_timeout(self):
+        for _ in range(FAILURE_THRESHOLD):
+            self.circuit_breaker.record_failure()
+
+        with time_machine.travel(time.time() + RECOVERY_TIMEOUT + 1, tick=False):
+            self.assertEqual(self.circuit_breaker.get_state(), HALF_OPEN)
+            self.assertTrue(self.circuit_breaker.allow_request())
+            self.assertFalse(self.circuit_breaker.allow_request())
+
+            self.circuit_breaker.record_success()
+            self.assertEqual(self.circuit_breaker.get_state(), CLOSED)
+            self.assertGreater(
+                self.circuit_breaker.get_metrics()["last_recovery"]["time_to_recovery"],
+                RECOVERY_TIMEOUT,
+            )
+
+    def test_failed_trial_request_extends_timeout(self):
+        for _ in range(FAILURE_THRESHOLD):
+            self.circuit_breaker.record_failure()
+
+        with time_machine.travel(time.time() + RECOVERY_TIMEOUT + 1, tick=False):
+            self.assertTrue(self.circuit_breaker.allow_request())
+            self.circuit_breaker.record_failure()
+            self.assertEqual(self.circuit_breaker.get_state(), OPEN)
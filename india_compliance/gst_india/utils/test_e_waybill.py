@@ -19,6 +19,8 @@ from india_compliance.gst_india.utils.e_waybill import (
     cancel_e_waybill,
     fetch_e_waybill_data,
     generate_e_waybill,
+    generate_e_waybill_json,
+    get_e_waybill_validation_errors,
     update_transporter,
     update_vehicle_info,
 )
@@ -77,6 +79,48 @@ class TestEWaybill(FrappeTestCase):
             test_data,
         )
 
+    def test_generate_e_waybill_json(self):
+        docs = [
+            create_sales_invoice(vehicle_no="GJ07DL9009", is_in_state=True),
+            create_sales_invoice(vehicle_no="GJ07DL9009", is_out_state=True),
+        ]
+        ewb_data = frappe.parse_json(
+            generate_e_waybill_json(
+                "Sales Invoice", frappe.as_json([doc.name for doc in docs])
+            )
+        )
+
+        self.assertListEqual(
+            ewb_data.billLists,
+            [
+                frappe.parse_json(
+                    frappe.as_json(EWaybillData(doc, for_json=True).get_data())
+                )
+                for doc in docs
+            ],
+        )
+
+    def test_get_e_waybill_validation_errors(self):
+        valid_doc = create_sales_invoice(vehicle_no="GJ07DL9009")
+        without_vehicle = create_sales_invoice()
+        with_services = create_sales_invoice(
+            vehicle_no="GJ07DL9009", item_code="_Test Service Item"
+        )
+
+        errors = get_e_waybill_validation_errors(
+            "Sales Invoice",
+            [valid_doc.name, without_vehicle.name, with_services.name],
+        )
+
+        self.assertNotIn(valid_doc.name, errors)
+        self.assertRegex(
+            errors[without_vehicle.name], r"^(Vehicle Number is required.*)$"
+        )
+        self.assertRegex(
+            errors[with_services.name],
+            r"^(e-Waybill cannot be generated because all items have.*)$",
+        )
+
     @change_settings(
         "GST Settings", {"fetch_e_waybill_data": 1, "attach_e_waybill_print": 1}
     )
@@ -0,0 +1,55 @@
+from openpyxl import load_workbook
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from india_compliance.gst_india.utils.exporter import ExcelExporter
+
+HEADERS = [
+    {"label": "Status", "fieldname": "status"},
+    {
+        "label": "Taxable Value",
+        "fieldname": "taxable_value",
+        "fieldtype": "Float",
+        "data_format": {"number_format": "0.00"},
+        "header_format": {"width": 12},
+    },
+    {
+        "label": "Purchase Taxable Value",
+        "fieldname": "purchase_taxable_value",
+        "fieldtype": "Float",
+        "compare_with": "taxable_value",
+    },
+]
+
+
+class TestExcelExporter(FrappeTestCase):
+    def test_write_only_export(self):
+        data = (
+            {"status": status, "taxable_value": 100, "purchase_taxable_value": 90}
+            for status in ("Match", "Mismatch")
+        )
+
+        excel = ExcelExporter(write_only=True)
+        excel.create_sheet(
+            sheet_name="Invoice Data",
+            filters=frappe._dict({"GSTIN": "24AAUPV7468F1ZW"}),
+            merged_headers={"Values": ["taxable_value", "purchase_taxable_value"]},
+            headers=HEADERS,
+            data=data,
+        )
+
+        ws = load_workbook(excel.save_workbook())["Invoice Data"]
+
+        self.assertEqual(ws["B2"].value, "Values")
+        self.assertIn("B2:C2", ws.merged_cells)
+        self.assertEqual(ws["A5"].value, "Mismatch")
+        self.assertEqual(ws["B5"].number_format, "0.00")
+        self.assertEqual(ws["B6"].value, "=SUM(B4:B5)")
+        self.assertEqual(ws.column_dimensions["B"].width, 12)
+
+        # cells with the same style share a named style
+        self.assertEqual(ws["B4"].style, ws["B5"].style)
+        self.assertEqual(
+            [str(rule.sqref) for rule in ws.conditional_formatting], ["C4:C5"]
+        )
@@ -0,0 +1,59 @@
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from india_compliance.gst_india.utils.item_gst_summary import get_item_gst_summary
+from india_compliance.gst_india.utils.tests import append_item, create_sales_invoice
+
+
+class TestItemGSTSummary(FrappeTestCase):
+    def test_summary_matches_item_wise_tax_detail(self):
+        invoices = []
+        for data in ({"is_in_state": 1}, {"is_out_state": 1}):
+            si = create_sales_invoice(**data, do_not_submit=True)
+            append_item(si, frappe._dict(item_code="_Test Trading Goods 1", qty=3))
+            si.save()
+            si.submit()
+            invoices.append(si.name)
+
+        summary = list(get_item_gst_summary("Sales Invoice", invoices, ("parent",)))
+        self.assertEqual(len(summary), 2)
+
+        for row in summary:
+            self.assertDictEqual(
+                {
+                    "taxable_value": flt(row.taxable_value, 2),
+                    "tax_amount": flt(
+                        row.igst_amount + row.cgst_amount + row.sgst_amount, 2
+                    ),
+                },
+                get_totals_from_tax_detail(row.parent),
+            )
+
+    def test_rate_and_item_key(self):
+        si = create_sales_invoice(is_in_state=1)
+        summary = list(
+            get_item_gst_summary(
+                "Sales Invoice", [si.name], ("parent", "item_key", "gst_rate")
+            )
+        )
+
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0].item_key, "_Test Trading Goods 1")
+        self.assertEqual(flt(summary[0].gst_rate), 18)
+
+
+def get_totals_from_tax_detail(invoice):
+    doc = frappe.get_doc("Sales Invoice", invoice)
+    tax_amount = 0
+
+    for tax in doc.taxes:
+        for _, amount in json.loads(tax.item_wise_tax_detail).values():
+            tax_amount += amount
+
+    return {
+        "taxable_value": flt(sum(item.taxable_value for item in doc.items), 2),
+        "tax_amount": flt(tax_amount, 2),
+    }
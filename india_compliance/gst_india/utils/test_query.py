@@ -0,0 +1,17 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from india_compliance.gst_india.utils.query import get_rows_in_batches
+from india_compliance.gst_india.utils.tests import create_sales_invoice
+
+
+class TestQuery(FrappeTestCase):
+    def test_rows_in_batches(self):
+        invoices = {create_sales_invoice().name for _ in range(3)}
+
+        item = frappe.qb.DocType("Sales Invoice Item")
+        query = frappe.qb.from_(item).select(item.parent)
+
+        rows = get_rows_in_batches(query, item.parent, invoices, batch_size=2)
+
+        self.assertEqual({row.parent for row in rows}, invoices)
@@ -0,0 +1,31 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from india_compliance.gst_india.utils.tests import create_sales_invoice
+from india_compliance.gst_india.utils.validation_context import (
+    clear_validation_context,
+    get_validation_context,
+)
+
+
+class TestValidationContext(FrappeTestCase):
+    def tearDown(self):
+        frappe.flags.in_import = False
+        clear_validation_context()
+
+    def test_lookups_not_memoized_in_requests(self):
+        context = get_validation_context()
+
+        self.assertFalse(context.memoize)
+        self.assertIsNot(context, get_validation_context())
+
+    def test_lookups_memoized_in_import(self):
+        frappe.flags.in_import = True
+
+        for _ in range(3):
+            create_sales_invoice(is_in_state=True, do_not_submit=True)
+
+        stats = get_validation_context().get_stats()
+        self.assertEqual(stats["validated_docs"], 3)
+        self.assertGreater(stats["lookups_saved_per_doc"], 0)
+        self.assertEqual(stats["lookups"]["valid_accounts"]["misses"], 1)
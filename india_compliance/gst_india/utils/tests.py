@@ -152,3 +152,85 @@ def _append_taxes(
             tax["add_deduct_tax"] = "Deduct"
 
         transaction.append("taxes", tax)
+
+
+def create_cess_accounts():
+    input_cess_non_advol_account = create_tax_accounts("Input Tax Cess Non Advol")
+    output_cess_non_advol_account = create_tax_accounts("Output Tax Cess Non Advol")
+    input_cess_account = create_tax_accounts("Input Tax Cess")
+    output_cess_account = create_tax_accounts("Output Tax Cess")
+
+    settings = frappe.get_doc("GST Settings")
+    for row in settings.gst_accounts:
+        if row.company != "_Test Indian Registered Company":
+            continue
+
+        if row.account_type == "Input":
+            row.cess_account = input_cess_account.name
+            row.cess_non_advol_account = input_cess_non_advol_account.name
+
+        if row.account_type == "Output":
+            row.cess_account = output_cess_account.name
+            row.cess_non_advol_account = output_cess_non_advol_account.name
+
+    settings.save()
+
+
+def create_tax_accounts(account_name):
+    defaults = {
+        "company": "_Test Indian Registered Company",
+        "doctype": "Account",
+        "account_type": "Tax",
+        "is_group": 0,
+    }
+
+    if name := frappe.db.exists(
+        "Account", {"account_name": account_name, "company": defaults["company"]}
+    ):
+        return frappe.get_doc("Account", name)
+
+    if "Input" in account_name:
+        parent_account = "Tax Assets - _TIRC"
+    else:
+        parent_account = "Duties and Taxes - _TIRC"
+
+    return frappe.get_doc(
+        {
+            "account_name": account_name,
+            "parent_account": parent_account,
+            **defaults,
+        }
+    ).save()
+
+
+def create_sales_invoices_for_gst_reports():
+    """
+    Creates Sales Invoices with taxable, zero-rated, nil-rated, non-GST,
+    export and cess supplies, to compare GST reports.
+    """
+    create_cess_accounts()
+
+    invoices = [
+        create_sales_invoice(is_in_state=True),
+        create_sales_invoice(
+            customer="_Test Registered Composition Customer", is_out_state=True
+        ),
+        create_sales_invoice(customer="_Test Unregistered Customer", is_in_state=True),
+        create_sales_invoice(item_code="_Test Nil Rated Item"),
+        create_sales_invoice(item_code="_Test Non GST Item"),
+        create_sales_invoice(customer="_Test Foreign Customer"),
+    ]
+
+    # zero rate item in a taxable invoice
+    zero_rated = create_sales_invoice(is_in_state=True, do_not_save=True)
+    append_item(zero_rated, frappe._dict(item_code="_Test Nil Rated Item"))
+
+    with_cess = create_sales_invoice(is_in_state=True, do_not_save=True)
+    _append_taxes(with_cess, "Cess", rate=1)
+
+    for invoice in (zero_rated, with_cess):
+        invoice.insert()
+        invoice.submit()
+        invoices.append(invoice)
+
+    return invoices
@@ -20,6 +20,18 @@ from india_compliance.gst_india.utils import (
     validate_pincode,
 )
 
+ADDRESS_FIELDS = (
+    "name",
+    "address_title",
+    "address_line1",
+    "address_line2",
+    "city",
+    "pincode",
+    "country",
+    "gstin",
+    "gst_state_number",
+)
+
 REGEX_MAP = {
     1: re.compile(r"[^A-Za-z0-9]"),
     2: re.compile(r"[^A-Za-z0-9\-\/. ]"),
@@ -27,12 +39,122 @@ REGEX_MAP = {
 }
 
 
+class TransactionDataCache:
+    """
+    Masters used to build data of transactions, shared by all transactions
+    built together.
+
+    Values are fetched as required, unless prefetched using `prefetch`.
+    """
+
+    def __init__(self):
+        self.settings = frappe.get_cached_doc("GST Settings")
+        self.gst_accounts = {}
+        self.gst_uoms = {}
+        self.addresses = {}
+        self.address_details = {}
+        self.batch_expiry_dates = {}
+        self.posting_dates = {}
+
+    def prefetch(self, docs):
+        """Fetches masters of all docs using a query per doctype"""
+        address_names = set()
+        batch_nos = set()
+        return_against = {}
+
+        for doc in docs:
+            for df in doc.meta.get(
+                "fields", {"fieldtype": "Link", "options": "Address"}
+            ):
+                if address_name := doc.get(df.fieldname):
+                    address_names.add(address_name)
+
+            for item in doc.items:
+                if batch_no := item.get("batch_no"):
+                    batch_nos.add(batch_no)
+
+            if doc.get("return_against"):
+                return_against.setdefault(doc.doctype, set()).add(doc.return_against)
+
+        if address_names:
+            for address in frappe.get_all(
+                "Address",
+                filters={"name": ("in", list(address_names))},
+                fields=ADDRESS_FIELDS,
+            ):
+                self.addresses[address.name] = address
+
+        if batch_nos:
+            self.batch_expiry_dates.update(
+                frappe.get_all(
+                    "Batch",
+                    filters={"name": ("in", list(batch_nos))},
+                    fields=("name", "expiry_date"),
+                    as_list=True,
+                )
+            )
+
+        for doctype, names in return_against.items():
+            for name, posting_date in frappe.get_all(
+                doctype,
+                filters={"name": ("in", list(names))},
+                fields=("name", "posting_date"),
+                as_list=True,
+            ):
+                self.posting_dates[(doctype, name)] = posting_date
+
+    def get_gst_accounts(self, company, account_type):
+        """
+        Returns account types by GST account:
+        {"CGST Account - TC": "cgst_account", ...}
+        """
+        key = (company, account_type)
+        if key not in self.gst_accounts:
+            self.gst_accounts[key] = {
+                v: k for k, v in get_gst_accounts_by_type(company, account_type).items()
+            }
+
+        return self.gst_accounts[key]
+
+    def get_gst_uom(self, uom):
+        if uom not in self.gst_uoms:
+            self.gst_uoms[uom] = get_gst_uom(uom, self.settings)
+
+        return self.gst_uoms[uom]
+
+    def get_address(self, address_name):
+        if address_name not in self.addresses:
+            self.addresses[address_name] = frappe.get_cached_value(
+                "Address", address_name, ADDRESS_FIELDS, as_dict=True
+            )
+
+        # copied, as it is updated when building data
+        return self.addresses[address_name].copy()
+
+    def get_batch_expiry_date(self, batch_no):
+        if batch_no not in self.batch_expiry_dates:
+            self.batch_expiry_dates[batch_no] = frappe.db.get_value(
+                "Batch", batch_no, "expiry_date"
+            )
+
+        return self.batch_expiry_dates[batch_no]
+
+    def get_posting_date(self, doctype, name):
+        if (doctype, name) not in self.posting_dates:
+            self.posting_dates[(doctype, name)] = frappe.db.get_value(
+                doctype, name, "posting_date"
+            )
+
+        return self.posting_dates[(doctype, name)]
+
+
 class GSTTransactionData:
     DATE_FORMAT = "dd/mm/yyyy"
 
-    def __init__(self, doc):
+    def __init__(self, doc, cache=None):
         self.doc = doc
-        self.settings = frappe.get_cached_doc("GST Settings")
+        self.cache = cache or TransactionDataCache()
+        self.settings = self.cache.settings
         self.sandbox_mode = self.settings.sandbox_mode
         self.transaction_details = frappe._dict()
 
@@ -49,10 +171,8 @@ class GSTTransactionData:
         self.party_name = self.doc.get(self.party_name_field)
 
         # "CGST Account - TC": "cgst_account"
-        self.gst_accounts = {
-            v: k
-            for k, v in get_gst_accounts_by_type(self.doc.company, gst_type).items()
-        }
+        self.gst_accounts = self.cache.get_gst_accounts(self.doc.company, gst_type)
+        self.item_wise_tax_details = {}
 
     def set_transaction_details(self):
         rounding_adjustment = self.rounded(self.doc.base_rounding_adjustment)
@@ -280,7 +400,7 @@ class GSTTransactionData:
                     "item_name": self.sanitize_value(
                         row.item_name, regex=3, max_length=300
                     ),
-                    "uom": get_gst_uom(row.uom, self.settings),
+                    "uom": self.cache.get_gst_uom(row.uom),
                     "gst_treatment": row.gst_treatment,
                 }
             )
@@ -333,7 +453,7 @@ class GSTTransactionData:
             # Remove '_account' from 'cgst_account'
             tax = self.gst_accounts[row.account_head][:-8]
             tax_rate = self.rounded(
-                frappe.parse_json(row.item_wise_tax_detail).get(
+                self.get_item_wise_tax_detail(row).get(
                     item.item_code or item.item_name
                 )[0],
                 3,
@@ -376,6 +496,15 @@ class GSTTransactionData:
             }
         )
 
+    def get_item_wise_tax_detail(self, tax_row):
+        # parsed once per tax row, instead of once per item
+        if tax_row.idx not in self.item_wise_tax_details:
+            self.item_wise_tax_details[tax_row.idx] = frappe.parse_json(
+                tax_row.item_wise_tax_detail
+            )
+
+        return self.item_wise_tax_details[tax_row.idx]
+
     def get_progressive_item_tax_amount(self, amount, tax_type):
         """
         Helper function to calculate progressive tax amount for an item to remove
@@ -390,22 +519,17 @@ class GSTTransactionData:
         return abs(response)
 
     def get_address_details(self, address_name, validate_gstin=False):
-        address = frappe.get_cached_value(
-            "Address",
-            address_name,
-            (
-                "name",
-                "address_title",
-                "address_line1",
-                "address_line2",
-                "city",
-                "pincode",
-                "country",
-                "gstin",
-                "gst_state_number",
-            ),
-            as_dict=True,
-        )
+        # sanitized once for all transactions sharing the cache
+        key = (address_name, validate_gstin)
+        if key not in self.cache.address_details:
+            self.cache.address_details[key] = self._get_address_details(
+                address_name, validate_gstin
+            )
+
+        return self.cache.address_details[key].copy()
+
+    def _get_address_details(self, address_name, validate_gstin=False):
+        address = self.cache.get_address(address_name)
 
         if address.gst_state_number == "97":  # For Other Territory
             address.pincode = "999999"
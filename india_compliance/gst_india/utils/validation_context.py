@@ -0,0 +1,85 @@
+"""
+Context shared by transactions validated in the same Data Import or background job.
+
+Lookups that are repeated for each transaction, like GST accounts of the company
+and details of addresses, are memoized in the context.
+"""
+
+from collections import Counter
+
+from rq import get_current_job
+
+import frappe
+from frappe.utils import flt
+
+
+class ValidationContext:
+    def __init__(self, memoize=True):
+        self.memoize = memoize
+        self.values = {}
+        self.hits = Counter()
+        self.misses = Counter()
+        self.validated_docs = 0
+
+    def get(self, lookup, key, fetch):
+        """
+        Returns value of `lookup` for `key`, using `fetch` if it is not memoized.
+        Memoized values are shared by transactions, and should not be modified.
+        """
+        if not self.memoize:
+            return fetch()
+
+        values = self.values.setdefault(lookup, {})
+        if key in values:
+            self.hits[lookup] += 1
+            return values[key]
+
+        self.misses[lookup] += 1
+        value = values[key] = fetch()
+        return value
+
+    def get_stats(self):
+        lookups_saved = sum(self.hits.values())
+
+        return {
+            "validated_docs": self.validated_docs,
+            "lookups_saved": lookups_saved,
+            "lookups_saved_per_doc": (
+                flt(lookups_saved / self.validated_docs, 2)
+                if self.validated_docs
+                else 0
+            ),
+            "lookups": {
+                lookup: {"hits": self.hits[lookup], "misses": self.misses[lookup]}
+                for lookup in self.values
+            },
+        }
+
+
+def get_validation_context():
+    """
+    Returns context of the current Data Import or background job.
+
+    Lookups are not memoized for other requests, as they validate fewer
+    transactions and masters may be updated in between.
+    """
+    if not (frappe.flags.in_import or get_current_job()):
+        return ValidationContext(memoize=False)
+
+    if not (context := frappe.flags.ic_validation_context):
+        context = frappe.flags.ic_validation_context = ValidationContext()
+
+    return context
+
+
+def clear_validation_context():
+    frappe.flags.pop("ic_validation_context", None)
+
+
+def log_validation_context_stats():
+    """Logs lookups saved by the context, called after each request and job"""
+    context = frappe.flags.pop("ic_validation_context", None)
+    if not context or context.validated_docs < 2:
+        return
+
+    frappe.logger("india_compliance").info({"validation_context": context.get_stats()})
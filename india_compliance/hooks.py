@@ -22,6 +22,17 @@ before_tests = "india_compliance.tests.before_tests"
 
 boot_session = "india_compliance.boot.set_bootinfo"
 
+after_request = [
+    "india_compliance.gst_india.utils.api.flush_integration_requests",
+    "india_compliance.gst_india.utils.validation_context.log_validation_context_stats",
+]
+after_job = [
+    "india_compliance.gst_india.utils.api.flush_integration_requests",
+    "india_compliance.gst_india.utils.validation_context.log_validation_context_stats",
+]
+
+clear_cache = "india_compliance.gst_india.utils.clear_gst_account_index"
+
 setup_wizard_requires = "assets/india_compliance/js/setup_wizard.js"
 setup_wizard_complete = "india_compliance.gst_india.setup.setup_wizard_complete"
 setup_wizard_stages = "india_compliance.setup_wizard.get_setup_wizard_stages"
@@ -347,7 +358,14 @@ scheduler_events = {
             "india_compliance.gst_india.utils.e_invoice.retry_e_invoice_generation",
             "india_compliance.gst_india.utils.gstr.download_queued_request",
         ],
-    }
+    },
+    "hourly": [
+        "india_compliance.gst_india.doctype.gstin.gstin.refresh_stale_gstin_statuses",
+    ],
+    "daily": [
+        "india_compliance.gst_india.doctype.gstin_info_archive.gstin_info_archive.delete_expired_gstin_info",
+        "india_compliance.gst_india.doctype.purchase_reconciliation_tool.delete_expired_watermarks",
+    ],
 }
 
 
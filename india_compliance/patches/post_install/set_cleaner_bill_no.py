@@ -0,0 +1,57 @@
+import frappe
+from frappe.query_builder import Case
+from frappe.utils import create_batch
+
+from india_compliance.gst_india.utils import set_cleaner_bill_no
+
+BATCH_SIZE = 1000
+
+
+def execute():
+    update_cleaner_bill_no(
+        "GST Inward Supply",
+        frappe.get_all(
+            "GST Inward Supply",
+            filters={"bill_no": ("is", "set")},
+            fields=["name", "bill_no", "bill_date"],
+        ),
+        lambda doc: doc.bill_date,
+    )
+
+    update_cleaner_bill_no(
+        "Purchase Invoice",
+        frappe.get_all(
+            "Purchase Invoice",
+            filters={"docstatus": 1, "bill_no": ("is", "set")},
+            fields=["name", "bill_no", "bill_date", "posting_date", "is_return"],
+        ),
+        lambda doc: (
+            doc.posting_date if doc.is_return else doc.bill_date or doc.posting_date
+        ),
+    )
+
+
+def update_cleaner_bill_no(doctype, docs, get_bill_date):
+    """Updates documents in batches, with values set using CASE"""
+    table = frappe.qb.DocType(doctype)
+
+    for batch in create_batch(docs, BATCH_SIZE):
+        cleaner_bill_no = Case()
+        bill_fiscal_year = Case()
+
+        for doc in batch:
+            set_cleaner_bill_no(doc, get_bill_date(doc))
+            cleaner_bill_no = cleaner_bill_no.when(
+                table.name == doc.name, doc.cleaner_bill_no
+            )
+            bill_fiscal_year = bill_fiscal_year.when(
+                table.name == doc.name, doc.bill_fiscal_year
+            )
+
+        (
+            frappe.qb.update(table)
+            .set(table.cleaner_bill_no, cleaner_bill_no)
+            .set(table.bill_fiscal_year, bill_fiscal_year)
+            .where(table.name.isin([doc.name for doc in batch]))
+            .run()
+        )
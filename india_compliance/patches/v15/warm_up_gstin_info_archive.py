@@ -0,0 +1,7 @@
+from india_compliance.gst_india.doctype.gstin_info_archive.gstin_info_archive import (
+    warm_up_archive,
+)
+
+
+def execute():
+    warm_up_archive()